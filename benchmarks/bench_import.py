@@ -0,0 +1,67 @@
+"""
+导入耗时基准测试 - 对比各种导入方式的启动耗时
+
+用法::
+    
+    python benchmarks/bench_import.py [重复次数]
+
+每个场景在全新的子进程中运行多次，输出耗时中位数、加载的模块数以及是否加载了DrissionPage。
+eager场景导入全部导出类，相当于包初始化时全部导入
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+SCENARIOS = {
+    'scrapy_baseline': 'import scrapy.http',
+    'package': 'import scrapy_drissionpage',
+    'request': 'from scrapy_drissionpage import DrissionRequest',
+    'middleware': 'from scrapy_drissionpage.middleware import DrissionPageMiddleware',
+    'eager': 'from scrapy_drissionpage import *',
+}
+
+# 在子进程中执行的计时代码，输出: 耗时 模块数 是否加载DrissionPage
+TIMER = '''
+import sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+print(elapsed, len(sys.modules), 'DrissionPage' in sys.modules)
+'''
+
+
+def measure(statement, repeat):
+    """在全新子进程中重复执行导入语句，返回耗时列表、模块数和是否加载了DrissionPage"""
+    path = os.pathsep.join(filter(None, [ROOT, os.environ.get('PYTHONPATH')]))
+    env = dict(os.environ, PYTHONPATH=path)
+    times = []
+    modules, loaded = 0, False
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', TIMER.format(statement=statement)],
+            env=env, check=True, capture_output=True, text=True,
+        ).stdout.split()
+        times.append(float(output[0]))
+        modules, loaded = int(output[1]), output[2] == 'True'
+    return times, modules, loaded
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'场景':<18}{'中位数(ms)':>12}{'模块数':>10}{'DrissionPage':>14}")
+    for name, statement in SCENARIOS.items():
+        try:
+            times, modules, loaded = measure(statement, repeat)
+        except subprocess.CalledProcessError:
+            print(f"{name:<18}运行失败")
+            continue
+        median = statistics.median(times) * 1000
+        print(f"{name:<18}{median:>12.1f}{modules:>10}{'是' if loaded else '否':>14}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+"""
+内存基准测试 - 对比10000个排队请求/在途响应的内存占用
+
+用法::
+
+    python benchmarks/bench_memory.py [数量]
+
+每个场景在独立子进程中运行，输出RSS增量(Linux读取/proc，其他平台需要psutil)
+和tracemalloc统计的分配量。
+baseline场景模拟每个请求复制一份drission字典的普通Request/HtmlResponse
+"""
+
+import gc
+import multiprocessing
+import os
+import sys
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+HTML = '<html><body>' + '<div class="item"><a href="/p/1">item</a></div>' * 50 + '</body></html>'
+
+
+def rss() -> int:
+    """当前进程的常驻内存(字节)"""
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except OSError:
+        import psutil
+        return psutil.Process().memory_info().rss
+
+
+def baseline_requests(count):
+    from scrapy.http import Request
+    return [
+        Request(
+            f'https://example.com/p/{i}',
+            meta={'drission': {'page_type': 'chromium', 'wait_time': 1, 'load_mode': 'eager'}},
+        )
+        for i in range(count)
+    ]
+
+
+def drission_requests(count):
+    from scrapy_drissionpage.request import DrissionRequest
+    return [
+        DrissionRequest(f'https://example.com/p/{i}', wait_time=1, load_mode='eager')
+        for i in range(count)
+    ]
+
+
+def baseline_responses(count):
+    from scrapy.http import TextResponse
+    from scrapy_drissionpage.request import DrissionRequest
+
+    class BaselineResponse(TextResponse):
+        """没有__slots__、保留页面引用并对正文再次解码的响应"""
+
+        def __init__(self, *args, page=None, **kwargs):
+            super().__init__(*args, **kwargs)
+            self._page = page
+            self.snapshots = []
+            self.action_results = []
+
+    request = DrissionRequest('https://example.com')
+    responses = []
+    for i in range(count):
+        response = BaselineResponse(
+            f'https://example.com/p/{i}', body=HTML.encode('utf-8'), request=request, page=object()
+        )
+        response.text
+        responses.append(response)
+    return responses
+
+
+def drission_responses(count):
+    from scrapy_drissionpage.request import DrissionRequest
+    from scrapy_drissionpage.response import DrissionResponse
+    request = DrissionRequest('https://example.com')
+    responses = [
+        DrissionResponse.from_html(
+            f'https://example.com/p/{i}', HTML, request=request, page=object()
+        )
+        for i in range(count)
+    ]
+    # 模拟回调完成后释放页面对象
+    for response in responses:
+        response.text
+        response.release_page()
+    return responses
+
+
+SCENARIOS = {
+    'baseline_requests': baseline_requests,
+    'drission_requests': drission_requests,
+    'baseline_responses': baseline_responses,
+    'drission_responses': drission_responses,
+}
+
+
+def run(name, count, queue):
+    # 预先导入依赖，只统计对象本身的占用
+    import scrapy.http  # noqa: F401
+    import scrapy_drissionpage.response  # noqa: F401
+    gc.collect()
+    before = rss()
+    tracemalloc.start()
+    objects = SCENARIOS[name](count)
+    allocated = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    gc.collect()
+    queue.put((rss() - before, allocated))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    context = multiprocessing.get_context('spawn')
+    print(f"{'场景':<22}{'RSS增量(MB)':>14}{'分配(MB)':>12}")
+    for name in SCENARIOS:
+        queue = context.Queue()
+        process = context.Process(target=run, args=(name, count, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            print(f"{name:<22}运行失败")
+            continue
+        rss_delta, allocated = queue.get()
+        print(f"{name:<22}{rss_delta / 2 ** 20:>14.1f}{allocated / 2 ** 20:>12.1f}")
+
+
+if __name__ == '__main__':
+    main()
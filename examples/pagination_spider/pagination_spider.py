@@ -3,6 +3,18 @@
 """
 
 from scrapy_drissionpage import DrissionSpider
+from scrapy_drissionpage.utils import ExtractionSpec
+
+
+# 名言列表提取规则，整页字段在一次JavaScript调用中提取
+QUOTES_SPEC = ExtractionSpec({
+    'quotes': {
+        '_items': 'div.quote',
+        'text': 'span.text::text',
+        'author': 'small.author::text',
+        'tags': ['div.tags a.tag::text'],
+    }
+})
 
 
 class PaginationExampleSpider(DrissionSpider):
@@ -31,14 +43,9 @@ class PaginationExampleSpider(DrissionSpider):
         current_page = response.url.split('page=')[-1] if 'page=' in response.url else 1
         self.logger.info(f'正在爬取第 {current_page} 页')
         
-        # 使用Scrapy选择器提取数据
-        for quote in response.css('div.quote'):
-            yield {
-                'page': current_page,
-                'text': quote.css('span.text::text').get(),
-                'author': quote.css('small.author::text').get(),
-                'tags': quote.css('div.tags a.tag::text').getall(),
-            }
+        # 批量提取数据
+        for quote in response.extract(QUOTES_SPEC)['quotes']:
+            yield {'page': current_page, **quote}
         
         # 获取下一页按钮
         next_button = response.page.ele('css:li.next > a', timeout=1)
@@ -1,24 +1,63 @@
 """
 Scrapy-DrissionPage - 将Scrapy爬虫框架与DrissionPage网页自动化工具进行无缝集成
+
+导出的类在首次访问时才导入(PEP 562)，``from scrapy_drissionpage import DrissionRequest``
+不会加载DrissionPage、爬虫和中间件等模块
 """
 
+import importlib
+from typing import TYPE_CHECKING
+
 __version__ = '0.1.0'
 
-# 导出主要类
-from DrissionPage import ChromiumPage, SessionPage
-from DrissionPage import ChromiumOptions, SessionOptions
-from .spider import DrissionSpider
-from .request import DrissionRequest
-from .response import DrissionResponse
-from .middleware import DrissionPageMiddleware
-from .browser_manager import BrowserManager
+# 导出名 -> (模块, 属性名)，以 . 开头的模块相对于本包
+_LAZY_ATTRS = {
+    # 主要类
+    'DrissionSpider': ('.spider', 'DrissionSpider'),
+    'DrissionRequest': ('.request', 'DrissionRequest'),
+    'DrissionResponse': ('.response', 'DrissionResponse'),
+    'DrissionPageMiddleware': ('.middleware', 'DrissionPageMiddleware'),
+    'BrowserManager': ('.browser_manager', 'BrowserManager'),
+    'ChromiumPage': ('DrissionPage', 'ChromiumPage'),
+    'SessionPage': ('DrissionPage', 'SessionPage'),
+    'ChromiumOptions': ('DrissionPage', 'ChromiumOptions'),
+    'SessionOptions': ('DrissionPage', 'SessionOptions'),
+    # 工具类
+    'ModeSwitcher': ('.utils.mode_switcher', 'ModeSwitcher'),
+    'EnhancedSelector': ('.utils.selector', 'EnhancedSelector'),
+    'ApiReplayer': ('.utils.api_replay', 'ApiReplayer'),
+    # 便捷导入
+    'Chromium': ('DrissionPage', 'ChromiumPage'),
+    'Session': ('DrissionPage', 'SessionPage'),
+}
+
+if TYPE_CHECKING:
+    from DrissionPage import ChromiumPage, SessionPage
+    from DrissionPage import ChromiumOptions, SessionOptions
+    from .spider import DrissionSpider
+    from .request import DrissionRequest
+    from .response import DrissionResponse
+    from .middleware import DrissionPageMiddleware
+    from .browser_manager import BrowserManager
+    from .utils import ModeSwitcher, EnhancedSelector, ApiReplayer
+    Chromium = ChromiumPage
+    Session = SessionPage
+
+
+def __getattr__(name: str):
+    """首次访问导出名时导入对应模块，并缓存到模块命名空间"""
+    try:
+        module_name, attr = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), attr)
+    globals()[name] = value
+    return value
+
 
-# 导出工具类
-from .utils import ModeSwitcher, EnhancedSelector
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
 
-# 便捷导入
-Chromium = ChromiumPage
-Session = SessionPage
 
 # 所有导出的类
 __all__ = [
@@ -33,6 +72,7 @@ __all__ = [
     'SessionOptions',
     'ModeSwitcher',
     'EnhancedSelector',
+    'ApiReplayer',
     'Chromium',
     'Session'
-] 
\ No newline at end of file
+]
@@ -0,0 +1,125 @@
+"""
+请求动作 - 在同一个标签页中依次执行声明式的交互动作
+"""
+
+import logging
+from typing import Optional, Dict, Any, List, Tuple, Callable
+
+from .harvest import ScrollHarvester, FAST_SCROLL_JS, scroll
+
+
+class ActionRunner:
+    """
+    动作执行器
+    
+    在请求访问URL后，于同一个标签页中依次执行 ``DrissionRequest(actions=[...])`` 中的动作，
+    无需回到回调中逐个调用，也无需重新访问页面。动作格式::
+        
+        {'method': 'click', 'args': ['#load-more'], 'kwargs': {'timeout': 5}}
+    
+    支持的动作:
+    
+    - ``click(locator, timeout=None)``: 点击元素
+    - ``input(locator, text, clear=True, timeout=None)``: 输入文本
+    - ``scroll(direction='down', distance=None, locator=None, smooth=False)``: 滚动页面或元素，
+      与 ``response.scroll`` 相同
+    - ``fast_scroll(locator=None, max_steps=100)``: 逐屏瞬间滚动到底部，触发懒加载
+    - ``wait_for(locator, timeout=None)``: 等待元素加载
+    - ``wait(seconds)``: 等待指定时间
+    - ``evaluate(script, *args)``: 执行JavaScript，结果保存到 ``response.action_results``
+    - ``snapshot()``: 记录当前页面，作为独立响应交给回调
+    - ``scroll_harvest(item_selector=None, container=None, max_steps=50, idle_steps=2,
+      interval=0.5)``: 无限滚动采集，每次滚动的新增节点作为一个快照
+    """
+    
+    def __init__(self):
+        """初始化动作执行器"""
+        self.logger = logging.getLogger(__name__)
+        self._handlers: Dict[str, Callable] = {
+            'click': self._click,
+            'input': self._input,
+            'scroll': self._scroll,
+            'fast_scroll': self._fast_scroll,
+            'wait_for': self._wait_for,
+            'wait': self._wait,
+            'evaluate': self._evaluate,
+            'snapshot': self._snapshot,
+            'scroll_harvest': self._scroll_harvest,
+        }
+    
+    @property
+    def methods(self) -> List[str]:
+        """支持的动作名称"""
+        return list(self._handlers)
+    
+    def register(self, method: str, handler: Callable) -> None:
+        """
+        注册自定义动作
+        
+        参数:
+            method: 动作名称
+            handler: 处理函数，参数为 (page, state, *args, **kwargs)
+        """
+        self._handlers[method] = handler
+    
+    def run(self, page, actions: List[Dict[str, Any]]) -> Tuple[List[Tuple[str, str]], List[Any]]:
+        """
+        依次执行动作
+        
+        参数:
+            page: 标签页对象
+            actions: 动作列表
+        
+        返回:
+            Tuple: (快照列表[(url, html)], evaluate结果列表)
+        """
+        state: Dict[str, list] = {'snapshots': [], 'results': []}
+        
+        for index, action in enumerate(actions):
+            method = action.get('method')
+            handler = self._handlers.get(method)
+            if handler is None:
+                raise ValueError(f"不支持的动作: {method}")
+            
+            self.logger.debug(f"执行动作 {index}: {method}")
+            handler(page, state, *action.get('args', ()), **action.get('kwargs', {}))
+        
+        return state['snapshots'], state['results']
+    
+    @staticmethod
+    def _click(page, state, locator, timeout=None):
+        page.ele(locator, timeout=timeout).click()
+    
+    @staticmethod
+    def _input(page, state, locator, text, clear=True, timeout=None):
+        page.ele(locator, timeout=timeout).input(text, clear=clear)
+    
+    @staticmethod
+    def _scroll(page, state, direction='down', distance=None, locator=None, smooth=False):
+        scroll(page, direction, distance, locator, smooth)
+    
+    @staticmethod
+    def _fast_scroll(page, state, locator=None, max_steps=100):
+        page.run_js(FAST_SCROLL_JS, locator, max_steps)
+    
+    @staticmethod
+    def _wait_for(page, state, locator, timeout=None):
+        page.wait.eles_loaded(locator, timeout=timeout, raise_err=True)
+    
+    @staticmethod
+    def _wait(page, state, seconds):
+        page.wait(seconds)
+    
+    @staticmethod
+    def _evaluate(page, state, script, *args):
+        state['results'].append(page.run_js(script, *args))
+    
+    @staticmethod
+    def _snapshot(page, state):
+        state['snapshots'].append((page.url, page.html))
+    
+    @staticmethod
+    def _scroll_harvest(page, state, **kwargs):
+        harvester = ScrollHarvester(page, **kwargs)
+        for nodes in harvester.deltas():
+            state['snapshots'].append((page.url, harvester.wrap(nodes)))
\ No newline at end of file
@@ -0,0 +1,636 @@
+"""
+原生asyncio CDP引擎 - 每个浏览器一个websocket连接，以会话方式复用所有标签页
+
+可选依赖: websockets (pip install scrapy-drissionpage[cdp])
+"""
+
+import asyncio
+import json
+import logging
+import re
+import shutil
+import tempfile
+from itertools import count
+from typing import Optional, Dict, Any, List, Callable, Tuple
+from urllib.request import urlopen
+
+from scrapy import signals
+from scrapy.utils.defer import deferred_from_coro
+
+from .config import BrowserConfig
+
+try:
+    import websockets
+except ImportError:  # pragma: no cover - 可选依赖
+    websockets = None
+
+
+# 默认查找的浏览器可执行文件
+BROWSER_CANDIDATES = ('chrome', 'google-chrome', 'chromium', 'chromium-browser', 'msedge')
+
+# 不同加载模式等待的页面事件
+LOAD_EVENTS = {
+    'normal': 'Page.loadEventFired',
+    'eager': 'Page.domContentEventFired',
+    'none': None,
+}
+
+
+class CDPError(Exception):
+    """CDP命令返回错误"""
+
+
+class AsyncCDPConnection:
+    """
+    CDP websocket连接
+    
+    所有标签页的命令和事件都通过同一个连接收发，按消息id和sessionId分发
+    """
+    
+    def __init__(self, ws_url: str):
+        """
+        初始化连接
+        
+        参数:
+            ws_url: 浏览器的websocket调试地址
+        """
+        self.ws_url = ws_url
+        self._ws = None
+        self._ids = count(1)
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._waiters: Dict[Tuple[Optional[str], str], List[asyncio.Future]] = {}
+        self._listeners: Dict[Tuple[Optional[str], str], List[Callable]] = {}
+        self._reader: Optional[asyncio.Task] = None
+        self.logger = logging.getLogger(__name__)
+    
+    async def connect(self, ws=None) -> 'AsyncCDPConnection':
+        """
+        建立websocket连接并开始接收消息
+        
+        参数:
+            ws: 已建立的websocket对象，None表示按ws_url新建
+        
+        返回:
+            AsyncCDPConnection: 连接自身
+        """
+        if ws is None:
+            if websockets is None:
+                raise ImportError("cdp引擎需要安装websockets: pip install websockets")
+            ws = await websockets.connect(self.ws_url, max_size=None, ping_interval=None)
+        self._ws = ws
+        self._reader = asyncio.ensure_future(self._read_loop())
+        return self
+    
+    @property
+    def closed(self) -> bool:
+        """连接是否已关闭，或接收循环已因websocket断开而退出"""
+        return self._reader is None or self._reader.done()
+    
+    async def send(self, method: str, session_id: Optional[str] = None,
+                   timeout: Optional[float] = None, **params: Any) -> Dict[str, Any]:
+        """
+        发送CDP命令并等待结果
+        
+        参数:
+            method: 命令名称，如 'Page.navigate'
+            session_id: 标签页会话id，None表示浏览器级命令
+            timeout: 超时时间(秒)
+            **params: 命令参数
+        
+        返回:
+            Dict[str, Any]: 命令结果
+        """
+        msg_id = next(self._ids)
+        message: Dict[str, Any] = {'id': msg_id, 'method': method, 'params': params}
+        if session_id:
+            message['sessionId'] = session_id
+        
+        future = asyncio.get_running_loop().create_future()
+        self._pending[msg_id] = future
+        try:
+            await self._ws.send(json.dumps(message))
+            return await asyncio.wait_for(future, timeout)
+        finally:
+            self._pending.pop(msg_id, None)
+    
+    def expect_event(self, method: str, session_id: Optional[str] = None) -> asyncio.Future:
+        """
+        注册一次性事件等待，需在触发事件的命令发送前调用
+        
+        参数:
+            method: 事件名称
+            session_id: 标签页会话id
+        
+        返回:
+            asyncio.Future: 事件触发时以事件参数完成
+        """
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.setdefault((session_id, method), []).append(future)
+        return future
+    
+    def on(self, method: str, callback: Callable, session_id: Optional[str] = None) -> None:
+        """
+        注册事件监听
+        
+        参数:
+            method: 事件名称
+            callback: 回调函数，参数为事件参数字典
+            session_id: 标签页会话id
+        """
+        self._listeners.setdefault((session_id, method), []).append(callback)
+    
+    def remove_listeners(self, session_id: Optional[str]) -> None:
+        """
+        移除某个会话的所有事件监听和等待
+        
+        参数:
+            session_id: 标签页会话id
+        """
+        for key in [k for k in self._listeners if k[0] == session_id]:
+            del self._listeners[key]
+        for key in [k for k in self._waiters if k[0] == session_id]:
+            for future in self._waiters.pop(key):
+                future.cancel()
+    
+    async def _read_loop(self) -> None:
+        """接收消息并分发给命令结果和事件"""
+        try:
+            async for raw in self._ws:
+                self._dispatch(json.loads(raw))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.logger.error(f"CDP连接已断开: {e}")
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(CDPError("CDP连接已断开"))
+    
+    def _dispatch(self, message: Dict[str, Any]) -> None:
+        """分发单条消息"""
+        if 'id' in message:
+            future = self._pending.get(message['id'])
+            if future is None or future.done():
+                return
+            if 'error' in message:
+                future.set_exception(CDPError(message['error'].get('message', message['error'])))
+            else:
+                future.set_result(message.get('result', {}))
+            return
+        
+        key = (message.get('sessionId'), message.get('method'))
+        params = message.get('params', {})
+        for future in self._waiters.pop(key, []):
+            if not future.done():
+                future.set_result(params)
+        for callback in self._listeners.get(key, []):
+            try:
+                callback(params)
+            except Exception as e:
+                self.logger.error(f"处理CDP事件 {key[1]} 时出错: {e}")
+    
+    async def close(self) -> None:
+        """关闭连接"""
+        if self._reader is not None:
+            self._reader.cancel()
+            self._reader = None
+        if self._ws is not None:
+            await self._ws.close()
+            self._ws = None
+
+
+class AsyncCDPTab:
+    """
+    通过flatten模式会话控制的标签页
+    """
+    
+    def __init__(self, connection: AsyncCDPConnection, target_id: str, session_id: str):
+        """
+        初始化标签页
+        
+        参数:
+            connection: CDP连接
+            target_id: 标签页targetId
+            session_id: Target.attachToTarget返回的会话id
+        """
+        self.connection = connection
+        self.target_id = target_id
+        self.session_id = session_id
+    
+    @property
+    def tab_id(self) -> str:
+        """标签页id"""
+        return self.target_id
+    
+    async def send(
+        self, method: str, timeout: Optional[float] = None, **params: Any
+    ) -> Dict[str, Any]:
+        """
+        向标签页发送CDP命令
+        
+        参数:
+            method: 命令名称
+            timeout: 超时时间(秒)
+            **params: 命令参数
+        
+        返回:
+            Dict[str, Any]: 命令结果
+        """
+        return await self.connection.send(
+            method, session_id=self.session_id, timeout=timeout, **params
+        )
+    
+    async def get(
+        self, url: str, timeout: Optional[float] = None, load_mode: str = 'normal'
+    ) -> None:
+        """
+        访问URL并按加载模式等待页面加载
+        
+        参数:
+            url: 目标URL
+            timeout: 超时时间(秒)
+            load_mode: 加载模式，'normal'、'eager'或'none'
+        """
+        if load_mode not in LOAD_EVENTS:
+            raise ValueError(f"不支持的加载模式: {load_mode}")
+        
+        event = LOAD_EVENTS[load_mode]
+        loaded = self.connection.expect_event(event, self.session_id) if event else None
+        try:
+            result = await self.send('Page.navigate', timeout=timeout, url=url)
+            if result.get('errorText'):
+                raise CDPError(f"访问 {url} 失败: {result['errorText']}")
+            if loaded is not None:
+                await asyncio.wait_for(loaded, timeout)
+        finally:
+            if loaded is not None and not loaded.done():
+                loaded.cancel()
+    
+    async def run_js(self, expression: str, timeout: Optional[float] = None) -> Any:
+        """
+        执行JavaScript表达式并返回值
+        
+        参数:
+            expression: JavaScript表达式
+            timeout: 超时时间(秒)
+        
+        返回:
+            Any: 表达式的值
+        """
+        result = await self.send('Runtime.evaluate', timeout=timeout, expression=expression,
+                                 returnByValue=True, awaitPromise=True)
+        if result.get('exceptionDetails'):
+            raise CDPError(f"JavaScript执行失败: {result['exceptionDetails'].get('text')}")
+        return result.get('result', {}).get('value')
+    
+    async def wait_ele(self, locator: str, timeout: float = 10, interval: float = 0.1) -> bool:
+        """
+        等待元素出现，支持css和xpath定位符
+        
+        参数:
+            locator: 定位符，如 '#id'、'css:div.item'、'xpath://div'
+            timeout: 超时时间(秒)
+            interval: 检查间隔(秒)
+        
+        返回:
+            bool: 元素是否出现
+        """
+        kind, value = 'css', locator
+        match = re.match(r'^(css|c|xpath|x):(.*)$', locator, re.S)
+        if match:
+            kind = 'xpath' if match.group(1) in ('xpath', 'x') else 'css'
+            value = match.group(2)
+        
+        if kind == 'xpath':
+            expression = (f'document.evaluate({json.dumps(value)}, document, null, '
+                          f'XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue !== null')
+        else:
+            expression = f'document.querySelector({json.dumps(value)}) !== null'
+        
+        loop = asyncio.get_running_loop()
+        end_time = loop.time() + timeout
+        while True:
+            if await self.run_js(expression):
+                return True
+            if loop.time() >= end_time:
+                return False
+            await asyncio.sleep(interval)
+    
+    async def url(self) -> str:
+        """当前页面URL"""
+        return await self.run_js('location.href')
+    
+    async def html(self) -> str:
+        """当前页面HTML"""
+        return await self.run_js('document.documentElement.outerHTML')
+    
+    async def close(self) -> None:
+        """关闭标签页"""
+        self.connection.remove_listeners(self.session_id)
+        await self.connection.send('Target.closeTarget', targetId=self.target_id)
+    
+    def __repr__(self) -> str:
+        return f"<AsyncCDPTab {self.target_id}>"
+
+
+class AsyncBrowser:
+    """
+    基于单个CDP连接的浏览器
+    """
+    
+    def __init__(
+        self, connection: AsyncCDPConnection, process=None, user_data_dir: Optional[str] = None
+    ):
+        """
+        初始化浏览器
+        
+        参数:
+            connection: 已连接的CDP连接
+            process: 由本引擎启动的浏览器进程
+            user_data_dir: 由本引擎创建的临时用户目录
+        """
+        self.connection = connection
+        self.process = process
+        self.user_data_dir = user_data_dir
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    async def connect(cls, host: str = '127.0.0.1', port: int = 9222) -> 'AsyncBrowser':
+        """
+        连接到已启动的浏览器
+        
+        参数:
+            host: 调试地址主机
+            port: 调试端口
+        
+        返回:
+            AsyncBrowser: 浏览器对象
+        """
+        loop = asyncio.get_running_loop()
+        version = await loop.run_in_executor(None, _read_json, f'http://{host}:{port}/json/version')
+        connection = await AsyncCDPConnection(version['webSocketDebuggerUrl']).connect()
+        return cls(connection)
+    
+    @classmethod
+    async def launch(cls, browser_path: Optional[str] = None, headless: bool = True,
+                     arguments: Optional[List[str]] = None, timeout: float = 30) -> 'AsyncBrowser':
+        """
+        启动新的浏览器进程并连接
+        
+        参数:
+            browser_path: 浏览器路径，None表示自动查找
+            headless: 是否无头模式
+            arguments: 其他启动参数
+            timeout: 等待浏览器启动的超时时间(秒)
+        
+        返回:
+            AsyncBrowser: 浏览器对象
+        """
+        if not browser_path:
+            browser_path = next(filter(None, map(shutil.which, BROWSER_CANDIDATES)), None)
+        if not browser_path:
+            raise FileNotFoundError("未找到浏览器，请设置DRISSIONPAGE_BROWSER_PATH")
+        
+        user_data_dir = tempfile.mkdtemp(prefix='scrapy_drissionpage_')
+        args = [
+            '--remote-debugging-port=0',
+            f'--user-data-dir={user_data_dir}',
+            '--no-first-run',
+            '--no-default-browser-check',
+        ]
+        if headless:
+            args.append('--headless=new')
+        args.extend(arguments or [])
+        args.append('about:blank')
+        
+        process = await asyncio.create_subprocess_exec(
+            browser_path, *args,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            ws_url = await asyncio.wait_for(_read_ws_url(process.stderr), timeout)
+        except Exception:
+            process.kill()
+            shutil.rmtree(user_data_dir, ignore_errors=True)
+            raise
+        
+        # 持续读取stderr，避免管道写满阻塞浏览器
+        asyncio.ensure_future(_drain(process.stderr))
+        
+        connection = await AsyncCDPConnection(ws_url).connect()
+        return cls(connection, process=process, user_data_dir=user_data_dir)
+    
+    async def new_tab(
+        self, url: Optional[str] = None, browser_context_id: Optional[str] = None
+    ) -> AsyncCDPTab:
+        """
+        新建标签页并以flatten模式附加会话
+        
+        参数:
+            url: 新标签页要访问的URL
+            browser_context_id: 浏览器上下文id
+        
+        返回:
+            AsyncCDPTab: 标签页对象
+        """
+        params: Dict[str, Any] = {'url': 'about:blank'}
+        if browser_context_id:
+            params['browserContextId'] = browser_context_id
+        target_id = (await self.connection.send('Target.createTarget', **params))['targetId']
+        session_id = (await self.connection.send(
+            'Target.attachToTarget', targetId=target_id, flatten=True
+        ))['sessionId']
+        
+        tab = AsyncCDPTab(self.connection, target_id, session_id)
+        await tab.send('Page.enable')
+        if url:
+            await tab.get(url)
+        return tab
+    
+    async def close(self, quit_browser: bool = True) -> None:
+        """
+        关闭连接，由本引擎启动的浏览器同时退出
+        
+        参数:
+            quit_browser: 是否退出浏览器进程
+        """
+        if quit_browser and self.process is not None:
+            try:
+                await self.connection.send('Browser.close', timeout=5)
+            except Exception as e:
+                self.logger.debug(f"Browser.close失败，结束进程: {e}")
+                self.process.kill()
+            await self.process.wait()
+            self.process = None
+        
+        await self.connection.close()
+        
+        if self.user_data_dir:
+            shutil.rmtree(self.user_data_dir, ignore_errors=True)
+            self.user_data_dir = None
+
+
+class AsyncBrowserManager:
+    """
+    asyncio浏览器管理器
+    
+    使用与BrowserManager相同的DRISSIONPAGE_*设置，通过一个websocket连接管理所有标签页，
+    标签页用完后放回空闲池复用，并发标签页数由DRISSIONPAGE_CDP_MAX_TABS限制。
+    通过 ``from_crawler`` 获取的实例保存在 ``crawler.drission_async_browser_manager`` 中，
+    引擎停止时关闭
+    """
+    
+    def __init__(self, settings):
+        """
+        初始化浏览器管理器
+        
+        参数:
+            settings: Scrapy设置对象
+        """
+        self.settings = settings
+        self.config = BrowserConfig.from_settings(settings)
+        self._browser: Optional[AsyncBrowser] = None
+        self._lock: Optional[asyncio.Lock] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._idle_tabs: List[AsyncCDPTab] = []
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler) -> 'AsyncBrowserManager':
+        """
+        获取Crawler共享的浏览器管理器，不存在时创建
+        
+        参数:
+            crawler: Crawler 实例
+        
+        返回:
+            AsyncBrowserManager: 浏览器管理器实例
+        """
+        manager = getattr(crawler, 'drission_async_browser_manager', None)
+        if manager is None:
+            manager = cls(crawler.settings)
+            crawler.drission_async_browser_manager = manager
+            crawler.signals.connect(manager.engine_stopped, signal=signals.engine_stopped)
+        return manager
+    
+    def engine_stopped(self):
+        """引擎停止时关闭浏览器连接，返回Deferred"""
+        return deferred_from_coro(self.close())
+    
+    @property
+    def max_tabs(self) -> int:
+        """最大并发标签页数"""
+        return self.settings.getint('DRISSIONPAGE_CDP_MAX_TABS', 16)
+    
+    async def get_browser(self) -> AsyncBrowser:
+        """
+        获取浏览器实例，不存在时按设置启动或连接
+        
+        返回:
+            AsyncBrowser: 浏览器实例
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        
+        async with self._lock:
+            # websocket断开后丢弃旧的浏览器和空闲标签页，重新启动或连接
+            if self._browser is not None and self._browser.connection.closed:
+                await self._discard_browser()
+            
+            if self._browser is None:
+                self.logger.info("创建新的CDP浏览器连接")
+                config = self.config
+                if config.init_mode == 'new':
+                    self._browser = await AsyncBrowser.launch(
+                        browser_path=config.browser_path,
+                        headless=config.headless,
+                        arguments=list(config.chrome_options)
+                    )
+                else:
+                    self._browser = await AsyncBrowser.connect(
+                        host=config.connect_host,
+                        port=int(config.connect_port)
+                    )
+            
+            return self._browser
+    
+    async def _discard_browser(self) -> None:
+        """丢弃连接已断开的浏览器"""
+        self.logger.warning("CDP连接已断开，丢弃浏览器和空闲标签页")
+        browser, self._browser = self._browser, None
+        self._idle_tabs.clear()
+        try:
+            await browser.close(quit_browser=self.config.quit_on_close)
+        except Exception as e:
+            self.logger.debug(f"关闭已断开的CDP浏览器失败: {e}")
+    
+    async def acquire_tab(self) -> AsyncCDPTab:
+        """
+        获取一个标签页，超过最大并发数时等待
+        
+        返回:
+            AsyncCDPTab: 标签页对象
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_tabs)
+        
+        await self._semaphore.acquire()
+        try:
+            while self._idle_tabs:
+                tab = self._idle_tabs.pop()
+                if not tab.connection.closed:
+                    return tab
+            browser = await self.get_browser()
+            return await browser.new_tab()
+        except Exception:
+            self._semaphore.release()
+            raise
+    
+    def release_tab(self, tab: AsyncCDPTab) -> None:
+        """
+        归还标签页到空闲池
+        
+        参数:
+            tab: acquire_tab获取的标签页
+        """
+        # 连接已断开的标签页不再复用
+        if not tab.connection.closed:
+            self._idle_tabs.append(tab)
+        self._semaphore.release()
+    
+    async def close(self) -> None:
+        """关闭所有标签页和浏览器"""
+        if self._browser is None:
+            return
+        
+        self._idle_tabs.clear()
+        try:
+            self.logger.info("关闭CDP浏览器连接")
+            await self._browser.close(quit_browser=self.config.quit_on_close)
+        except Exception as e:
+            self.logger.error(f"关闭CDP浏览器失败: {e}")
+        self._browser = None
+
+
+def _read_json(url: str) -> Dict[str, Any]:
+    """读取调试接口返回的JSON"""
+    with urlopen(url, timeout=10) as response:
+        return json.loads(response.read().decode('utf-8'))
+
+
+async def _read_ws_url(stream) -> str:
+    """从浏览器stderr中读取websocket调试地址"""
+    while True:
+        line = await stream.readline()
+        if not line:
+            raise CDPError("浏览器启动失败，未输出调试地址")
+        match = re.search(rb'DevTools listening on (ws://\S+)', line)
+        if match:
+            return match.group(1).decode()
+
+
+async def _drain(stream) -> None:
+    """丢弃流中的剩余输出"""
+    while await stream.read(65536):
+        pass
@@ -7,27 +7,65 @@ from threading import RLock
 from typing import Optional, Dict, Any
 
 from DrissionPage import ChromiumPage, SessionPage
+from scrapy import signals
+
+from .config import BrowserConfig, warn_unknown_settings
+from .contexts import ContextPool
+from .downloads import DownloadManager
+from .fleet import BrowserFleet
 
 
 class BrowserManager:
     """
     浏览器管理器类
     
-    负责创建和管理浏览器实例，支持共享浏览器和会话
+    负责创建和管理浏览器实例，支持共享浏览器和会话。
+    
+    通过 ``from_crawler`` 获取的实例由同一个Crawler中的爬虫、中间件和下载器共享，
+    保存在 ``crawler.drission_browser_manager`` 中，引擎停止时关闭
     """
     
-    def __init__(self, settings):
+    def __init__(self, settings, config: Optional[BrowserConfig] = None):
         """
         初始化浏览器管理器
         
         参数:
             settings: Scrapy设置对象
+            config: 浏览器配置，None表示根据设置解析，设置非法时抛出ValueError
         """
         self.settings = settings
         self._browser = None
         self._session = None
+        self._downloads = None
+        self._fleet = None
+        self._contexts = None
         self._lock = RLock()  # 添加线程锁，确保线程安全
         self.logger = logging.getLogger(__name__)
+        # 最后解析配置，设置非法时抛出ValueError
+        self.config = config if config is not None else BrowserConfig.from_settings(settings)
+    
+    @classmethod
+    def from_crawler(cls, crawler) -> 'BrowserManager':
+        """
+        获取Crawler共享的浏览器管理器，不存在时创建
+        
+        参数:
+            crawler: Crawler 实例
+        
+        返回:
+            BrowserManager: 浏览器管理器实例
+        """
+        manager = getattr(crawler, 'drission_browser_manager', None)
+        if manager is None:
+            warn_unknown_settings(crawler.settings)
+            manager = cls(crawler.settings)
+            crawler.drission_browser_manager = manager
+            crawler.signals.connect(manager.engine_stopped, signal=signals.engine_stopped)
+        return manager
+    
+    def engine_stopped(self) -> None:
+        """引擎停止时关闭浏览器和会话"""
+        self.close()
     
     def get_browser(self) -> ChromiumPage:
         """
@@ -38,93 +76,15 @@ class BrowserManager:
         返回:
             ChromiumPage: 浏览器实例
         """
+        # 配置了多个远程端点时，每次返回负载最低的可用端点上的浏览器
+        fleet = self.fleet
+        if fleet is not None:
+            return fleet.get_browser()
+        
         with self._lock:  # 使用线程锁保护共享资源
             if self._browser is None:
                 self.logger.info("创建新的浏览器实例")
-                
-                # 获取浏览器初始化模式
-                init_mode = self.settings.get('DRISSIONPAGE_INIT_MODE', 'new')
-                
-                # 创建初始化选项
-                browser_options = {}
-                
-                if init_mode == 'new':
-                    # 浏览器路径和选项
-                    browser_path = self.settings.get('DRISSIONPAGE_BROWSER_PATH')
-                    if browser_path:
-                        browser_options['browser_path'] = browser_path
-                    
-                    # 4.0版本的headless设置方式
-                    headless = self.settings.get('DRISSIONPAGE_HEADLESS', True)
-                    if headless:
-                        browser_options['headless'] = headless
-                    
-                    # 隐身模式
-                    incognito = self.settings.get('DRISSIONPAGE_INCOGNITO', False)
-                    if incognito:
-                        browser_options['incognito'] = incognito
-                    
-                    # Chrome选项
-                    chrome_options = self.settings.get('DRISSIONPAGE_CHROME_OPTIONS', [])
-                    if chrome_options:
-                        browser_options['chrome_options'] = chrome_options
-                    
-                    # 设置下载路径(4.0新特性)
-                    download_path = self.settings.get('DRISSIONPAGE_DOWNLOAD_PATH')
-                    if download_path:
-                        browser_options['download_path'] = download_path
-                    
-                    # 创建浏览器实例
-                    try:
-                        self._browser = ChromiumPage(**browser_options)
-                        
-                        # 设置加载模式(4.0新特性，替代page_load_strategy)
-                        load_mode = self.settings.get('DRISSIONPAGE_LOAD_MODE', 'normal')
-                        if load_mode == 'eager':
-                            self._browser.set.load_mode.eager()
-                        elif load_mode == 'none':
-                            self._browser.set.load_mode.none()
-                        
-                        # 设置阻止URL(4.0新特性)
-                        blocked_urls = self.settings.get('DRISSIONPAGE_BLOCKED_URLS')
-                        if blocked_urls:
-                            self._browser.set.blocked_urls(blocked_urls)
-                            
-                        # 设置超时时间
-                        timeout = self.settings.get('DRISSIONPAGE_TIMEOUT')
-                        if timeout:
-                            self._browser.set.timeout(timeout)
-                            
-                        # 设置重试次数
-                        retry_times = self.settings.get('DRISSIONPAGE_RETRY_TIMES')
-                        if retry_times:
-                            self._browser.set.retry_times(retry_times)
-                            
-                        # 设置重试间隔
-                        retry_interval = self.settings.get('DRISSIONPAGE_RETRY_INTERVAL')
-                        if retry_interval:
-                            self._browser.set.retry_interval(retry_interval)
-                            
-                    except Exception as e:
-                        self.logger.error(f"创建浏览器实例失败: {e}")
-                        raise
-                        
-                elif init_mode == 'connect':
-                    # 连接到已有的浏览器实例
-                    host = self.settings.get('DRISSIONPAGE_CONNECT_HOST', '127.0.0.1')
-                    port = self.settings.get('DRISSIONPAGE_CONNECT_PORT', 9222)
-                    
-                    try:
-                        # 4.0版本支持直接传入端口号
-                        if isinstance(port, int):
-                            self._browser = ChromiumPage(port)
-                        else:
-                            self._browser = ChromiumPage(f'{host}:{port}')
-                    except Exception as e:
-                        self.logger.error(f"连接到浏览器实例失败: {e}")
-                        raise
-                else:
-                    raise ValueError(f"不支持的浏览器初始化模式: {init_mode}")
+                self._browser = self.create_browser(self.config)
             
             return self._browser
     
@@ -140,45 +100,107 @@ class BrowserManager:
         with self._lock:  # 使用线程锁保护共享资源
             if self._session is None:
                 self.logger.info("创建新的会话实例")
-                
-                # 创建会话选项
-                session_options = {}
-                
-                # 获取会话选项
-                user_agent = self.settings.get('DRISSIONPAGE_USER_AGENT')
-                if user_agent:
-                    session_options['user_agent'] = user_agent
-                    
-                # 获取超时设置
-                timeout = self.settings.get('DRISSIONPAGE_TIMEOUT')
-                if timeout:
-                    session_options['timeout'] = timeout
-                    
-                # 获取重试次数
-                retry_times = self.settings.get('DRISSIONPAGE_RETRY_TIMES')
-                if retry_times:
-                    session_options['retry'] = retry_times
-                    
-                # 获取重试间隔
-                retry_interval = self.settings.get('DRISSIONPAGE_RETRY_INTERVAL')
-                if retry_interval:
-                    session_options['retry_interval'] = retry_interval
-                
-                # 创建会话实例
-                try:
-                    self._session = SessionPage(**session_options)
-                    
-                    # 设置代理
-                    proxy = self.settings.get('DRISSIONPAGE_PROXY')
-                    if proxy:
-                        self._session.set.proxy(proxy)
-                        
-                except Exception as e:
-                    self.logger.error(f"创建会话实例失败: {e}")
-                    raise
+                self._session = self.create_session(self.config)
             
             return self._session
     
+    def create_browser(self, config: BrowserConfig) -> ChromiumPage:
+        """
+        按配置创建浏览器实例
+        
+        只读取不可变的配置，不访问共享状态，可在多个线程中并行创建
+        
+        参数:
+            config: 浏览器配置
+        
+        返回:
+            ChromiumPage: 浏览器实例
+        """
+        if config.init_mode == 'connect':
+            # 连接到已有的浏览器实例
+            try:
+                # 4.0版本支持直接传入端口号
+                if isinstance(config.connect_port, int):
+                    return ChromiumPage(config.connect_port)
+                return ChromiumPage(f'{config.connect_host}:{config.connect_port}')
+            except Exception as e:
+                self.logger.error(f"连接到浏览器实例失败: {e}")
+                raise
+        
+        try:
+            # 加载模式、超时和重试随启动选项传入
+            browser = ChromiumPage(addr_or_opts=config.browser_options())
+            
+            # 设置阻止URL(4.0新特性)
+            if config.blocked_urls:
+                browser.set.blocked_urls(list(config.blocked_urls))
+        except Exception as e:
+            self.logger.error(f"创建浏览器实例失败: {e}")
+            raise
+        return browser
+    
+    def create_session(self, config: BrowserConfig) -> SessionPage:
+        """
+        按配置创建会话实例
+        
+        参数:
+            config: 浏览器配置
+        
+        返回:
+            SessionPage: 会话实例
+        """
+        try:
+            session = SessionPage(session_or_options=config.session_options())
+        except Exception as e:
+            self.logger.error(f"创建会话实例失败: {e}")
+            raise
+        return session
+    
+    @property
+    def fleet(self) -> Optional[BrowserFleet]:
+        """
+        浏览器集群
+        
+        设置了DRISSIONPAGE_CONNECT_ENDPOINTS时首次访问创建，否则为None
+        
+        返回:
+            Optional[BrowserFleet]: 集群实例
+        """
+        with self._lock:
+            if self._fleet is None and self.config.connect_endpoints:
+                self._fleet = BrowserFleet.from_settings(self.settings)
+            return self._fleet
+    
+    @property
+    def contexts(self) -> ContextPool:
+        """
+        浏览器上下文池
+        
+        首次访问时创建，按身份标识保留隔离的浏览器上下文
+        
+        返回:
+            ContextPool: 上下文池实例
+        """
+        with self._lock:
+            if self._contexts is None:
+                self._contexts = ContextPool.from_settings(self.settings, self)
+            return self._contexts
+    
+    @property
+    def downloads(self) -> DownloadManager:
+        """
+        下载管理器
+        
+        首次访问时创建，每个标签页使用独立的下载目录
+        
+        返回:
+            DownloadManager: 下载管理器实例
+        """
+        with self._lock:
+            if self._downloads is None:
+                self._downloads = DownloadManager.from_settings(self.settings, self)
+            return self._downloads
+    
     def set_proxy(self, proxy: Optional[str]) -> None:
         """
         设置代理，优化4.0的代理设置方式
@@ -209,21 +231,35 @@ class BrowserManager:
         关闭浏览器和会话实例
         """
         with self._lock:
+            # 取消未完成的下载
+            if self._downloads is not None:
+                self._downloads.close()
+                self._downloads = None
+            
+            # 关闭浏览器上下文
+            if self._contexts is not None:
+                self._contexts.close()
+                self._contexts = None
+            
+            # 断开远程端点，远程浏览器不关闭
+            if self._fleet is not None:
+                self._fleet.close()
+                self._fleet = None
+            
             # 关闭浏览器
             if self._browser is not None:
-                if self.settings.get('DRISSIONPAGE_QUIT_ON_CLOSE', True):
+                if self.config.quit_on_close:
                     try:
                         self.logger.info("关闭浏览器实例")
                         # 4.0版本支持force参数强制关闭
-                        force = self.settings.get('DRISSIONPAGE_FORCE_CLOSE', False)
-                        self._browser.quit(force=force)
+                        self._browser.quit(force=self.config.force_close)
                     except Exception as e:
                         self.logger.error(f"关闭浏览器实例失败: {e}")
                 self._browser = None
             
             # 关闭会话
             if self._session is not None:
-                if self.settings.get('DRISSIONPAGE_QUIT_SESSION_ON_CLOSE', True):
+                if self.config.quit_session_on_close:
                     try:
                         self.logger.info("关闭会话实例")
                         self._session.close()
@@ -0,0 +1,261 @@
+"""
+浏览器配置 - 启动时一次性解析并校验DRISSIONPAGE_*设置，得到不可变的BrowserConfig
+"""
+
+import difflib
+import logging
+from dataclasses import dataclass, replace
+from functools import lru_cache
+from typing import Optional, Dict, Any, Tuple, Union
+
+from DrissionPage import ChromiumOptions, SessionOptions
+from scrapy.settings import BaseSettings
+
+INIT_MODES = ('new', 'connect')
+LOAD_MODES = ('normal', 'eager', 'none')
+
+# 本包使用的所有设置，用于提示拼写错误的设置名
+KNOWN_SETTINGS = frozenset({
+    'DRISSIONPAGE_BLOCKED_URLS',
+    'DRISSIONPAGE_BROWSER_PATH',
+    'DRISSIONPAGE_CDP_MAX_TABS',
+    'DRISSIONPAGE_CHROME_OPTIONS',
+    'DRISSIONPAGE_CONNECT_ENDPOINTS',
+    'DRISSIONPAGE_CONNECT_HOST',
+    'DRISSIONPAGE_CONNECT_PORT',
+    'DRISSIONPAGE_DOWNLOAD_CONCURRENCY',
+    'DRISSIONPAGE_DOWNLOAD_PATH',
+    'DRISSIONPAGE_DOWNLOAD_RESUME',
+    'DRISSIONPAGE_ENGINE',
+    'DRISSIONPAGE_FINGERPRINT_KEYS',
+    'DRISSIONPAGE_FLEET_CHECK_INTERVAL',
+    'DRISSIONPAGE_FLEET_MAX_FAILURES',
+    'DRISSIONPAGE_FLEET_MAX_TABS',
+    'DRISSIONPAGE_FORCE_CLOSE',
+    'DRISSIONPAGE_FRONTIER_LEASE_TIMEOUT',
+    'DRISSIONPAGE_FRONTIER_PATH',
+    'DRISSIONPAGE_FRONTIER_WORKER',
+    'DRISSIONPAGE_HEADLESS',
+    'DRISSIONPAGE_INCOGNITO',
+    'DRISSIONPAGE_INIT_MODE',
+    'DRISSIONPAGE_LOAD_MODE',
+    'DRISSIONPAGE_MAX_CONTEXTS',
+    'DRISSIONPAGE_PROXY',
+    'DRISSIONPAGE_QUIT_ON_CLOSE',
+    'DRISSIONPAGE_QUIT_SESSION_ON_CLOSE',
+    'DRISSIONPAGE_RECRAWL_STORE',
+    'DRISSIONPAGE_RELEASE_PAGE',
+    'DRISSIONPAGE_RENDER_CONCURRENCY',
+    'DRISSIONPAGE_RETRY_INTERVAL',
+    'DRISSIONPAGE_RETRY_TIMES',
+    'DRISSIONPAGE_SCREENSHOT_BATCH',
+    'DRISSIONPAGE_SCREENSHOT_FLUSH_INTERVAL',
+    'DRISSIONPAGE_SCREENSHOT_STORE',
+    'DRISSIONPAGE_SCREENSHOT_WORKERS',
+    'DRISSIONPAGE_SIMHASH_DISTANCE',
+    'DRISSIONPAGE_SIMHASH_MIN_FEATURES',
+    'DRISSIONPAGE_SPOOL_DIR',
+    'DRISSIONPAGE_SPOOL_THRESHOLD',
+    'DRISSIONPAGE_TAB_CLEAR_STORAGE',
+    'DRISSIONPAGE_TAB_COLLECT_GARBAGE',
+    'DRISSIONPAGE_TAB_MAX_USES',
+    'DRISSIONPAGE_TIMEOUT',
+    'DRISSIONPAGE_USER_AGENT',
+})
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class BrowserConfig:
+    """
+    不可变的浏览器配置
+    
+    由 ``BrowserConfig.from_settings`` 在BrowserManager和中间件创建时解析一次，
+    之后创建浏览器、会话和关闭时不再读取设置。非法的值在创建时抛出ValueError。
+    请求的 ``meta['drission']`` 中的load_mode和timeout通过 ``merge`` 覆盖，
+    相同的覆盖组合复用同一个配置对象
+    """
+    
+    init_mode: str = 'new'
+    browser_path: Optional[str] = None
+    headless: bool = True
+    incognito: bool = False
+    chrome_options: Tuple[str, ...] = ()
+    download_path: Optional[str] = None
+    load_mode: str = 'normal'
+    blocked_urls: Tuple[str, ...] = ()
+    timeout: Optional[float] = None
+    retry_times: Optional[int] = None
+    retry_interval: Optional[float] = None
+    connect_host: str = '127.0.0.1'
+    connect_port: Union[int, str] = 9222
+    connect_endpoints: Tuple[str, ...] = ()
+    user_agent: Optional[str] = None
+    proxy: Optional[str] = None
+    quit_on_close: bool = True
+    force_close: bool = False
+    quit_session_on_close: bool = True
+    
+    def __post_init__(self):
+        if self.init_mode not in INIT_MODES:
+            raise ValueError(f"不支持的浏览器初始化模式: {self.init_mode}")
+        if self.load_mode not in LOAD_MODES:
+            raise ValueError(f"不支持的加载模式: {self.load_mode}，可选值: {', '.join(LOAD_MODES)}")
+        _check_number('timeout', self.timeout)
+        _check_number('retry_interval', self.retry_interval)
+        retry_times = self.retry_times
+        if retry_times is not None and (
+            isinstance(retry_times, bool) or not isinstance(retry_times, int) or retry_times < 0
+        ):
+            raise ValueError(f"retry_times必须是非负整数: {retry_times!r}")
+        port = self.connect_port
+        if isinstance(port, bool) or not (
+            (isinstance(port, int) and 0 < port < 65536)
+            or (isinstance(port, str) and port.isdigit())
+        ):
+            raise ValueError(f"非法的调试端口: {port!r}")
+        for name in ('chrome_options', 'blocked_urls', 'connect_endpoints'):
+            if not all(isinstance(value, str) for value in getattr(self, name)):
+                raise ValueError(f"{name}必须是字符串列表: {getattr(self, name)!r}")
+    
+    @classmethod
+    def from_settings(cls, settings) -> 'BrowserConfig':
+        """
+        根据设置创建配置
+        
+        参数:
+            settings: Scrapy设置对象或字典
+        
+        返回:
+            BrowserConfig: 配置
+        """
+        if not isinstance(settings, BaseSettings):
+            settings = BaseSettings(settings)
+        return cls(
+            init_mode=settings.get('DRISSIONPAGE_INIT_MODE') or 'new',
+            browser_path=settings.get('DRISSIONPAGE_BROWSER_PATH') or None,
+            headless=settings.getbool('DRISSIONPAGE_HEADLESS', True),
+            incognito=settings.getbool('DRISSIONPAGE_INCOGNITO', False),
+            chrome_options=tuple(settings.getlist('DRISSIONPAGE_CHROME_OPTIONS')),
+            download_path=settings.get('DRISSIONPAGE_DOWNLOAD_PATH') or None,
+            load_mode=settings.get('DRISSIONPAGE_LOAD_MODE') or 'normal',
+            blocked_urls=tuple(settings.getlist('DRISSIONPAGE_BLOCKED_URLS')),
+            timeout=_number(settings, 'DRISSIONPAGE_TIMEOUT', float),
+            retry_times=_number(settings, 'DRISSIONPAGE_RETRY_TIMES', int),
+            retry_interval=_number(settings, 'DRISSIONPAGE_RETRY_INTERVAL', float),
+            connect_host=settings.get('DRISSIONPAGE_CONNECT_HOST') or '127.0.0.1',
+            connect_port=settings.get('DRISSIONPAGE_CONNECT_PORT', 9222),
+            connect_endpoints=tuple(settings.getlist('DRISSIONPAGE_CONNECT_ENDPOINTS')),
+            user_agent=settings.get('DRISSIONPAGE_USER_AGENT') or None,
+            proxy=settings.get('DRISSIONPAGE_PROXY') or None,
+            quit_on_close=settings.getbool('DRISSIONPAGE_QUIT_ON_CLOSE', True),
+            force_close=settings.getbool('DRISSIONPAGE_FORCE_CLOSE', False),
+            quit_session_on_close=settings.getbool('DRISSIONPAGE_QUIT_SESSION_ON_CLOSE', True),
+        )
+    
+    def merge(self, drission: Optional[Dict[str, Any]]) -> 'BrowserConfig':
+        """
+        合并请求的覆盖项
+        
+        参数:
+            drission: 请求的 meta['drission']
+        
+        返回:
+            BrowserConfig: 没有覆盖项时返回自身，否则返回缓存的合并结果
+        """
+        if not drission:
+            return self
+        load_mode = drission.get('load_mode') or self.load_mode
+        timeout = drission.get('timeout')
+        if timeout is None:
+            timeout = self.timeout
+        if load_mode == self.load_mode and timeout == self.timeout:
+            return self
+        return _merged(self, load_mode, timeout)
+    
+    def browser_options(self) -> ChromiumOptions:
+        """
+        创建new模式下启动浏览器的ChromiumOptions
+        
+        未配置的项沿用DrissionPage配置文件中的值
+        
+        返回:
+            ChromiumOptions: 浏览器启动选项
+        """
+        options = ChromiumOptions()
+        if self.browser_path:
+            options.set_browser_path(self.browser_path)
+        options.headless(self.headless)
+        options.incognito(self.incognito)
+        for argument in self.chrome_options:
+            name, _, value = argument.partition('=')
+            options.set_argument(name, value or None)
+        if self.download_path:
+            options.set_download_path(self.download_path)
+        options.set_load_mode(self.load_mode)
+        if self.timeout:
+            options.set_timeouts(base=self.timeout)
+        options.set_retry(self.retry_times, self.retry_interval)
+        return options
+    
+    def session_options(self) -> SessionOptions:
+        """
+        创建SessionPage的SessionOptions
+        
+        未配置的项沿用DrissionPage配置文件中的值
+        
+        返回:
+            SessionOptions: 会话选项
+        """
+        options = SessionOptions()
+        if self.user_agent:
+            options.set_a_header('User-Agent', self.user_agent)
+        if self.timeout:
+            options.set_timeout(self.timeout)
+        options.set_retry(self.retry_times, self.retry_interval)
+        if self.proxy:
+            options.set_proxies(self.proxy, self.proxy)
+        return options
+
+
+@lru_cache(maxsize=256)
+def _merged(config: BrowserConfig, load_mode: str, timeout: Optional[float]) -> BrowserConfig:
+    """合并覆盖项，相同的组合复用同一个对象"""
+    return replace(config, load_mode=load_mode, timeout=timeout)
+
+
+def warn_unknown_settings(settings) -> None:
+    """
+    对未知的DRISSIONPAGE_*设置名输出警告，并提示最接近的已知设置
+    
+    参数:
+        settings: Scrapy设置对象
+    """
+    for name in settings:
+        if not isinstance(name, str) or not name.startswith('DRISSIONPAGE_'):
+            continue
+        if name in KNOWN_SETTINGS:
+            continue
+        close = difflib.get_close_matches(name, KNOWN_SETTINGS, n=1)
+        hint = f"，是否为 {close[0]}" if close else ''
+        logger.warning(f"未知的设置 {name}{hint}")
+
+
+def _number(settings, name: str, convert):
+    """读取可选的数值设置，未设置时返回None"""
+    value = settings.get(name)
+    if value is None or value == '':
+        return None
+    try:
+        return convert(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{name}必须是数字: {value!r}") from None
+
+
+def _check_number(name: str, value) -> None:
+    """检查可选的非负数值"""
+    if value is None:
+        return
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{name}必须是非负数: {value!r}")
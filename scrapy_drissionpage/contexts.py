@@ -0,0 +1,266 @@
+"""
+浏览器上下文池 - 按身份标识保留隔离的浏览器上下文，同一个浏览器同时服务多个账号
+"""
+
+import logging
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from threading import Condition
+from typing import Optional, Dict, Any, List, Set
+
+
+class BrowserContext:
+    """
+    一个身份标识独占的浏览器上下文
+    
+    上下文之间的Cookie、localStorage和缓存相互隔离，同一个身份的请求复用上下文中的标签页
+    """
+    
+    def __init__(self, identity: str, browser, tab, context_id: Optional[str] = None):
+        """
+        初始化上下文
+        
+        参数:
+            identity: 身份标识，如账号名
+            browser: 创建上下文的浏览器
+            tab: 上下文中的标签页
+            context_id: CDP的browserContextId
+        """
+        self.identity = identity
+        self.browser = browser
+        self.tab = tab
+        self.context_id = context_id
+        self.in_use = False
+        self.uses = 0
+        self.created = time.monotonic()
+        self.last_used = self.created
+    
+    def __repr__(self) -> str:
+        state = ' in_use' if self.in_use else ''
+        return f'<BrowserContext {self.identity} uses={self.uses}{state}>'
+
+
+class ContextPool:
+    """
+    浏览器上下文池
+    
+    按身份标识(DrissionRequest的identity参数)保留浏览器上下文，最多保留 ``max_contexts`` 个，
+    超出时关闭最久未使用的空闲上下文。一个上下文同一时间只交给一个请求，所有上下文都在使用中时
+    等待其他请求归还。创建和销毁上下文的CDP调用在锁外执行，不阻塞其他身份的获取和归还。
+    
+    由BrowserManager创建(``browser_manager.contexts``)，容量由DRISSIONPAGE_MAX_CONTEXTS设置
+    """
+    
+    def __init__(self, browser_manager, max_contexts: int = 16):
+        """
+        初始化上下文池
+        
+        参数:
+            browser_manager: 浏览器管理器，用于获取创建上下文的浏览器
+            max_contexts: 最多保留的上下文数
+        """
+        if max_contexts < 1:
+            raise ValueError(f"最大上下文数必须大于0: {max_contexts}")
+        
+        self.browser_manager = browser_manager
+        self.max_contexts = max_contexts
+        # 身份标识 -> 上下文，按最近使用时间排序，最久未使用的在前
+        self._contexts: 'OrderedDict[str, BrowserContext]' = OrderedDict()
+        # 正在创建上下文的身份标识，占用容量
+        self._creating: Set[str] = set()
+        self._condition = Condition()
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_settings(cls, settings, browser_manager) -> 'ContextPool':
+        """
+        根据设置创建上下文池
+        
+        参数:
+            settings: Scrapy设置对象
+            browser_manager: 浏览器管理器
+        
+        返回:
+            ContextPool: 上下文池实例
+        """
+        return cls(browser_manager, max_contexts=settings.getint('DRISSIONPAGE_MAX_CONTEXTS', 16))
+    
+    @property
+    def identities(self) -> List[str]:
+        """已保留上下文的身份标识，最久未使用的在前"""
+        with self._condition:
+            return list(self._contexts)
+    
+    def acquire(self, identity: str, timeout: Optional[float] = None) -> BrowserContext:
+        """
+        获取身份标识的上下文，不存在时创建
+        
+        参数:
+            identity: 身份标识
+            timeout: 上下文都在使用中时的最长等待时间(秒)，None表示一直等待
+        
+        返回:
+            BrowserContext: 上下文，用完后交给release
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        evicted = None
+        with self._condition:
+            while True:
+                context = self._contexts.get(identity)
+                if context is not None and not context.in_use:
+                    self._contexts.move_to_end(identity)
+                    context.in_use = True
+                    context.last_used = time.monotonic()
+                    return context
+                if context is None and identity not in self._creating:
+                    if len(self._contexts) + len(self._creating) < self.max_contexts:
+                        break
+                    evicted = self._pop_idle()
+                    if evicted is not None:
+                        break
+                
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"等待浏览器上下文超时: {identity}")
+                self._condition.wait(remaining)
+            
+            # 先占用名额，在锁外销毁旧上下文并创建新上下文
+            self._creating.add(identity)
+        
+        try:
+            if evicted is not None:
+                self._dispose(evicted)
+            context = self._create(identity)
+        except BaseException:
+            with self._condition:
+                self._creating.discard(identity)
+                self._condition.notify_all()
+            raise
+        
+        context.in_use = True
+        with self._condition:
+            self._creating.discard(identity)
+            self._contexts[identity] = context
+            self._condition.notify_all()
+        return context
+    
+    def release(self, context: BrowserContext) -> None:
+        """
+        归还上下文
+        
+        参数:
+            context: acquire返回的上下文
+        """
+        with self._condition:
+            context.in_use = False
+            context.uses += 1
+            context.last_used = time.monotonic()
+            self._condition.notify_all()
+    
+    @contextmanager
+    def use(self, identity: str, timeout: Optional[float] = None):
+        """
+        在with语句中使用身份标识的标签页::
+            
+            with browser_manager.contexts.use('alice') as tab:
+                tab.get('https://example.com/account')
+        
+        参数:
+            identity: 身份标识
+            timeout: 等待时间(秒)
+        """
+        context = self.acquire(identity, timeout)
+        try:
+            yield context.tab
+        finally:
+            self.release(context)
+    
+    def evict(self, identity: str) -> bool:
+        """
+        关闭身份标识的上下文，清除其Cookie和存储
+        
+        参数:
+            identity: 身份标识
+        
+        返回:
+            bool: 是否已关闭，上下文不存在或正在使用时返回False
+        """
+        with self._condition:
+            context = self._contexts.get(identity)
+            if context is None or context.in_use:
+                return False
+            del self._contexts[identity]
+            self._condition.notify_all()
+        self._dispose(context)
+        return True
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各上下文的状态
+        
+        返回:
+            Dict[str, Dict[str, Any]]: 身份标识 -> 包含uses、in_use、idle(空闲秒数)的字典
+        """
+        now = time.monotonic()
+        with self._condition:
+            return {
+                identity: {
+                    'uses': context.uses,
+                    'in_use': context.in_use,
+                    'idle': 0.0 if context.in_use else now - context.last_used,
+                }
+                for identity, context in self._contexts.items()
+            }
+    
+    def close(self) -> None:
+        """关闭所有上下文"""
+        with self._condition:
+            contexts = list(self._contexts.values())
+            self._contexts.clear()
+            self._condition.notify_all()
+        for context in contexts:
+            self._dispose(context)
+    
+    def __len__(self) -> int:
+        return len(self._contexts)
+    
+    def __contains__(self, identity: str) -> bool:
+        return identity in self._contexts
+    
+    def _pop_idle(self) -> Optional[BrowserContext]:
+        """移出最久未使用的空闲上下文，由调用方在锁外销毁，没有空闲上下文时返回None"""
+        for identity, context in self._contexts.items():
+            if not context.in_use:
+                del self._contexts[identity]
+                self.logger.debug(f"上下文池已满，关闭最久未使用的上下文: {identity}")
+                return context
+        return None
+    
+    def _create(self, identity: str) -> BrowserContext:
+        """在浏览器中新建隔离的上下文及其标签页"""
+        browser = self.browser_manager.get_browser()
+        tab = browser.new_tab(new_context=True)
+        try:
+            info = browser.run_cdp('Target.getTargetInfo', targetId=tab.tab_id)['targetInfo']
+            context_id = info.get('browserContextId')
+        except Exception as e:
+            self.logger.debug(f"获取上下文ID失败: {e}")
+            context_id = None
+        self.logger.debug(f"为 {identity} 创建浏览器上下文: {context_id}")
+        return BrowserContext(identity, browser, tab, context_id)
+    
+    def _dispose(self, context: BrowserContext) -> None:
+        """销毁上下文，同时关闭其中的标签页"""
+        try:
+            if context.context_id is None:
+                raise ValueError("缺少上下文ID")
+            context.browser.run_cdp(
+                'Target.disposeBrowserContext', browserContextId=context.context_id
+            )
+        except Exception as e:
+            self.logger.debug(f"销毁上下文 {context.identity} 失败，改为关闭标签页: {e}")
+            try:
+                context.tab.close()
+            except Exception as e:
+                self.logger.debug(f"关闭标签页失败: {e}")
@@ -0,0 +1,363 @@
+"""
+去重工具 - 考虑drission选项的请求指纹，以及基于SimHash的渲染内容近似去重
+"""
+
+import hashlib
+import json
+import logging
+import re
+from typing import Optional, Dict, Any, List, Tuple, Iterable, Set
+from urllib.parse import urlsplit, parse_qsl
+from weakref import WeakKeyDictionary
+
+from scrapy import Request, Spider
+from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import Response, TextResponse
+from scrapy.selector import Selector
+from scrapy.utils.request import fingerprint
+from w3lib.url import url_query_cleaner
+
+
+# 参与指纹计算的drission选项，timeout、wait_time等只影响加载过程的选项不参与
+DEFAULT_FINGERPRINT_KEYS = (
+    'page_type', 'wait_element', 'actions', 'viewport', 'load_mode', 'identity'
+)
+
+# 提取可见文本，忽略脚本和样式
+TEXT_XPATH = (
+    '//body//text()'
+    '[not(ancestor::script or ancestor::style or ancestor::noscript or ancestor::template)]'
+)
+
+# 分词：连续的字母数字为一个词，中日韩文字按单字切分
+TOKEN_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u9fff]|\d+|[^\W\d_\u3040-\u30ff\u3400-\u9fff]+')
+
+
+class DrissionRequestFingerprinter:
+    """
+    考虑drission选项的请求指纹
+    
+    在Scrapy默认指纹(URL、方法、请求体)的基础上加入 ``meta['drission']`` 中影响渲染结果的选项，
+    使同一URL以不同页面类型、等待元素或动作访问时不会被误判为重复。
+    
+    ContentDedupMiddleware发现两个URL渲染结果相同时，会记录二者不同的查询参数，
+    之后同一路径的请求计算指纹时忽略这些参数，由去重过滤器直接丢弃等价的URL。
+    无论SimHash完全相同还是近似重复，同一参数都需要被确认 ``confirmations`` 次才忽略。
+    
+    启用方式::
+        
+        REQUEST_FINGERPRINTER_CLASS = 'scrapy_drissionpage.dedup.DrissionRequestFingerprinter'
+    """
+    
+    def __init__(self, keys: Iterable[str] = DEFAULT_FINGERPRINT_KEYS, confirmations: int = 2):
+        """
+        初始化指纹计算器
+        
+        参数:
+            keys: 参与指纹计算的drission选项
+            confirmations: 忽略一个查询参数所需的确认次数
+        """
+        if confirmations < 1:
+            raise ValueError(f"确认次数必须大于0: {confirmations}")
+        self.keys = tuple(keys)
+        self.confirmations = confirmations
+        # (域名, 路径) -> 不影响渲染结果的查询参数
+        self.ignored_params: Dict[Tuple[str, str], Set[str]] = {}
+        # (域名, 路径, 参数名) -> 已确认的次数
+        self._pending: Dict[Tuple[str, str, str], int] = {}
+        self._cache: 'WeakKeyDictionary[Request, bytes]' = WeakKeyDictionary()
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'DrissionRequestFingerprinter':
+        """
+        从 Crawler 创建指纹计算器
+        
+        参数:
+            crawler: Crawler 实例
+        
+        返回:
+            DrissionRequestFingerprinter: 指纹计算器实例
+        """
+        keys = crawler.settings.getlist('DRISSIONPAGE_FINGERPRINT_KEYS') or DEFAULT_FINGERPRINT_KEYS
+        return cls(keys)
+    
+    def fingerprint(self, request: Request) -> bytes:
+        """
+        计算请求指纹
+        
+        参数:
+            request: 请求对象
+        
+        返回:
+            bytes: 20字节的SHA1指纹
+        """
+        if request in self._cache:
+            return self._cache[request]
+        
+        canonical = self._canonical_url(request.url)
+        base = fingerprint(request.replace(url=canonical) if canonical != request.url else request)
+        
+        drission = request.meta.get('drission')
+        options = {
+            key: drission[key] for key in self.keys if drission and drission.get(key) is not None
+        }
+        if options:
+            encoded = json.dumps(options, sort_keys=True, default=str, ensure_ascii=False)
+            result = hashlib.sha1(base + encoded.encode('utf-8')).digest()
+        else:
+            result = base
+        
+        self._cache[request] = result
+        return result
+    
+    def learn_equivalent(self, url: str, other: str) -> Set[str]:
+        """
+        记录两个渲染结果相同的URL，二者不同的查询参数累计确认confirmations次后不参与指纹计算
+        
+        参数:
+            url: URL
+            other: 渲染结果相同的另一个URL
+        
+        返回:
+            Set[str]: 新增的被忽略的查询参数
+        """
+        first, second = urlsplit(url), urlsplit(other)
+        if (first.netloc, first.path) != (second.netloc, second.path):
+            return set()
+        
+        first_params = set(parse_qsl(first.query, True))
+        second_params = set(parse_qsl(second.query, True))
+        names = {name for name, _ in first_params ^ second_params}
+        ignored = self.ignored_params.setdefault((first.netloc, first.path), set())
+        added = set()
+        for name in names - ignored:
+            key = (first.netloc, first.path, name)
+            count = self._pending.pop(key, 0) + 1
+            if count >= self.confirmations:
+                added.add(name)
+            else:
+                self._pending[key] = count
+        
+        if added:
+            ignored.update(added)
+            # 已缓存的指纹按旧规则计算，规则变化后全部作废
+            self._cache.clear()
+            self.logger.debug(
+                f"{first.netloc}{first.path} 的查询参数 {sorted(added)} 不影响渲染结果，之后将忽略"
+            )
+        return added
+    
+    def _canonical_url(self, url: str) -> str:
+        """去掉已知不影响渲染结果的查询参数"""
+        if not self.ignored_params:
+            return url
+        parts = urlsplit(url)
+        ignored = self.ignored_params.get((parts.netloc, parts.path))
+        if not ignored or not parts.query:
+            return url
+        return url_query_cleaner(url, sorted(ignored), remove=True, keep_fragments=True)
+
+
+def simhash(tokens: Iterable[str], bits: int = 64) -> int:
+    """
+    计算SimHash
+    
+    参数:
+        tokens: 特征序列
+        bits: 位数
+    
+    返回:
+        int: SimHash值
+    """
+    weights = [0] * bits
+    size = bits // 8
+    for token in tokens:
+        digest = hashlib.blake2b(token.encode('utf-8'), digest_size=size).digest()
+        value = int.from_bytes(digest, 'big')
+        for i in range(bits):
+            weights[i] += 1 if value >> i & 1 else -1
+    return sum(1 << i for i, weight in enumerate(weights) if weight > 0)
+
+
+def text_features(text: str, shingle: int = 3) -> List[str]:
+    """
+    将页面文本转换为SimHash特征
+    
+    数字统一替换为0，使计数器、时间戳等动态内容不影响结果；相邻的词组成shingle以保留顺序信息
+    
+    参数:
+        text: 页面文本
+        shingle: 每个特征包含的词数
+    
+    返回:
+        List[str]: 特征列表
+    """
+    tokens = ['0' if token.isdigit() else token.lower() for token in TOKEN_PATTERN.findall(text)]
+    if len(tokens) <= shingle:
+        return [' '.join(tokens)] if tokens else []
+    return [' '.join(tokens[i:i + shingle]) for i in range(len(tokens) - shingle + 1)]
+
+
+class SimHashIndex:
+    """
+    SimHash近似查找索引
+    
+    将指纹分为 ``distance + 1`` 段，海明距离不超过distance的两个指纹至少有一段完全相同，
+    因此只需与同段相同的候选比较
+    """
+    
+    def __init__(self, distance: int = 3, bits: int = 64):
+        """
+        初始化索引
+        
+        参数:
+            distance: 视为近似重复的最大海明距离
+            bits: 指纹位数
+        """
+        if not 0 <= distance < bits:
+            raise ValueError(f"海明距离必须在0到{bits - 1}之间: {distance}")
+        self.distance = distance
+        self.bits = bits
+        self.bands = distance + 1
+        self._width = -(-bits // self.bands)
+        self._tables: List[Dict[int, List[Tuple[int, str]]]] = [{} for _ in range(self.bands)]
+        self._size = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    def _band_keys(self, value: int) -> List[int]:
+        mask = (1 << self._width) - 1
+        return [value >> (i * self._width) & mask for i in range(self.bands)]
+    
+    def find(self, value: int) -> Optional[str]:
+        """
+        查找近似重复
+        
+        参数:
+            value: SimHash值
+        
+        返回:
+            Optional[str]: 近似重复项的键，没有时返回None
+        """
+        match = self.match(value)
+        return match[0] if match is not None else None
+    
+    def match(self, value: int) -> Optional[Tuple[str, int]]:
+        """
+        查找近似重复及其海明距离
+        
+        参数:
+            value: SimHash值
+        
+        返回:
+            Optional[Tuple[str, int]]: (近似重复项的键, 海明距离)，没有时返回None
+        """
+        for table, key in zip(self._tables, self._band_keys(value)):
+            for candidate, name in table.get(key, ()):
+                distance = bin(candidate ^ value).count('1')
+                if distance <= self.distance:
+                    return name, distance
+        return None
+    
+    def add(self, value: int, name: str) -> None:
+        """
+        添加指纹
+        
+        参数:
+            value: SimHash值
+            name: 对应的键(如URL)
+        """
+        for table, key in zip(self._tables, self._band_keys(value)):
+            table.setdefault(key, []).append((value, name))
+        self._size += 1
+
+
+class ContentDedupMiddleware:
+    """
+    渲染内容近似去重中间件
+    
+    对渲染后页面的可见文本计算SimHash，与已抓取页面近似重复时抛出IgnoreRequest，跳过回调。
+    如果使用了DrissionRequestFingerprinter，还会记录两个URL不同的查询参数，
+    之后等价的URL在调度时即被丢弃。错误页和空白页彼此相似，特征数少于 ``min_features``
+    的页面只去重，不记录查询参数。
+    
+    ``dont_filter=True`` 的请求和非2xx响应不参与去重。启用方式::
+        
+        DOWNLOADER_MIDDLEWARES = {
+            'scrapy_drissionpage.dedup.ContentDedupMiddleware': 544,
+            'scrapy_drissionpage.middleware.DrissionPageMiddleware': 543,
+        }
+    """
+    
+    def __init__(self, distance: int = 3, fingerprinter=None, stats=None, min_features: int = 20):
+        """
+        初始化中间件
+        
+        参数:
+            distance: 视为近似重复的最大海明距离
+            fingerprinter: 请求指纹计算器
+            stats: Scrapy统计收集器
+            min_features: 记录等价查询参数所需的最少SimHash特征数
+        """
+        self.index = SimHashIndex(distance)
+        self.min_features = min_features
+        self.fingerprinter = fingerprinter
+        self.stats = stats
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'ContentDedupMiddleware':
+        """
+        从 Crawler 创建中间件
+        
+        参数:
+            crawler: Crawler 实例
+        
+        返回:
+            ContentDedupMiddleware: 中间件实例
+        """
+        return cls(
+            distance=crawler.settings.getint('DRISSIONPAGE_SIMHASH_DISTANCE', 3),
+            fingerprinter=getattr(crawler, 'request_fingerprinter', None),
+            stats=crawler.stats,
+            min_features=crawler.settings.getint('DRISSIONPAGE_SIMHASH_MIN_FEATURES', 20)
+        )
+    
+    def process_response(self, request: Request, response: Response, spider: Spider) -> Response:
+        """
+        检查渲染内容是否与已抓取页面近似重复
+        
+        参数:
+            request: 请求对象
+            response: 响应对象
+            spider: 爬虫实例
+        
+        返回:
+            Response: 不重复时原样返回
+        """
+        if request.dont_filter or 'drission' not in request.meta:
+            return response
+        if not isinstance(response, TextResponse) or not 200 <= response.status < 300:
+            return response
+        
+        # 关联页面对象的DrissionResponse.xpath返回列表，因此在静态HTML上提取文本
+        features = text_features(' '.join(Selector(text=response.text).xpath(TEXT_XPATH).getall()))
+        if not features:
+            return response
+        
+        value = simhash(features)
+        match = self.index.match(value)
+        if match is None:
+            self.index.add(value, response.url)
+            return response
+        
+        duplicate, _ = match
+        if (isinstance(self.fingerprinter, DrissionRequestFingerprinter)
+                and len(features) >= self.min_features):
+            self.fingerprinter.learn_equivalent(duplicate, response.url)
+        if self.stats:
+            self.stats.inc_value('drissionpage/dedup/near_duplicate')
+        raise IgnoreRequest(f"渲染内容与 {duplicate} 近似重复: {response.url}")
@@ -1,21 +1,48 @@
 """
-DrissionPageDownloader类 - 自定义下载器，处理DrissionRequest请求
+DrissionPageDownloader类 - 自定义下载器，在下载器槽位中异步渲染DrissionRequest
 """
 
+import logging
+import queue
+
+from scrapy import signals
 from scrapy.core.downloader import Downloader
-from twisted.internet import defer
+from scrapy.utils.defer import maybe_deferred_to_future, deferred_from_coro
+from scrapy.utils.httpobj import urlparse_cached
+from twisted.internet import threads
+from twisted.python.threadpool import ThreadPool
 
 from .request import DrissionRequest
+from .response import DrissionResponse
 from .middleware import DrissionPageMiddleware
+from .recycle import TabRecycler
 
 
 class DrissionPageDownloader(Downloader):
     """
     自定义下载器，处理DrissionRequest请求
     
-    扩展了Scrapy的Downloader类，添加了对DrissionRequest的特殊处理
+    DrissionRequest与普通请求一样进入下载器槽位，参与CONCURRENT_REQUESTS等并发控制和
+    DOWNLOAD_DELAY，但使用 ``drission:<域名>`` 作为槽位键，槽位并发数不超过
+    DRISSIONPAGE_RENDER_CONCURRENCY。渲染在大小为DRISSIONPAGE_RENDER_CONCURRENCY的
+    工作线程池中进行，每个线程从标签页池中租用一个标签页，fetch返回的Deferred在渲染完成后触发。
+    
+    启用方式::
+        
+        DOWNLOADER = 'scrapy_drissionpage.downloader.DrissionPageDownloader'
+    
+    启用后DOWNLOADER_MIDDLEWARES中的DrissionPageMiddleware不再渲染请求。渲染完成后标签页
+    经TabRecycler软重置后交给后续请求，每个标签页使用DRISSIONPAGE_TAB_MAX_USES次后换新，
+    需要与页面交互时请使用请求动作(actions)。浏览器模式的响应不关联页面对象
+    (``response.page`` 为None)，回调只能解析渲染后的HTML
     """
     
+    # DrissionPageMiddleware据此跳过渲染
+    renders_drission_requests = True
+    
+    # DrissionRequest槽位键前缀
+    SLOT_PREFIX = 'drission:'
+    
     def __init__(self, crawler):
         """
         初始化下载器
@@ -25,25 +52,178 @@ class DrissionPageDownloader(Downloader):
         """
         super().__init__(crawler)
         self.drission_middleware = DrissionPageMiddleware.from_crawler(crawler)
+        self.render_concurrency = self.settings.getint('DRISSIONPAGE_RENDER_CONCURRENCY', 4)
+        if self.render_concurrency < 1:
+            raise ValueError(f"渲染并发数必须大于0: {self.render_concurrency}")
+        
+        self.render_pool = ThreadPool(
+            minthreads=0, maxthreads=self.render_concurrency, name='drission-render'
+        )
+        self._idle_tabs: queue.LifoQueue = queue.LifoQueue()
+        self.tab_recycler = TabRecycler.from_settings(self.settings)
+        # 与中间件的增量重爬检查共用会话锁
+        self._session_lock = self.drission_middleware.session_lock
+        self.logger = logging.getLogger(__name__)
     
-    @defer.inlineCallbacks
-    def fetch(self, request, spider):
+    def get_slot_key(self, request):
         """
-        获取请求的响应
+        获取请求的槽位键
+        
+        DrissionRequest使用 ``drission:<域名>``，与同一域名的普通请求分别计算并发
         
         参数:
             request (Request): 请求对象
-            spider (Spider): 爬虫实例
-            
+        
+        返回:
+            str: 槽位键
+        """
+        if not isinstance(request, DrissionRequest) or self.DOWNLOAD_SLOT in request.meta:
+            return super().get_slot_key(request)
+        return self.SLOT_PREFIX + (urlparse_cached(request).hostname or '')
+    
+    def _get_slot(self, request, spider=None):
+        key, slot = super()._get_slot(request)
+        # 未在DOWNLOAD_SLOTS中单独设置并发数的渲染槽位，并发数不超过渲染并发数
+        custom = 'concurrency' in self.per_slot_settings.get(key, {})
+        if key.startswith(self.SLOT_PREFIX) and not custom:
+            slot.concurrency = min(slot.concurrency, self.render_concurrency)
+        return key, slot
+    
+    async def _download(self, slot, request):
+        """
+        下载请求，DrissionRequest在工作线程池中渲染
+        
+        参数:
+            slot: 下载器槽位
+            request (Request): 请求对象
+        
         返回:
             Response: 响应对象
         """
-        # 如果是DrissionRequest，使用DrissionPageMiddleware处理
-        if isinstance(request, DrissionRequest):
-            response = self.drission_middleware.process_request(request, spider)
-            if response:
-                defer.returnValue(response)
+        if not isinstance(request, DrissionRequest):
+            return await super()._download(slot, request)
+        
+        slot.transferring.add(request)
+        try:
+            response = await maybe_deferred_to_future(self._render(request))
+            self.signals.send_catch_log(
+                signal=signals.response_downloaded,
+                response=response,
+                request=request,
+                spider=self.crawler.spider,
+            )
+            return response
+        finally:
+            slot.transferring.remove(request)
+            self._process_queue(slot)
+            self.signals.send_catch_log(
+                signal=signals.request_left_downloader,
+                request=request,
+                spider=self.crawler.spider,
+            )
+    
+    def _render(self, request):
+        """
+        渲染请求
         
-        # 否则使用默认下载器处理
-        response = yield super().fetch(request, spider)
-        defer.returnValue(response) 
\ No newline at end of file
+        参数:
+            request (DrissionRequest): 请求对象
+        
+        返回:
+            Deferred: 渲染完成时触发，结果为响应对象
+        """
+        spider = self.crawler.spider
+        page_type = request.meta.get('drission', {}).get('page_type', 'chromium')
+        
+        # cdp引擎本身是异步的，直接在reactor中执行
+        if page_type == 'chromium' and self.drission_middleware._engine(spider) == 'cdp':
+            return deferred_from_coro(self.drission_middleware.render(request, spider))
+        
+        if not self.render_pool.started:
+            self.render_pool.start()
+        
+        from twisted.internet import reactor
+        return threads.deferToThreadPool(
+            reactor, self.render_pool, self._render_in_thread, request, spider
+        )
+    
+    def _render_in_thread(self, request, spider):
+        """
+        在工作线程中渲染请求
+        
+        浏览器模式租用一个标签页，渲染完成后归还；指定了身份标识的请求使用上下文池中该身份的标签页；
+        会话模式共享同一个会话，依次执行
+        
+        参数:
+            request (DrissionRequest): 请求对象
+            spider (Spider): 爬虫实例
+        
+        返回:
+            DrissionResponse: 响应对象
+        """
+        if request.meta.get('drission', {}).get('page_type', 'chromium') != 'chromium':
+            with self._session_lock:
+                return self.drission_middleware.render(request, spider)
+        
+        if request.meta.get('drission', {}).get('identity') is not None:
+            return self.drission_middleware.render(request, spider)
+        
+        fleet = self.drission_middleware._get_browser_manager(spider).fleet
+        tab = self._lease_tab(spider)
+        try:
+            response = self.drission_middleware.render(request, spider, tab=tab)
+            # 标签页归还后会被软重置并交给后续请求，响应只保留渲染结果，不再关联标签页
+            if isinstance(response, DrissionResponse):
+                response.release_page()
+            return response
+        finally:
+            # 所在端点已移出轮换或不可用的标签页不再放回池中
+            if fleet is not None and not fleet.in_rotation(tab):
+                self.tab_recycler.forget(tab)
+                self._close_tab(tab, fleet)
+            # 软重置后放回池中，达到最大使用次数或重置失败时关闭
+            elif self.tab_recycler.recycle(tab):
+                self.crawler.stats.inc_value('drissionpage/tabs/recycled')
+                self._idle_tabs.put(tab)
+            else:
+                self.crawler.stats.inc_value('drissionpage/tabs/retired')
+                self._close_tab(tab, fleet)
+    
+    def _close_tab(self, tab, fleet):
+        """关闭不再放回池中的标签页"""
+        # 关闭的标签页不再需要恢复视口
+        self.drission_middleware._viewports.pop(tab.tab_id, None)
+        if fleet is not None:
+            fleet.release_tab(tab)
+            return
+        try:
+            tab.close()
+        except Exception as e:
+            self.logger.debug(f"关闭标签页失败: {e}")
+    
+    def _lease_tab(self, spider):
+        """从标签页池中取出一个标签页，池为空时新建"""
+        try:
+            return self._idle_tabs.get_nowait()
+        except queue.Empty:
+            browser_manager = self.drission_middleware._get_browser_manager(spider)
+            self.logger.debug("为渲染线程创建新标签页")
+            # 配置了多个远程端点时在负载最低的端点上新建
+            if browser_manager.fleet is not None:
+                return browser_manager.fleet.acquire_tab()
+            return browser_manager.get_browser().new_tab()
+    
+    def close(self):
+        """关闭下载器，停止工作线程并关闭池中的标签页"""
+        super().close()
+        if self.render_pool.started:
+            self.render_pool.stop()
+        browser_manager = getattr(self.crawler, 'drission_browser_manager', None)
+        fleet = browser_manager.fleet if browser_manager is not None else None
+        while True:
+            try:
+                tab = self._idle_tabs.get_nowait()
+            except queue.Empty:
+                break
+            self.tab_recycler.forget(tab)
+            self._close_tab(tab, fleet)
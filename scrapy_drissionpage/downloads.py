@@ -0,0 +1,510 @@
+"""
+下载管理 - 按标签页隔离下载目录，限制并发，跟踪进度，并通过会话模式断点续传
+"""
+
+import hashlib
+import logging
+import os
+import re
+import threading
+import uuid
+from threading import RLock
+from typing import Optional, Dict, Any, List
+from urllib.parse import urlsplit, unquote
+
+from scrapy.settings import BaseSettings
+from twisted.internet import threads
+from twisted.internet.defer import Deferred
+
+
+# 文件名中不允许出现的字符
+UNSAFE_FILENAME = re.compile(r'[\\/:*?"<>|\x00-\x1f]')
+
+
+def file_checksum(path: str, chunk_size: int = 65536) -> str:
+    """
+    计算文件的MD5(与FilesPipeline一致)
+    
+    参数:
+        path: 文件路径
+        chunk_size: 每次读取的字节数
+    
+    返回:
+        str: MD5十六进制字符串
+    """
+    digest = hashlib.md5()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DownloadTask:
+    """
+    下载任务
+    
+    每个任务有独立的ID，状态依次为 pending、running，最终为 completed、failed 或 canceled。
+    浏览器下载的进度来自DrissionPage的DownloadMission，会话下载的进度在写入时更新
+    """
+    
+    def __init__(self, url: Optional[str], folder: str, name: Optional[str] = None,
+                 tab_id: Optional[str] = None, via: str = 'browser'):
+        """
+        初始化任务
+        
+        参数:
+            url: 文件URL，点击下载时在下载开始后才能确定
+            folder: 下载目录
+            name: 文件名，None表示使用服务器建议的文件名
+            tab_id: 发起下载的标签页ID
+            via: 下载方式，'browser' 或 'session'
+        """
+        self.id = uuid.uuid4().hex
+        self.url = url
+        self.folder = folder
+        self.name = name
+        self.tab_id = tab_id
+        self.via = via
+        self.state = 'pending'
+        self.status = 'downloaded'
+        self.received_bytes = 0
+        self.total_bytes: Optional[int] = None
+        self.path: Optional[str] = None
+        self.checksum: Optional[str] = None
+        self.error: Optional[BaseException] = None
+        self.mission = None
+        self._done = threading.Event()
+    
+    def __repr__(self) -> str:
+        return f'<DownloadTask {self.id} {self.state} {self.url}>'
+    
+    @property
+    def progress(self) -> Optional[float]:
+        """下载进度(0到1)，总大小未知时返回None"""
+        if self.state == 'completed':
+            return 1.0
+        if not self.total_bytes:
+            return None
+        return min(self.received_bytes / self.total_bytes, 1.0)
+    
+    @property
+    def is_done(self) -> bool:
+        """任务是否已结束"""
+        return self._done.is_set()
+    
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        阻塞等待任务结束
+        
+        参数:
+            timeout: 超时时间(秒)，None表示一直等待
+        
+        返回:
+            bool: 任务是否已结束
+        """
+        return self._done.wait(timeout)
+    
+    def to_item(self, root: Optional[str] = None, urls_field: str = 'file_urls',
+                result_field: str = 'files') -> Dict[str, Any]:
+        """
+        转换为与FilesPipeline结果格式相同的item
+        
+        参数:
+            root: 存储根目录，path相对于该目录；None表示使用绝对路径
+            urls_field: URL列表字段名(对应FILES_URLS_FIELD)
+            result_field: 结果字段名(对应FILES_RESULT_FIELD)
+        
+        返回:
+            Dict[str, Any]: item字典
+        """
+        if self.state != 'completed':
+            raise ValueError(f"下载任务未完成: {self!r}")
+        path = os.path.relpath(self.path, root) if root else self.path
+        return {
+            urls_field: [self.url],
+            result_field: [{
+                'url': self.url,
+                'path': path.replace(os.sep, '/'),
+                'checksum': self.checksum,
+                'status': self.status,
+            }],
+        }
+    
+    def _finish(self, state: str, error: Optional[BaseException] = None) -> None:
+        self.state = state
+        self.error = error
+        self._done.set()
+
+
+class DownloadManager:
+    """
+    下载管理器
+    
+    由BrowserManager创建(``browser_manager.downloads``)。与直接调用标签页的
+    ``set.download_path``/``set.download_file_name``/``wait.download_begin`` 不同:
+    
+    - 每个标签页使用独立的下载目录，文件名随单次下载传入，多个回调同时下载不会互相覆盖
+    - 同一标签页的点击依次进行，下载目录和文件名设置在下载开始前不会被其他点击改写
+    - 同时进行的会话下载(包括续传)不超过 ``max_concurrent``，浏览器下载在点击时即开始，不受此限制
+    - 下载开始后立即返回DownloadTask，可随时查询进度，或通过 ``when_done`` 得到Deferred
+    - 浏览器下载被取消或失败时，带上标签页的Cookie交给会话模式，以Range请求断点续传
+    """
+    
+    def __init__(
+        self,
+        browser_manager,
+        root: str = 'downloads',
+        max_concurrent: int = 4,
+        resume: bool = True,
+        timeout: Optional[float] = None,
+        chunk_size: int = 65536
+    ):
+        """
+        初始化下载管理器
+        
+        参数:
+            browser_manager: BrowserManager实例
+            root: 下载根目录，每个标签页在其下使用以标签页ID命名的子目录
+            max_concurrent: 最大并发会话下载数
+            resume: 浏览器下载失败时是否改用会话模式续传
+            timeout: 等待下载开始和会话请求的超时时间(秒)
+            chunk_size: 会话下载每次写入的字节数
+        """
+        if max_concurrent < 1:
+            raise ValueError(f"最大并发下载数必须大于0: {max_concurrent}")
+        
+        self.browser_manager = browser_manager
+        self.root = os.path.abspath(root)
+        self.max_concurrent = max_concurrent
+        self.resume = resume
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._tasks: Dict[str, DownloadTask] = {}
+        self._lock = RLock()
+        self._tab_locks: Dict[str, threading.Lock] = {}
+        self._closed = threading.Event()
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_settings(cls, settings, browser_manager) -> 'DownloadManager':
+        """
+        根据设置创建下载管理器
+        
+        参数:
+            settings: Scrapy设置对象
+            browser_manager: BrowserManager实例
+        
+        返回:
+            DownloadManager: 下载管理器实例
+        """
+        if not isinstance(settings, BaseSettings):
+            settings = BaseSettings(settings)
+        timeout = settings.get('DRISSIONPAGE_TIMEOUT')
+        return cls(
+            browser_manager,
+            root=settings.get('DRISSIONPAGE_DOWNLOAD_PATH') or 'downloads',
+            max_concurrent=settings.getint('DRISSIONPAGE_DOWNLOAD_CONCURRENCY', 4),
+            resume=settings.getbool('DRISSIONPAGE_DOWNLOAD_RESUME', True),
+            timeout=settings.getfloat('DRISSIONPAGE_TIMEOUT') if timeout not in (None, '') else None
+        )
+    
+    @property
+    def tasks(self) -> List[DownloadTask]:
+        """所有下载任务"""
+        with self._lock:
+            return list(self._tasks.values())
+    
+    def get(self, task_id: str) -> Optional[DownloadTask]:
+        """
+        按ID获取下载任务
+        
+        参数:
+            task_id: 任务ID
+        
+        返回:
+            Optional[DownloadTask]: 下载任务，不存在时返回None
+        """
+        with self._lock:
+            return self._tasks.get(task_id)
+    
+    def progress(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取所有任务的进度
+        
+        返回:
+            Dict[str, Dict[str, Any]]: 任务ID -> 包含url、state、received_bytes、
+                total_bytes、progress的字典
+        """
+        return {
+            task.id: {
+                'url': task.url,
+                'state': task.state,
+                'received_bytes': task.received_bytes,
+                'total_bytes': task.total_bytes,
+                'progress': task.progress,
+            }
+            for task in self.tasks
+        }
+    
+    def folder_for(self, tab) -> str:
+        """
+        获取标签页的下载目录
+        
+        参数:
+            tab: 标签页对象或标签页ID，None表示共享目录
+        
+        返回:
+            str: 下载目录的绝对路径
+        """
+        tab_id = tab if isinstance(tab, str) or tab is None else tab.tab_id
+        folder = os.path.join(self.root, tab_id or 'shared')
+        os.makedirs(folder, exist_ok=True)
+        return folder
+    
+    def click(self, tab, locator, name: Optional[str] = None, timeout: Optional[float] = None,
+              by_js: bool = False) -> DownloadTask:
+        """
+        点击元素触发浏览器下载
+        
+        在调用线程中定位并点击元素，等待下载开始后返回状态为running的任务，下载在后台进行。
+        下载目录和文件名是标签页级别的设置，从设置到下载开始期间持有该标签页的锁
+        
+        参数:
+            tab: 标签页对象
+            locator: 触发下载的元素定位符，或已获取的元素
+            name: 文件名，None表示使用服务器建议的文件名
+            timeout: 等待下载开始的超时时间(秒)
+            by_js: 是否用JavaScript点击
+        
+        返回:
+            DownloadTask: 下载任务，下载未能开始时状态变为failed
+        """
+        timeout = timeout if timeout is not None else self.timeout
+        task = self._register(DownloadTask(None, self.folder_for(tab), name, tab.tab_id))
+        if self._closed.is_set():
+            task._finish('canceled')
+            return task
+        
+        try:
+            with self._tab_lock(tab):
+                element = tab.ele(locator, timeout=timeout) if isinstance(locator, str) else locator
+                mission = element.click.to_download(
+                    save_path=task.folder, rename=task.name, by_js=by_js, timeout=timeout
+                )
+        except Exception as e:
+            task._finish('failed', e)
+            self.logger.error(f"触发下载失败: {e}")
+            return task
+        
+        if not mission:
+            task._finish('failed', TimeoutError(f"等待下载开始超时: {locator}"))
+            self.logger.warning(f"等待下载开始超时: {locator}")
+            return task
+        
+        task.mission = mission
+        task.url = mission.url
+        task.name = mission.name
+        task.state = 'running'
+        cookies = self._tab_cookies(tab) if self.resume else None
+        threading.Thread(
+            target=self._watch_mission, args=(task, cookies),
+            name=f'drission-download-{task.id[:8]}', daemon=True
+        ).start()
+        return task
+    
+    def fetch(self, url: str, name: Optional[str] = None, tab=None,
+              headers: Optional[Dict[str, str]] = None) -> DownloadTask:
+        """
+        以会话模式下载文件，支持断点续传
+        
+        未完成的数据保存在 ``<文件名>.part`` 中，再次下载同一文件时从已下载的位置继续
+        
+        参数:
+            url: 文件URL
+            name: 文件名，None表示取URL路径的最后一段
+            tab: 标签页对象，提供时带上其Cookie和User-Agent
+            headers: 额外的请求头
+        
+        返回:
+            DownloadTask: 下载任务
+        """
+        tab_id = tab.tab_id if tab else None
+        task = self._register(DownloadTask(url, self.folder_for(tab), name, tab_id, 'session'))
+        task.state = 'running'
+        cookies = self._tab_cookies(tab) if tab is not None else None
+        
+        def run():
+            with self._slots:
+                self._run_session(task, cookies, headers)
+        
+        threading.Thread(target=run, name=f'drission-download-{task.id[:8]}', daemon=True).start()
+        return task
+    
+    def when_done(self, task: DownloadTask) -> Deferred:
+        """
+        获取任务结束时触发的Deferred，避免在回调中阻塞reactor
+        
+        参数:
+            task: 下载任务
+        
+        返回:
+            Deferred: 结果为任务本身
+        """
+        def wait():
+            task.wait()
+            return task
+        
+        return threads.deferToThread(wait)
+    
+    def cancel(self, task_id: str) -> bool:
+        """
+        取消下载任务
+        
+        参数:
+            task_id: 任务ID
+        
+        返回:
+            bool: 任务是否存在且尚未结束
+        """
+        task = self.get(task_id)
+        if task is None or task.is_done:
+            return False
+        # 先标记为取消，避免浏览器下载的取消被当作失败而转为续传
+        task.state = 'canceled'
+        if task.mission is not None:
+            task.mission.cancel()
+        return True
+    
+    def wait_all(self, timeout: Optional[float] = None) -> bool:
+        """
+        等待所有任务结束
+        
+        参数:
+            timeout: 每个任务的超时时间(秒)
+        
+        返回:
+            bool: 是否所有任务都已结束
+        """
+        return all(task.wait(timeout) for task in self.tasks)
+    
+    def close(self) -> None:
+        """取消所有未结束的任务"""
+        self._closed.set()
+        for task in self.tasks:
+            self.cancel(task.id)
+    
+    def _register(self, task: DownloadTask) -> DownloadTask:
+        with self._lock:
+            self._tasks[task.id] = task
+        return task
+    
+    def _tab_cookies(self, tab) -> Optional[list]:
+        """读取标签页的Cookie，供会话续传使用"""
+        try:
+            return list(tab.cookies())
+        except Exception as e:
+            self.logger.debug(f"读取标签页Cookie失败: {e}")
+            return None
+    
+    def _tab_lock(self, tab) -> threading.Lock:
+        """获取标签页的下载设置锁"""
+        with self._lock:
+            return self._tab_locks.setdefault(tab.tab_id, threading.Lock())
+    
+    def _watch_mission(self, task: DownloadTask, cookies: Optional[list]) -> None:
+        """跟踪浏览器下载进度，失败时转为会话续传"""
+        mission = task.mission
+        try:
+            while not mission.is_done and not self._closed.is_set():
+                task.received_bytes = mission.received_bytes or 0
+                task.total_bytes = mission.total_bytes
+                self._closed.wait(0.2)
+            
+            task.received_bytes = mission.received_bytes or task.received_bytes
+            task.total_bytes = mission.total_bytes
+            if mission.state == 'completed':
+                task.path = mission.final_path
+                task.name = os.path.basename(mission.final_path)
+                task.checksum = file_checksum(task.path)
+                task._finish('completed')
+                self.logger.info(f"下载完成: {task.url} -> {task.path}")
+            elif mission.state == 'skipped':
+                task.path = os.path.join(mission.folder, mission.name)
+                task.checksum = file_checksum(task.path)
+                task.status = 'uptodate'
+                task._finish('completed')
+            elif task.state == 'canceled' or self._closed.is_set() or not self.resume:
+                canceled = task.state == 'canceled' or self._closed.is_set()
+                task._finish('canceled' if canceled else 'failed')
+            else:
+                self.logger.info(f"浏览器下载中断，改用会话模式续传: {task.url}")
+                task.via = 'session'
+                with self._slots:
+                    self._run_session(task, cookies, None)
+        except Exception as e:
+            self.logger.error(f"下载失败: {task.url}: {e}")
+            task._finish('failed', e)
+    
+    def _run_session(self, task: DownloadTask, cookies: Optional[list],
+                     headers: Optional[Dict[str, str]]) -> None:
+        """以会话模式下载，存在 .part 文件时用Range请求续传"""
+        try:
+            session_page = self.browser_manager.get_session()
+            # 标签页的Cookie只随本次请求发送，不写入共享的会话
+            request_cookies = None
+            if cookies:
+                request_cookies = {cookie['name']: cookie['value'] for cookie in cookies}
+            
+            name = task.name or self._name_from_url(task.url) or task.id
+            task.name = name = UNSAFE_FILENAME.sub('_', name)
+            path = os.path.join(task.folder, name)
+            part = f'{path}.part'
+            
+            request_headers = dict(headers or {})
+            offset = os.path.getsize(part) if os.path.exists(part) else 0
+            if offset:
+                request_headers['Range'] = f'bytes={offset}-'
+            
+            with session_page.session.get(
+                task.url, headers=request_headers, cookies=request_cookies,
+                stream=True, timeout=self.timeout
+            ) as response:
+                if response.status_code == 416 and offset:
+                    # 已下载的部分就是完整文件
+                    self.logger.debug(f"服务器返回416，.part文件已完整: {part}")
+                else:
+                    response.raise_for_status()
+                    if response.status_code != 206:
+                        offset = 0
+                    task.total_bytes = self._total_size(response, offset)
+                    task.received_bytes = offset
+                    with open(part, 'ab' if offset else 'wb') as f:
+                        for chunk in response.iter_content(self.chunk_size):
+                            if task.state == 'canceled' or self._closed.is_set():
+                                task._finish('canceled')
+                                return
+                            f.write(chunk)
+                            task.received_bytes += len(chunk)
+            
+            os.replace(part, path)
+            task.path = path
+            task.checksum = file_checksum(path)
+            task._finish('completed')
+            self.logger.info(f"会话下载完成: {task.url} -> {path}")
+        except Exception as e:
+            self.logger.error(f"会话下载失败: {task.url}: {e}")
+            task._finish('failed', e)
+    
+    @staticmethod
+    def _total_size(response, offset: int) -> Optional[int]:
+        """根据Content-Range或Content-Length计算文件总大小"""
+        content_range = response.headers.get('Content-Range', '')
+        if '/' in content_range and not content_range.endswith('/*'):
+            return int(content_range.rsplit('/', 1)[1])
+        length = response.headers.get('Content-Length')
+        return int(length) + offset if length else None
+    
+    @staticmethod
+    def _name_from_url(url: str) -> str:
+        return unquote(os.path.basename(urlsplit(url).path))
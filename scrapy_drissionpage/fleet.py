@@ -0,0 +1,316 @@
+"""
+浏览器集群 - 连接多个远程CDP端点，健康检查并按负载分配标签页
+"""
+
+import json
+import logging
+import time
+from threading import RLock
+from typing import Optional, Dict, Any, List, Iterable
+from urllib.request import urlopen
+
+from DrissionPage import ChromiumPage
+
+
+class BrowserEndpoint:
+    """
+    远程浏览器端点
+    
+    记录端点的健康状态、已分配的标签页数和连接的浏览器
+    """
+    
+    def __init__(self, address: str, max_tabs: int = 0):
+        """
+        初始化端点
+        
+        参数:
+            address: 调试地址，如 '10.0.0.5:9222'
+            max_tabs: 最多同时分配的标签页数，0表示不限制
+        """
+        self.address = address.replace('http://', '').rstrip('/')
+        self.max_tabs = max_tabs
+        self.healthy = False
+        self.active = 0
+        self.failures = 0
+        self.last_check = 0.0
+        self.version: Dict[str, Any] = {}
+        self.browser: Optional[ChromiumPage] = None
+    
+    def __repr__(self) -> str:
+        state = 'healthy' if self.healthy else 'unhealthy'
+        return f'<BrowserEndpoint {self.address} {state} active={self.active}>'
+    
+    @property
+    def available(self) -> bool:
+        """是否可以分配新标签页"""
+        return self.healthy and (not self.max_tabs or self.active < self.max_tabs)
+
+
+class BrowserFleet:
+    """
+    浏览器集群
+    
+    通过 ``/json/version`` 检查各端点是否可用，连续失败达到 ``max_failures`` 次的端点暂停分配，
+    恢复后重新加入。新标签页分配给已分配标签页最少的可用端点。端点可在运行时通过
+    ``add``/``remove`` 加入或移出轮换，移出的端点上已分配的标签页不受影响。
+    
+    设置 DRISSIONPAGE_CONNECT_ENDPOINTS 后由BrowserManager创建(``browser_manager.fleet``)
+    """
+    
+    def __init__(
+        self,
+        endpoints: Iterable[str] = (),
+        check_interval: float = 30,
+        max_failures: int = 1,
+        max_tabs: int = 0,
+        timeout: float = 3
+    ):
+        """
+        初始化集群
+        
+        参数:
+            endpoints: 端点地址列表
+            check_interval: 健康检查间隔(秒)
+            max_failures: 连续失败多少次后暂停分配
+            max_tabs: 每个端点最多同时分配的标签页数，0表示不限制
+            timeout: 健康检查超时时间(秒)
+        """
+        if max_failures < 1:
+            raise ValueError(f"最大失败次数必须大于0: {max_failures}")
+        
+        self.check_interval = check_interval
+        self.max_failures = max_failures
+        self.max_tabs = max_tabs
+        self.timeout = timeout
+        self._endpoints: Dict[str, BrowserEndpoint] = {}
+        # 标签页ID -> 所属端点
+        self._tabs: Dict[str, BrowserEndpoint] = {}
+        self._lock = RLock()
+        self.logger = logging.getLogger(__name__)
+        
+        for address in endpoints:
+            self.add(address)
+    
+    @classmethod
+    def from_settings(cls, settings) -> 'BrowserFleet':
+        """
+        根据设置创建集群
+        
+        参数:
+            settings: Scrapy设置对象
+        
+        返回:
+            BrowserFleet: 集群实例
+        """
+        return cls(
+            settings.getlist('DRISSIONPAGE_CONNECT_ENDPOINTS'),
+            check_interval=settings.getfloat('DRISSIONPAGE_FLEET_CHECK_INTERVAL', 30),
+            max_failures=settings.getint('DRISSIONPAGE_FLEET_MAX_FAILURES', 1),
+            max_tabs=settings.getint('DRISSIONPAGE_FLEET_MAX_TABS', 0)
+        )
+    
+    @property
+    def endpoints(self) -> List[BrowserEndpoint]:
+        """轮换中的端点"""
+        with self._lock:
+            return list(self._endpoints.values())
+    
+    def add(self, address: str) -> BrowserEndpoint:
+        """
+        将端点加入轮换，下次分配前进行健康检查
+        
+        参数:
+            address: 调试地址
+        
+        返回:
+            BrowserEndpoint: 端点
+        """
+        endpoint = BrowserEndpoint(address, self.max_tabs)
+        with self._lock:
+            if endpoint.address in self._endpoints:
+                return self._endpoints[endpoint.address]
+            self._endpoints[endpoint.address] = endpoint
+        self.logger.info(f"浏览器端点加入轮换: {endpoint.address}")
+        return endpoint
+    
+    def remove(self, address: str) -> Optional[BrowserEndpoint]:
+        """
+        将端点移出轮换，不再分配新标签页
+        
+        参数:
+            address: 调试地址
+        
+        返回:
+            Optional[BrowserEndpoint]: 被移出的端点，不存在时返回None
+        """
+        with self._lock:
+            endpoint = self._endpoints.pop(address.replace('http://', '').rstrip('/'), None)
+        if endpoint is not None:
+            self.logger.info(f"浏览器端点移出轮换: {endpoint.address}")
+        return endpoint
+    
+    def check(self, endpoint: BrowserEndpoint) -> bool:
+        """
+        检查端点是否可用
+        
+        参数:
+            endpoint: 端点
+        
+        返回:
+            bool: 是否可用
+        """
+        try:
+            url = f'http://{endpoint.address}/json/version'
+            with urlopen(url, timeout=self.timeout) as response:
+                endpoint.version = json.loads(response.read().decode('utf-8'))
+            healthy = 'webSocketDebuggerUrl' in endpoint.version
+        except Exception as e:
+            self.logger.debug(f"浏览器端点 {endpoint.address} 健康检查失败: {e}")
+            healthy = False
+        endpoint.last_check = time.monotonic()
+        self._record(endpoint, healthy)
+        return endpoint.healthy
+    
+    def check_all(self) -> Dict[str, bool]:
+        """
+        检查所有端点
+        
+        返回:
+            Dict[str, bool]: 地址 -> 是否可用
+        """
+        return {endpoint.address: self.check(endpoint) for endpoint in self.endpoints}
+    
+    def get_browser(self) -> ChromiumPage:
+        """
+        获取负载最低的可用端点上的浏览器
+        
+        返回:
+            ChromiumPage: 浏览器实例
+        """
+        return self._connect(self._choose())
+    
+    def acquire_tab(self):
+        """
+        在负载最低的可用端点上新建标签页
+        
+        返回:
+            标签页对象，用完后交给release_tab
+        """
+        while True:
+            endpoint = self._choose()
+            try:
+                tab = self._connect(endpoint).new_tab()
+            except Exception as e:
+                self.logger.warning(f"在浏览器端点 {endpoint.address} 上新建标签页失败: {e}")
+                # 连接失败时立即暂停分配，等下次健康检查恢复
+                endpoint.browser = None
+                endpoint.failures += 1
+                endpoint.healthy = False
+                continue
+            with self._lock:
+                endpoint.active += 1
+                self._tabs[tab.tab_id] = endpoint
+            return tab
+    
+    def release_tab(self, tab, close: bool = True) -> None:
+        """
+        归还标签页
+        
+        参数:
+            tab: acquire_tab返回的标签页
+            close: 是否关闭标签页
+        """
+        with self._lock:
+            endpoint = self._tabs.pop(tab.tab_id, None)
+            if endpoint is not None:
+                endpoint.active -= 1
+        if close:
+            try:
+                tab.close()
+            except Exception as e:
+                self.logger.debug(f"关闭标签页失败: {e}")
+    
+    def in_rotation(self, tab) -> bool:
+        """
+        标签页所在端点是否仍在轮换中且可用
+        
+        参数:
+            tab: acquire_tab返回的标签页
+        
+        返回:
+            bool: 端点被移出或不可用时返回False，此时应归还标签页
+        """
+        with self._lock:
+            endpoint = self._tabs.get(tab.tab_id)
+            if endpoint is None or not endpoint.healthy:
+                return False
+            return self._endpoints.get(endpoint.address) is endpoint
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """
+        获取各端点状态
+        
+        返回:
+            Dict[str, Dict[str, Any]]: 地址 -> 包含healthy、active、failures、
+                browser(浏览器版本)的字典
+        """
+        return {
+            endpoint.address: {
+                'healthy': endpoint.healthy,
+                'active': endpoint.active,
+                'failures': endpoint.failures,
+                'browser': endpoint.version.get('Browser'),
+            }
+            for endpoint in self.endpoints
+        }
+    
+    def close(self) -> None:
+        """断开与所有端点的连接，不关闭远程浏览器"""
+        with self._lock:
+            endpoints = list(self._endpoints.values())
+            self._tabs.clear()
+        for endpoint in endpoints:
+            if endpoint.browser is not None:
+                try:
+                    endpoint.browser.disconnect()
+                except Exception as e:
+                    self.logger.debug(f"断开浏览器端点 {endpoint.address} 失败: {e}")
+                endpoint.browser = None
+            endpoint.active = 0
+    
+    def _record(self, endpoint: BrowserEndpoint, healthy: bool) -> None:
+        """记录检查结果，连续失败达到上限时暂停分配"""
+        if healthy:
+            if not endpoint.healthy:
+                self.logger.info(f"浏览器端点可用: {endpoint.address}")
+            endpoint.healthy = True
+            endpoint.failures = 0
+            return
+        
+        endpoint.failures += 1
+        if endpoint.healthy and endpoint.failures >= self.max_failures:
+            self.logger.warning(
+                f"浏览器端点连续 {endpoint.failures} 次不可用，暂停分配: {endpoint.address}"
+            )
+            endpoint.healthy = False
+    
+    def _choose(self) -> BrowserEndpoint:
+        """选择负载最低的可用端点，到期的端点先重新检查"""
+        now = time.monotonic()
+        for endpoint in self.endpoints:
+            if not endpoint.last_check or now - endpoint.last_check >= self.check_interval:
+                self.check(endpoint)
+        
+        with self._lock:
+            candidates = [endpoint for endpoint in self._endpoints.values() if endpoint.available]
+            if not candidates:
+                raise RuntimeError(f"没有可用的浏览器端点: {list(self._endpoints)}")
+            return min(candidates, key=lambda endpoint: endpoint.active)
+    
+    def _connect(self, endpoint: BrowserEndpoint) -> ChromiumPage:
+        """连接端点上的浏览器"""
+        with self._lock:
+            if endpoint.browser is None:
+                self.logger.debug(f"连接浏览器端点: {endpoint.address}")
+                endpoint.browser = ChromiumPage(endpoint.address)
+            return endpoint.browser
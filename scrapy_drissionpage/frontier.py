@@ -0,0 +1,548 @@
+"""
+共享抓取队列 - 多个Scrapy进程通过本地SQLite数据库分配DrissionRequest，共享去重和统计
+"""
+
+import logging
+import multiprocessing
+import os
+import pickle
+import socket
+import sqlite3
+import time
+from typing import Optional, Dict, Any, Tuple, List
+
+from scrapy import signals
+from scrapy.core.scheduler import Scheduler
+from scrapy.exceptions import DontCloseSpider
+from scrapy.utils.request import request_from_dict
+from twisted.internet import task
+
+from .request import DrissionRequest
+from .signals import response_processed
+
+# 启用后回调输出全部消费才确认请求的爬虫中间件
+SPIDER_MIDDLEWARE_PATH = 'scrapy_drissionpage.middleware.DrissionSpiderMiddleware'
+
+
+class SharedFrontier:
+    """
+    共享抓取队列
+    
+    多个进程打开同一个SQLite数据库文件，请求按优先级出队并租给取出它的工作进程，
+    工作进程处理完成后确认(ack)删除，处理期间定期续租。租约超过 ``lease_timeout`` 秒未续租的请求
+    (工作进程崩溃)重新回到队列。去重指纹和各工作进程的统计也保存在同一个数据库中
+    """
+    
+    def __init__(self, path: str, lease_timeout: float = 300, timeout: float = 30):
+        """
+        初始化队列
+        
+        参数:
+            path: 数据库文件路径
+            lease_timeout: 租约超时时间(秒)
+            timeout: 等待其他进程释放数据库锁的时间(秒)
+        """
+        if lease_timeout <= 0:
+            raise ValueError(f"租约超时时间必须大于0: {lease_timeout}")
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.lease_timeout = lease_timeout
+        # 自动提交模式，写操作显式使用BEGIN IMMEDIATE保证跨进程原子性
+        self._conn = sqlite3.connect(
+            path, timeout=timeout, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS requests (id INTEGER PRIMARY KEY AUTOINCREMENT, '
+            'priority INTEGER, data BLOB, worker TEXT, leased REAL)'
+        )
+        self._conn.execute(
+            'CREATE INDEX IF NOT EXISTS requests_order ON requests (worker, priority DESC, id)'
+        )
+        self._conn.execute('CREATE TABLE IF NOT EXISTS seen (fingerprint BLOB PRIMARY KEY)')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS stats '
+            '(worker TEXT, key TEXT, value REAL, PRIMARY KEY (worker, key))'
+        )
+        self.logger = logging.getLogger(__name__)
+    
+    def push(self, data: bytes, fingerprint: Optional[bytes] = None, priority: int = 0) -> bool:
+        """
+        请求入队
+        
+        参数:
+            data: 序列化的请求
+            fingerprint: 请求指纹，已见过的指纹不再入队；None表示不去重
+            priority: 优先级，越大越先出队
+        
+        返回:
+            bool: 是否入队，重复请求返回False
+        """
+        with self._transaction():
+            if fingerprint is not None:
+                cursor = self._conn.execute('INSERT OR IGNORE INTO seen VALUES (?)', (fingerprint,))
+                if not cursor.rowcount:
+                    return False
+            self._conn.execute(
+                'INSERT INTO requests (priority, data) VALUES (?, ?)', (priority, data)
+            )
+        return True
+    
+    def pop(self, worker: str) -> Optional[Tuple[int, bytes]]:
+        """
+        取出优先级最高的请求并租给工作进程
+        
+        参数:
+            worker: 工作进程标识
+        
+        返回:
+            Optional[Tuple[int, bytes]]: (请求ID, 序列化的请求)，队列为空时返回None
+        """
+        with self._transaction():
+            self._expire()
+            row = self._conn.execute(
+                'SELECT id, data FROM requests WHERE worker IS NULL '
+                'ORDER BY priority DESC, id LIMIT 1'
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                'UPDATE requests SET worker = ?, leased = ? WHERE id = ?',
+                (worker, time.time(), row[0])
+            )
+        return row[0], row[1]
+    
+    def ack(self, request_id: int) -> None:
+        """
+        确认请求已处理完成
+        
+        参数:
+            request_id: pop返回的请求ID
+        """
+        self._conn.execute('DELETE FROM requests WHERE id = ?', (request_id,))
+    
+    def ack_worker(self, worker: str) -> int:
+        """
+        确认工作进程租用的所有请求已处理完成
+        
+        参数:
+            worker: 工作进程标识
+        
+        返回:
+            int: 确认的请求数
+        """
+        return self._conn.execute('DELETE FROM requests WHERE worker = ?', (worker,)).rowcount
+    
+    def renew(self, worker: str) -> int:
+        """
+        续租工作进程租用的所有请求
+        
+        参数:
+            worker: 工作进程标识
+        
+        返回:
+            int: 续租的请求数
+        """
+        return self._conn.execute(
+            'UPDATE requests SET leased = ? WHERE worker = ?', (time.time(), worker)
+        ).rowcount
+    
+    def release(self, worker: str) -> int:
+        """
+        将工作进程租用的请求放回队列，供其他进程处理
+        
+        参数:
+            worker: 工作进程标识
+        
+        返回:
+            int: 放回的请求数
+        """
+        return self._conn.execute(
+            'UPDATE requests SET worker = NULL, leased = NULL WHERE worker = ?', (worker,)
+        ).rowcount
+    
+    def seen(self, fingerprint: bytes) -> bool:
+        """
+        指纹是否已见过
+        
+        参数:
+            fingerprint: 请求指纹
+        
+        返回:
+            bool: 是否已见过
+        """
+        query = 'SELECT 1 FROM seen WHERE fingerprint = ?'
+        return self._conn.execute(query, (fingerprint,)).fetchone() is not None
+    
+    def pending(self) -> int:
+        """等待出队的请求数"""
+        query = 'SELECT COUNT(*) FROM requests WHERE worker IS NULL'
+        return self._conn.execute(query).fetchone()[0]
+    
+    def in_progress(self, exclude: Optional[str] = None) -> int:
+        """
+        已租出未确认的请求数
+        
+        参数:
+            exclude: 不计入该工作进程租用的请求
+        
+        返回:
+            int: 请求数
+        """
+        with self._transaction():
+            self._expire()
+            return self._conn.execute(
+                'SELECT COUNT(*) FROM requests WHERE worker IS NOT NULL AND worker IS NOT ?',
+                (exclude,)
+            ).fetchone()[0]
+    
+    def set_stats(self, worker: str, stats: Dict[str, Any]) -> None:
+        """
+        保存工作进程的统计，只保存数值
+        
+        参数:
+            worker: 工作进程标识
+            stats: 统计字典
+        """
+        rows = [
+            (worker, key, value) for key, value in stats.items()
+            if isinstance(value, (int, float)) and not isinstance(value, bool)
+        ]
+        with self._transaction():
+            self._conn.execute('DELETE FROM stats WHERE worker = ?', (worker,))
+            self._conn.executemany('INSERT INTO stats VALUES (?, ?, ?)', rows)
+    
+    def stats(self, worker: Optional[str] = None) -> Dict[str, Any]:
+        """
+        获取统计
+        
+        参数:
+            worker: 工作进程标识，None表示汇总所有工作进程
+        
+        返回:
+            Dict[str, Any]: 统计字典，汇总时各项相加
+        """
+        if worker is None:
+            rows = self._conn.execute('SELECT key, SUM(value) FROM stats GROUP BY key ORDER BY key')
+        else:
+            rows = self._conn.execute(
+                'SELECT key, value FROM stats WHERE worker = ? ORDER BY key', (worker,)
+            )
+        return {key: int(value) if float(value).is_integer() else value for key, value in rows}
+    
+    def workers(self) -> List[str]:
+        """已保存统计的工作进程"""
+        rows = self._conn.execute('SELECT DISTINCT worker FROM stats ORDER BY worker')
+        return [row[0] for row in rows]
+    
+    def clear(self) -> None:
+        """清空请求、指纹和统计，开始新的抓取"""
+        with self._transaction():
+            for table in ('requests', 'seen', 'stats'):
+                self._conn.execute(f'DELETE FROM {table}')
+    
+    def close(self) -> None:
+        """关闭数据库"""
+        self._conn.close()
+    
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM requests').fetchone()[0]
+    
+    def _expire(self) -> None:
+        """租约超时的请求回到队列"""
+        cursor = self._conn.execute(
+            'UPDATE requests SET worker = NULL, leased = NULL '
+            'WHERE worker IS NOT NULL AND leased < ?',
+            (time.time() - self.lease_timeout,)
+        )
+        if cursor.rowcount:
+            self.logger.warning(f"{cursor.rowcount} 个请求租约超时，重新入队")
+    
+    def _transaction(self):
+        """写事务，开始时即获取写锁"""
+        return _Transaction(self._conn)
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE事务上下文，正常退出时提交，异常时回滚"""
+    
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+    
+    def __enter__(self):
+        self._conn.execute('BEGIN IMMEDIATE')
+        return self._conn
+    
+    def __exit__(self, exc_type, exc, tb):
+        self._conn.execute('ROLLBACK' if exc_type else 'COMMIT')
+        return False
+
+
+class FrontierScheduler(Scheduler):
+    """
+    共享队列调度器
+    
+    DrissionRequest放入DRISSIONPAGE_FRONTIER_PATH指定的共享队列，由所有工作进程共同消费，
+    按请求指纹在所有进程间去重；普通请求仍使用本进程的内存队列和去重过滤器。
+    起始请求忽略dont_filter按指纹去重，多个工作进程运行同一个爬虫时只入队一次。
+    
+    共享队列中还有其他进程未完成的请求时，空闲的工作进程不会关闭，继续等待新请求。
+    
+    请求至少处理一次：启用DrissionSpiderMiddleware时，回调输出全部消费后才确认请求，
+    未启用时收到响应即确认；被丢弃的请求立即确认，重试、重定向产生的新请求入队后确认原请求；
+    被中间件忽略、下载失败等交给errback的请求在本进程空闲时统一确认。
+    处理期间每 ``lease_timeout / 3`` 秒续租一次，工作进程在确认前退出时，
+    请求在租约超时后重新分配，回调可能重复执行。
+    关闭时保存本进程的统计，汇总结果通过 ``SharedFrontier.stats()`` 获取。
+    
+    启用方式::
+        
+        SCHEDULER = 'scrapy_drissionpage.frontier.FrontierScheduler'
+        DRISSIONPAGE_FRONTIER_PATH = 'frontier.db'
+    """
+    
+    @classmethod
+    def from_crawler(cls, crawler):
+        """
+        根据crawler创建调度器
+        
+        参数:
+            crawler (Crawler): Scrapy crawler对象
+        
+        返回:
+            FrontierScheduler: 调度器实例
+        """
+        scheduler = super().from_crawler(crawler)
+        settings = crawler.settings
+        path = settings.get('DRISSIONPAGE_FRONTIER_PATH')
+        if not path:
+            raise ValueError("使用FrontierScheduler需要设置DRISSIONPAGE_FRONTIER_PATH")
+        
+        scheduler.frontier = SharedFrontier(
+            path, lease_timeout=settings.getfloat('DRISSIONPAGE_FRONTIER_LEASE_TIMEOUT', 300)
+        )
+        scheduler.worker = (
+            settings.get('DRISSIONPAGE_FRONTIER_WORKER') or f'{socket.gethostname()}-{os.getpid()}'
+        )
+        scheduler.logger = logging.getLogger(__name__)
+        
+        # 启用爬虫中间件时回调处理完成后确认，否则收到响应即确认；交给errback的请求在空闲时确认
+        spider_middlewares = settings.getwithbase('SPIDER_MIDDLEWARES')
+        scheduler.ack_after_callback = spider_middlewares.get(SPIDER_MIDDLEWARE_PATH) is not None
+        crawler.signals.connect(scheduler._response_received, signal=signals.response_received)
+        crawler.signals.connect(scheduler._response_processed, signal=response_processed)
+        crawler.signals.connect(scheduler._request_dropped, signal=signals.request_dropped)
+        crawler.signals.connect(scheduler._spider_idle, signal=signals.spider_idle)
+        scheduler._renewal = task.LoopingCall(scheduler._renew)
+        return scheduler
+    
+    def open(self, spider):
+        """
+        打开调度器，开始定期续租
+        
+        参数:
+            spider: 爬虫实例
+        """
+        self._renewal.start(self.frontier.lease_timeout / 3, now=False)
+        return super().open(spider)
+    
+    def has_pending_requests(self) -> bool:
+        return super().has_pending_requests() or self.frontier.pending() > 0
+    
+    def enqueue_request(self, request) -> bool:
+        """
+        请求入队，DrissionRequest放入共享队列
+        
+        参数:
+            request (Request): 请求对象
+        
+        返回:
+            bool: 是否入队，重复请求返回False
+        """
+        # 快照请求携带已渲染的响应，留在本进程
+        if not isinstance(request, DrissionRequest) or 'drission_snapshot' in request.meta:
+            return super().enqueue_request(request)
+        
+        fingerprint = None
+        if not request.dont_filter or request.meta.get('is_start_request'):
+            fingerprint = self.crawler.request_fingerprinter.fingerprint(request)
+        
+        meta = {key: value for key, value in request.meta.items() if key != 'frontier_id'}
+        data = pickle.dumps(request.replace(meta=meta).to_dict(spider=self.spider), protocol=4)
+        if not self.frontier.push(data, fingerprint, request.priority):
+            self.df.log(request, self.spider)
+            return False
+        
+        # 重试、重定向产生的请求已入队，确认原请求
+        self._ack(request)
+        self.stats.inc_value('scheduler/enqueued/frontier')
+        self.stats.inc_value('scheduler/enqueued')
+        return True
+    
+    def next_request(self):
+        """
+        取出下一个请求，本进程的普通请求优先，然后从共享队列中取出DrissionRequest
+        
+        返回:
+            Optional[Request]: 请求对象，没有请求时返回None
+        """
+        request = super().next_request()
+        if request is not None:
+            return request
+        
+        leased = self.frontier.pop(self.worker)
+        if leased is None:
+            return None
+        request_id, data = leased
+        request = request_from_dict(pickle.loads(data), spider=self.spider)
+        request.meta['frontier_id'] = request_id
+        
+        self.stats.inc_value('scheduler/dequeued/frontier')
+        self.stats.inc_value('scheduler/dequeued')
+        return request
+    
+    def close(self, reason: str):
+        """
+        关闭调度器，保存统计；未完成时放回租用的请求
+        
+        参数:
+            reason: 关闭原因
+        """
+        if self._renewal.running:
+            self._renewal.stop()
+        if reason == 'finished':
+            self.frontier.ack_worker(self.worker)
+        else:
+            released = self.frontier.release(self.worker)
+            if released:
+                self.logger.info(
+                    f"工作进程 {self.worker} 关闭，{released} 个未完成的请求放回共享队列"
+                )
+        self.frontier.set_stats(self.worker, self.stats.get_stats())
+        self.frontier.close()
+        return super().close(reason)
+    
+    def __len__(self) -> int:
+        return super().__len__() + self.frontier.pending()
+    
+    def _ack(self, request) -> None:
+        """确认共享队列中的请求"""
+        request_id = request.meta.get('frontier_id')
+        if request_id is not None:
+            self.frontier.ack(request_id)
+    
+    def _response_received(self, response, request, spider) -> None:
+        """未启用DrissionSpiderMiddleware时，收到响应即确认对应的请求"""
+        if not self.ack_after_callback:
+            self._ack(request)
+    
+    def _response_processed(self, response, spider) -> None:
+        """响应的回调输出消费完毕后确认对应的请求"""
+        self._ack(response.request)
+    
+    def _request_dropped(self, request, spider) -> None:
+        """确认被丢弃的请求"""
+        self._ack(request)
+    
+    def _renew(self) -> None:
+        """续租本进程处理中的请求"""
+        try:
+            self.frontier.renew(self.worker)
+        except sqlite3.Error as e:
+            self.logger.warning(f"续租共享队列中的请求失败: {e}")
+    
+    def _spider_idle(self, spider) -> None:
+        """
+        爬虫空闲时本进程的请求都已处理完，全部确认；其他进程还有未完成的请求时不关闭爬虫
+        """
+        self.frontier.ack_worker(self.worker)
+        if self.frontier.in_progress(exclude=self.worker):
+            raise DontCloseSpider
+        # 本进程空闲期间其他进程可能已推入新请求
+        if self.frontier.pending():
+            raise DontCloseSpider
+
+
+def _run_worker(spidercls, settings: Dict[str, Any], spider_kwargs: Dict[str, Any]) -> None:
+    """工作进程入口，运行一个独立的CrawlerProcess"""
+    from scrapy.crawler import CrawlerProcess
+    from scrapy.utils.project import get_project_settings
+    
+    project_settings = get_project_settings()
+    project_settings.setdict(settings, priority='cmdline')
+    process = CrawlerProcess(project_settings)
+    process.crawl(spidercls, **spider_kwargs)
+    process.start()
+
+
+def run_workers(
+    spidercls,
+    workers: int = 2,
+    settings: Optional[Dict[str, Any]] = None,
+    reset: bool = True,
+    **spider_kwargs
+) -> Dict[str, Any]:
+    """
+    启动多个工作进程共同运行爬虫，等待全部结束后返回汇总统计
+    
+    每个工作进程有独立的reactor和BrowserManager。设置了DRISSIONPAGE_CONNECT_ENDPOINTS时
+    端点轮流分给各工作进程；DRISSIONPAGE_INIT_MODE为connect且端口为整数时，第i个工作进程
+    连接端口 DRISSIONPAGE_CONNECT_PORT + i
+    
+    参数:
+        spidercls: 爬虫类，需要能在子进程中导入
+        workers: 工作进程数
+        settings: 设置字典，需要包含DRISSIONPAGE_FRONTIER_PATH
+        reset: 是否先清空共享队列中上次抓取的请求、指纹和统计
+        **spider_kwargs: 传给爬虫的参数
+    
+    返回:
+        Dict[str, Any]: 所有工作进程相加的统计
+    """
+    if workers < 1:
+        raise ValueError(f"工作进程数必须大于0: {workers}")
+    settings = dict(settings or {})
+    path = settings.get('DRISSIONPAGE_FRONTIER_PATH')
+    if not path:
+        raise ValueError("run_workers需要设置DRISSIONPAGE_FRONTIER_PATH")
+    settings['SCHEDULER'] = 'scrapy_drissionpage.frontier.FrontierScheduler'
+    
+    frontier = SharedFrontier(path)
+    if reset:
+        frontier.clear()
+    
+    endpoints = list(settings.get('DRISSIONPAGE_CONNECT_ENDPOINTS') or [])
+    port = settings.get('DRISSIONPAGE_CONNECT_PORT', 9222)
+    # spawn启动的子进程不继承父进程的reactor
+    context = multiprocessing.get_context('spawn')
+    processes = []
+    for index in range(workers):
+        worker_settings = dict(settings, DRISSIONPAGE_FRONTIER_WORKER=f'worker-{index}')
+        if endpoints:
+            assigned = endpoints[index::workers] or [endpoints[index % len(endpoints)]]
+            worker_settings['DRISSIONPAGE_CONNECT_ENDPOINTS'] = assigned
+        elif settings.get('DRISSIONPAGE_INIT_MODE') == 'connect' and isinstance(port, int):
+            worker_settings['DRISSIONPAGE_CONNECT_PORT'] = port + index
+        process = context.Process(
+            target=_run_worker,
+            args=(spidercls, worker_settings, spider_kwargs),
+            name=f'drission-worker-{index}',
+        )
+        process.start()
+        processes.append(process)
+    
+    for process in processes:
+        process.join()
+        if process.exitcode:
+            logging.getLogger(__name__).warning(
+                f"工作进程 {process.name} 异常退出: {process.exitcode}"
+            )
+    
+    try:
+        return frontier.stats()
+    finally:
+        frontier.close()
@@ -0,0 +1,207 @@
+"""
+无限滚动采集 - 用MutationObserver缓存新增节点，每次滚动只取回增量；以及无动画的快速滚动和按方向滚动
+"""
+
+import json
+import logging
+from typing import Optional, List, Iterator
+
+
+# 安装MutationObserver，缓存新增的元素节点(已缓存节点的后代不重复记录)
+INSTALL_JS = '''function(itemSelector, containerSelector) {
+    if (window.__sdpHarvest) window.__sdpHarvest.observer.disconnect();
+    const root = containerSelector ? document.querySelector(containerSelector) : document.body;
+    if (!root) return false;
+    const state = {buffer: [], seen: new WeakSet(), root: root};
+    function record(node) {
+        for (let p = node.parentElement; p; p = p.parentElement) {
+            if (state.seen.has(p)) return;
+        }
+        state.seen.add(node);
+        state.buffer.push(node);
+    }
+    state.observer = new MutationObserver(function(mutations) {
+        for (const m of mutations) {
+            for (const node of m.addedNodes) {
+                if (node.nodeType !== 1) continue;
+                if (!itemSelector) { record(node); continue; }
+                if (node.matches(itemSelector)) record(node);
+                else node.querySelectorAll(itemSelector).forEach(record);
+            }
+        }
+    });
+    state.observer.observe(root, {childList: true, subtree: true});
+    window.__sdpHarvest = state;
+    return true;
+}'''
+
+# 滚动到底部(无平滑动画)
+SCROLL_JS = '''function() {
+    const state = window.__sdpHarvest;
+    const el = state && state.root !== document.body ? state.root : document.scrollingElement;
+    el.scrollTop = el.scrollHeight;
+}'''
+
+# 取出并清空缓存，只序列化本次新增的节点
+DRAIN_JS = '''function() {
+    const state = window.__sdpHarvest;
+    if (!state) return '[]';
+    const nodes = state.buffer.splice(0);
+    return JSON.stringify(nodes.map(n => n.outerHTML));
+}'''
+
+# 按视口高度瞬间跳转到底部，每一步让出一帧，使IntersectionObserver懒加载得以触发
+# 后台标签页中requestAnimationFrame可能被暂停，因此同时设置超时兜底
+FAST_SCROLL_JS = '''async function(selector, maxSteps) {
+    const el = selector ? document.querySelector(selector) : document.scrollingElement;
+    if (!el) return -1;
+    const frame = () => new Promise(resolve => {
+        requestAnimationFrame(() => setTimeout(resolve, 0));
+        setTimeout(resolve, 50);
+    });
+    let steps = 0;
+    while (steps < maxSteps && el.scrollTop + el.clientHeight < el.scrollHeight - 1) {
+        el.scrollTo({top: el.scrollTop + el.clientHeight, behavior: 'instant'});
+        steps++;
+        await frame();
+    }
+    return steps;
+}'''
+
+# 按方向滚动整个页面，通过behavior指定是否平滑，不修改页面的scroll-behavior样式；
+# 平滑滚动时等待scrollend事件，不支持该事件的浏览器最多等待1秒
+SCROLL_PAGE_JS = '''async function(direction, distance, smooth) {
+    const el = document.scrollingElement || document.documentElement;
+    const options = {behavior: smooth ? 'smooth' : 'instant'};
+    if (direction === 'down') options.top = distance ? el.scrollTop + distance : el.scrollHeight;
+    else if (direction === 'up') options.top = distance ? el.scrollTop - distance : 0;
+    else if (direction === 'left') options.left = el.scrollLeft - distance;
+    else if (direction === 'right') options.left = el.scrollLeft + distance;
+    else return;
+    if (!smooth) { el.scrollTo(options); return; }
+    await new Promise(resolve => {
+        document.addEventListener('scrollend', resolve, {once: true});
+        setTimeout(resolve, 1000);
+        el.scrollTo(options);
+    });
+}'''
+
+# 停止监听并清理
+STOP_JS = '''function() {
+    const state = window.__sdpHarvest;
+    if (state) { state.observer.disconnect(); delete window.__sdpHarvest; }
+}'''
+
+
+def scroll(page, direction: str = 'down', distance: Optional[int] = None,
+           locator: Optional[str] = None, smooth: bool = False) -> None:
+    """
+    滚动页面或元素，供DrissionResponse.scroll和scroll动作共用
+    
+    滚动整个页面时在脚本中指定滚动行为，不修改标签页的平滑滚动设置
+    
+    参数:
+        page: 标签页对象
+        direction: 滚动方向，'up', 'down', 'left', 'right'
+        distance: 滚动距离，None表示滚动到顶部/底部(水平方向页面默认300像素，元素默认100像素)
+        locator: 元素定位符，None表示滚动整个页面
+        smooth: 滚动整个页面时是否使用平滑滚动动画
+    """
+    if direction not in ('up', 'down', 'left', 'right'):
+        raise ValueError(f"不支持的滚动方向: {direction}")
+    
+    if locator is None:
+        if direction in ('left', 'right'):
+            distance = distance or 300
+        page.run_js(SCROLL_PAGE_JS, direction, distance, smooth)
+        return
+    
+    target = page.ele(locator)
+    if direction == 'down':
+        target.scroll.down(distance) if distance else target.scroll.to_bottom()
+    elif direction == 'up':
+        target.scroll.up(distance) if distance else target.scroll.to_top()
+    elif direction == 'left':
+        target.scroll.left(distance or 100)
+    else:
+        target.scroll.right(distance or 100)
+
+
+class ScrollHarvester:
+    """
+    无限滚动采集器
+    
+    反复滚动到底部，直到连续若干次没有新内容或达到最大次数。每次滚动只返回新增的节点，
+    避免每次都重新读取整个 ``page.html``
+    """
+    
+    def __init__(
+        self,
+        page,
+        item_selector: Optional[str] = None,
+        container: Optional[str] = None,
+        max_steps: int = 50,
+        idle_steps: int = 2,
+        interval: float = 0.5
+    ):
+        """
+        初始化采集器
+        
+        参数:
+            page: 标签页对象
+            item_selector: 只记录匹配该CSS选择器的新增节点，None表示记录所有新增元素
+            container: 滚动容器的CSS选择器，None表示整个页面
+            max_steps: 最大滚动次数
+            idle_steps: 连续多少次没有新内容时停止
+            interval: 每次滚动后等待新内容的时间(秒)
+        """
+        self.page = page
+        self.item_selector = item_selector
+        self.container = container
+        self.max_steps = max_steps
+        self.idle_steps = idle_steps
+        self.interval = interval
+        self.logger = logging.getLogger(__name__)
+    
+    def deltas(self) -> Iterator[List[str]]:
+        """
+        逐次滚动并返回新增节点
+        
+        返回:
+            Iterator[List[str]]: 每次滚动新增节点的HTML列表
+        """
+        if not self.page.run_js(INSTALL_JS, self.item_selector, self.container):
+            raise ValueError(f"未找到滚动容器: {self.container}")
+        
+        idle = 0
+        try:
+            for step in range(self.max_steps):
+                self.page.run_js(SCROLL_JS)
+                self.page.wait(self.interval)
+                
+                nodes = json.loads(self.page.run_js(DRAIN_JS))
+                if not nodes:
+                    idle += 1
+                    if idle >= self.idle_steps:
+                        self.logger.debug(f"连续 {idle} 次没有新内容，停止滚动")
+                        break
+                    continue
+                
+                idle = 0
+                self.logger.debug(f"第 {step + 1} 次滚动新增 {len(nodes)} 个节点")
+                yield nodes
+        finally:
+            self.page.run_js(STOP_JS)
+    
+    @staticmethod
+    def wrap(nodes: List[str]) -> str:
+        """
+        将新增节点包装为HTML文档
+        
+        参数:
+            nodes: 新增节点的HTML列表
+        
+        返回:
+            str: HTML文档
+        """
+        return '<html><body>' + ''.join(nodes) + '</body></html>'
@@ -2,17 +2,30 @@
 DrissionPage 中间件 - 处理 DrissionRequest 请求
 """
 
+import asyncio
 import logging
-from typing import Optional, Dict, Any, Union, Callable, TypeVar
+from threading import RLock
+from typing import (
+    Optional, Dict, Any, Union, Callable, TypeVar, List, Tuple, Iterable, AsyncIterable
+)
 
 from scrapy import signals
 from scrapy.http import Request, Response
 from scrapy.crawler import Crawler
+from scrapy.exceptions import IgnoreRequest
 from scrapy.spiders import Spider
+from scrapy.utils.defer import deferred_from_coro
+from scrapy.utils.request import fingerprint
+from twisted.internet.defer import Deferred
 
+from .actions import ActionRunner
+from .async_cdp import AsyncBrowserManager
 from .browser_manager import BrowserManager
+from .config import BrowserConfig
+from .recrawl import ValidatorStore
 from .request import DrissionRequest
 from .response import DrissionResponse
+from .signals import response_processed
 
 # 定义类型变量
 SpiderType = TypeVar('SpiderType', bound=Spider)
@@ -30,6 +43,18 @@ class DrissionPageMiddleware:
         """初始化中间件"""
         # 存储每个爬虫的浏览器管理器
         self.browser_managers: Dict[str, BrowserManager] = {}
+        # 存储每个爬虫的asyncio CDP浏览器管理器(DRISSIONPAGE_ENGINE = 'cdp')
+        self.async_browser_managers: Dict[str, AsyncBrowserManager] = {}
+        # 存储每个爬虫解析后的浏览器配置
+        self.browser_configs: Dict[str, BrowserConfig] = {}
+        self.action_runner = ActionRunner()
+        # 记录已设置视口的标签页，后续请求未指定视口时恢复默认
+        self._viewports: Dict[str, Dict[str, Any]] = {}
+        # 存储每个爬虫的增量重爬校验信息(DRISSIONPAGE_RECRAWL_STORE)
+        self.validator_stores: Dict[str, ValidatorStore] = {}
+        # 会话模式共享同一个SessionPage，请求和读取响应需在锁内完成
+        self.session_lock = RLock()
+        self.crawler: Optional[Crawler] = None
         self.logger = logging.getLogger(__name__)
     
     @classmethod
@@ -45,6 +70,7 @@ class DrissionPageMiddleware:
         """
         # 创建中间件实例
         middleware = cls()
+        middleware.crawler = crawler
         
         # 注册信号处理器
         crawler.signals.connect(middleware.spider_opened, signal=signals.spider_opened)
@@ -54,21 +80,25 @@ class DrissionPageMiddleware:
     
     def spider_opened(self, spider: SpiderType) -> None:
         """
-        爬虫开启时调用
+        爬虫开启时调用，解析并校验浏览器配置，设置非法时抛出ValueError
         
         参数:
             spider: 爬虫实例
         """
         self.logger.info(f"爬虫 {spider.name} 已开启")
+        self._get_browser_config(spider)
     
-    def spider_closed(self, spider: SpiderType) -> None:
+    def spider_closed(self, spider: SpiderType) -> Optional[Deferred]:
         """
         爬虫关闭时调用
         
         参数:
             spider: 爬虫实例
+        
+        返回:
+            Deferred: 使用cdp引擎时，关闭浏览器连接的Deferred
         """
-        # 关闭浏览器管理器
+        # 关闭中间件自行创建的浏览器管理器，Crawler共享的实例在引擎停止时关闭
         if spider.name in self.browser_managers:
             self.logger.info(f"关闭爬虫 {spider.name} 的浏览器管理器")
             try:
@@ -76,6 +106,18 @@ class DrissionPageMiddleware:
                 del self.browser_managers[spider.name]
             except Exception as e:
                 self.logger.error(f"关闭浏览器管理器时出错: {e}")
+        
+        # 保存增量重爬校验信息
+        if spider.name in self.validator_stores:
+            self.validator_stores.pop(spider.name).close()
+        self.browser_configs.pop(spider.name, None)
+        
+        # 关闭cdp引擎的浏览器管理器
+        if spider.name in self.async_browser_managers:
+            self.logger.info(f"关闭爬虫 {spider.name} 的CDP浏览器管理器")
+            async_manager = self.async_browser_managers.pop(spider.name)
+            return deferred_from_coro(async_manager.close())
+        return None
     
     def process_request(
         self, request: Request, spider: SpiderType
@@ -92,11 +134,39 @@ class DrissionPageMiddleware:
             Response: 跳过下载器，直接返回响应
             Request: 替换原请求
         """
+        # 快照请求直接返回渲染时记录的快照响应，见DrissionSpiderMiddleware
+        snapshot = request.meta.pop('drission_snapshot', None)
+        if snapshot is not None:
+            snapshot.request = request
+            return snapshot
+        
         # 只处理 DrissionRequest
         if not isinstance(request, DrissionRequest):
             return None
         
+        # 使用DrissionPageDownloader时由下载器在自己的槽位和工作线程中渲染
+        if self._rendered_by_downloader():
+            return None
+        
+        return self.render(request, spider)
+    
+    def render(
+        self, request: DrissionRequest, spider: SpiderType, tab=None
+    ) -> Union[DrissionResponse, Any]:
+        """
+        渲染DrissionRequest
+        
+        参数:
+            request: 请求对象
+            spider: 爬虫实例
+            tab: 使用的标签页，None表示身份标识对应的上下文中的标签页，
+                没有身份标识时为浏览器的最新标签页
+        
+        返回:
+            DrissionResponse: 响应对象；使用cdp引擎时为返回响应的协程
+        """
         self.logger.debug(f"处理 DrissionRequest: {request.url}")
+        context = None
         
         try:
             # 获取浏览器管理器
@@ -105,10 +175,30 @@ class DrissionPageMiddleware:
             # 获取页面类型和配置
             drission_meta = request.meta.get('drission', {})
             page_type = drission_meta.get('page_type', 'chromium')
-            load_mode = drission_meta.get('load_mode')
+            # 合并请求覆盖的加载模式和超时，非法的值在这里抛出ValueError
+            config = self._get_browser_config(spider).merge(drission_meta)
+            load_mode = config.load_mode if drission_meta.get('load_mode') else None
             wait_time = drission_meta.get('wait_time')
             wait_element = drission_meta.get('wait_element')
-            timeout = drission_meta.get('timeout')
+            timeout = config.timeout
+            actions = drission_meta.get('actions')
+            snapshots: List[Tuple[str, str]] = []
+            action_results: List[Any] = []
+            
+            # 使用原生asyncio CDP引擎渲染
+            if page_type == 'chromium' and self._engine(spider) == 'cdp':
+                # cdp引擎只支持导航、等待和视口，其他选项不能静默忽略
+                unsupported = [name for name in ('identity', 'actions') if drission_meta.get(name)]
+                if 'proxy' in request.meta:
+                    unsupported.append('proxy')
+                if unsupported:
+                    raise ValueError(f"cdp引擎不支持以下请求选项: {', '.join(unsupported)}")
+                return self._process_request_cdp(request, spider)
+            
+            # 会话模式共用同一个SessionPage，无法按身份隔离Cookie
+            identity = drission_meta.get('identity')
+            if page_type == 'session' and identity is not None:
+                raise ValueError("会话模式不支持identity，所有会话模式请求共享同一个会话")
             
             # 设置代理
             if 'proxy' in request.meta:
@@ -116,22 +206,34 @@ class DrissionPageMiddleware:
                 self.logger.debug(f"为请求设置代理: {proxy}")
                 browser_manager.set_proxy(proxy)
             
+            # 指定了身份标识时使用该身份独占的隔离上下文
+            if page_type == 'chromium' and tab is None and identity is not None:
+                context = browser_manager.contexts.acquire(identity)
+                tab = context.tab
+            
+            # 增量重爬：未修改或主文档未变化时跳过渲染
+            recrawl = self._check_recrawl(request, spider, browser_manager, drission_meta, tab)
+            probe_page = recrawl.pop('session') if recrawl is not None else None
+            
             # 根据页面类型获取页面
             if page_type == 'chromium':
                 # 获取浏览器实例
                 browser = browser_manager.get_browser()
                 
+                # 未指定标签页时使用当前标签页
+                page = tab if tab is not None else browser.latest_tab
+                
                 # 设置加载模式(如果指定)
                 if load_mode:
+                    target = tab if tab is not None else browser
                     if load_mode == 'eager':
-                        browser.set.load_mode.eager()
+                        target.set.load_mode.eager()
                     elif load_mode == 'none':
-                        browser.set.load_mode.none()
+                        target.set.load_mode.none()
                     elif load_mode == 'normal':
-                        browser.set.load_mode.normal()
+                        target.set.load_mode.normal()
                 
-                # 获取当前标签页
-                page = browser.latest_tab
+                self._apply_viewport(page, drission_meta.get('viewport'))
                 
                 # 访问URL
                 page.get(request.url, timeout=timeout)
@@ -143,28 +245,412 @@ class DrissionPageMiddleware:
                 # 等待特定元素出现(4.0新特性)
                 if wait_element:
                     page.wait.ele_loaded(wait_element)
+                
+                # 在同一标签页中执行请求动作
+                if actions:
+                    snapshots, action_results = self.action_runner.run(page, actions)
                     
             elif page_type == 'session':
+                if actions:
+                    raise ValueError("会话模式不支持请求动作")
+                
                 # 获取会话实例
                 page = browser_manager.get_session()
                 
-                # 访问URL
-                page.get(request.url, timeout=timeout)
+                # 请求头、请求体和cookies原样发送(如接口重放请求)
+                session_kwargs = self._session_kwargs(request, drission_meta)
+                
+                # 访问URL(增量重爬检查已经取得的页面直接使用)
+                if probe_page is not None:
+                    page = probe_page
+                elif request.method == 'GET':
+                    page.get(request.url, timeout=timeout, **session_kwargs)
+                elif request.method == 'POST':
+                    page.post(request.url, timeout=timeout, **session_kwargs)
+                else:
+                    # 其他方法(如重放的PUT、PATCH、DELETE接口)通过底层requests会话发送，
+                    # 结果不写入会话页面，响应不关联页面对象
+                    raw = page.session.request(
+                        request.method, request.url,
+                        timeout=timeout or page.timeout, **session_kwargs
+                    )
+                    page_url, page_html, page = raw.url, raw.text, None
             else:
                 raise ValueError(f"不支持的页面类型: {page_type}")
             
+            if page is not None:
+                page_url, page_html = page.url, page.html
+            
             # 创建响应
-            self.logger.debug(f"创建 DrissionResponse: {page.url}")
-            return DrissionResponse(
-                url=page.url,
-                body=page.html.encode('utf-8'),
-                request=request,
-                page=page
+            self.logger.debug(f"创建 DrissionResponse: {page_url}")
+            spool = self._spool_options(spider)
+            response = DrissionResponse.from_html(
+                page_url, page_html, request=request, page=page, **spool
             )
+            
+            # 上下文归还后会交给同一身份的后续请求，响应只保留渲染结果，不再关联其中的标签页
+            if context is not None:
+                response.release_page()
+            
+            # 快照作为独立响应，由DrissionSpiderMiddleware作为请求重新交给引擎
+            if actions:
+                response.action_results = action_results
+                response.snapshots = [
+                    DrissionResponse.from_html(
+                        url, html, request=request, flags=['snapshot'], **spool
+                    )
+                    for url, html in snapshots
+                ]
+            
+            # 渲染成功后保存校验信息，首次抓取的会话模式请求直接使用本次响应的校验信息
+            if recrawl is not None:
+                store = self._get_validator_store(spider)
+                if recrawl['content_hash'] is None and page_type == 'session' and page is not None:
+                    raw = page.response
+                    if raw is not None and raw.status_code == 200:
+                        recrawl.update(self._validators(store, raw))
+                store.put(**recrawl)
+            return response
+        except IgnoreRequest:
+            raise
         except Exception as e:
             self.logger.error(f"处理 DrissionRequest 时出错: {e}", exc_info=True)
             # 重新抛出异常，让 Scrapy 处理
             raise
+        finally:
+            if context is not None:
+                browser_manager.contexts.release(context)
+    
+    def _rendered_by_downloader(self) -> bool:
+        """当前Crawler是否使用DrissionPageDownloader渲染DrissionRequest"""
+        engine = getattr(self.crawler, 'engine', None)
+        downloader = getattr(engine, 'downloader', None)
+        return getattr(downloader, 'renders_drission_requests', False) is True
+    
+    @staticmethod
+    def _engine(spider: SpiderType) -> str:
+        """
+        获取浏览器模式使用的引擎
+        
+        参数:
+            spider: 爬虫实例
+        
+        返回:
+            str: 'drissionpage'或'cdp'
+        """
+        engine = spider.settings.get('DRISSIONPAGE_ENGINE', 'drissionpage')
+        if engine not in ('drissionpage', 'cdp'):
+            raise ValueError(f"不支持的浏览器引擎: {engine}")
+        return engine
+    
+    def _get_validator_store(self, spider: SpiderType) -> Optional[ValidatorStore]:
+        """
+        获取增量重爬校验信息存储
+        
+        参数:
+            spider: 爬虫实例
+        
+        返回:
+            Optional[ValidatorStore]: 未设置DRISSIONPAGE_RECRAWL_STORE时返回None
+        """
+        if spider.name not in self.validator_stores:
+            path = spider.settings.get('DRISSIONPAGE_RECRAWL_STORE')
+            if not path:
+                return None
+            self.logger.info(f"使用增量重爬存储: {path}")
+            self.validator_stores[spider.name] = ValidatorStore(path)
+        return self.validator_stores[spider.name]
+    
+    def _check_recrawl(
+        self, request: Request, spider: SpiderType, browser_manager: BrowserManager,
+        drission_meta: Dict[str, Any], tab=None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        用会话模式发送条件请求，检查页面自上次抓取后是否变化
+        
+        只有保存过校验信息的页面才发送检查请求，浏览器模式的请求同时带上浏览器中该URL的Cookie。
+        服务器返回304，或主文档哈希与上次相同时抛出IgnoreRequest；否则返回待保存的校验信息，
+        其中的session为已取得页面的会话，会话模式请求直接使用，无需再次请求。
+        
+        浏览器模式的检查在多个渲染线程中并发执行，每次检查单独发送请求并使用返回的响应对象，
+        不写入共享的会话页面；会话模式的检查在session_lock内通过会话页面发送
+        
+        参数:
+            request: 请求对象
+            spider: 爬虫实例
+            browser_manager: 浏览器管理器
+            drission_meta: drission元数据
+            tab: 渲染使用的标签页，None表示浏览器的默认上下文
+        
+        返回:
+            Optional[Dict[str, Any]]: 校验信息，未启用或不适用时返回None
+        """
+        if request.method != 'GET' or request.meta.get('dont_recrawl_check'):
+            return None
+        store = self._get_validator_store(spider)
+        if store is None:
+            return None
+        
+        if self.crawler:
+            fp = self.crawler.request_fingerprinter.fingerprint(request)
+        else:
+            fp = fingerprint(request)
+        record = store.get(fp)
+        
+        # 首次抓取不发送检查请求，渲染后保存记录，下次抓取时再检查
+        if record is None:
+            return {
+                'fingerprint': fp,
+                'url': request.url,
+                'etag': None,
+                'last_modified': None,
+                'content_hash': None,
+                'session': None,
+            }
+        
+        kwargs = self._session_kwargs(request, drission_meta)
+        kwargs['headers'] = {**kwargs.get('headers', {}), **store.conditional_headers(record)}
+        page_type = drission_meta.get('page_type', 'chromium')
+        session = browser_manager.get_session()
+        timeout = drission_meta.get('timeout')
+        
+        if page_type == 'session':
+            # 304没有响应体，不重试；取得的页面直接作为本次抓取的结果
+            with self.session_lock:
+                session.get(request.url, timeout=timeout, retry=0, interval=0, **kwargs)
+                probe = session.response
+        else:
+            source = tab if tab is not None else browser_manager.get_browser()
+            cookies = self._browser_cookies(source, request.url)
+            kwargs['cookies'] = {**cookies, **kwargs.get('cookies', {})}
+            try:
+                probe = session.session.get(
+                    request.url, timeout=timeout or session.timeout, **kwargs
+                )
+            except Exception as e:
+                self.logger.debug(f"增量重爬检查请求失败: {request.url}: {e}")
+                probe = None
+        if probe is None:
+            return None
+        
+        stats = self.crawler.stats if self.crawler else None
+        if probe.status_code == 304:
+            if stats:
+                stats.inc_value('drissionpage/recrawl/not_modified')
+            raise IgnoreRequest(f"页面未修改(304): {request.url}")
+        if probe.status_code != 200:
+            return None
+        
+        validators = self._validators(store, probe)
+        if record['content_hash'] == validators['content_hash']:
+            store.put(fp, request.url, **validators)
+            if stats:
+                stats.inc_value('drissionpage/recrawl/unchanged')
+            raise IgnoreRequest(f"主文档未变化: {request.url}")
+        
+        return {
+            'fingerprint': fp,
+            'url': request.url,
+            **validators,
+            'session': session if page_type == 'session' else None,
+        }
+    
+    @staticmethod
+    def _validators(store: ValidatorStore, raw) -> Dict[str, Any]:
+        """
+        从主文档响应中取出校验信息
+        
+        参数:
+            store: 校验信息存储
+            raw: requests响应对象
+        
+        返回:
+            Dict[str, Any]: etag、last_modified和content_hash
+        """
+        return {
+            'etag': raw.headers.get('ETag'),
+            'last_modified': raw.headers.get('Last-Modified'),
+            'content_hash': store.content_hash(raw.content),
+        }
+    
+    def _browser_cookies(self, page, url: str) -> Dict[str, str]:
+        """
+        获取浏览器中发送到指定URL的Cookie
+        
+        参数:
+            page: 浏览器或标签页对象
+            url: 请求URL
+        
+        返回:
+            Dict[str, str]: Cookie名到值的字典，获取失败时为空
+        """
+        try:
+            cookies = page.run_cdp('Network.getCookies', urls=[url])['cookies']
+        except Exception as e:
+            self.logger.debug(f"获取浏览器Cookie失败: {e}")
+            return {}
+        return {cookie['name']: cookie['value'] for cookie in cookies}
+    
+    @staticmethod
+    def _spool_options(spider: SpiderType) -> Dict[str, Any]:
+        """
+        获取大页面溢出到临时文件的设置
+        
+        参数:
+            spider: 爬虫实例
+        
+        返回:
+            Dict[str, Any]: DrissionResponse.from_html的spool_threshold和spool_dir参数
+        """
+        return {
+            'spool_threshold': int(spider.settings.get('DRISSIONPAGE_SPOOL_THRESHOLD', 0) or 0),
+            'spool_dir': spider.settings.get('DRISSIONPAGE_SPOOL_DIR'),
+        }
+    
+    async def _process_request_cdp(self, request: Request, spider: SpiderType) -> DrissionResponse:
+        """
+        使用原生asyncio CDP引擎处理浏览器模式请求
+        
+        需要Scrapy使用asyncio reactor，渲染期间不占用线程
+        
+        参数:
+            request: 请求对象
+            spider: 爬虫实例
+        
+        返回:
+            DrissionResponse: 渲染后的响应，不关联页面对象
+        """
+        drission_meta = request.meta.get('drission', {})
+        manager = self._get_async_browser_manager(spider)
+        config = self._get_browser_config(spider).merge(drission_meta)
+        
+        tab = await manager.acquire_tab()
+        try:
+            change = self._viewport_change(tab.tab_id, drission_meta.get('viewport'))
+            if change is not None:
+                await tab.send(change[0], **change[1])
+            
+            await tab.get(request.url, timeout=config.timeout, load_mode=config.load_mode)
+            
+            if drission_meta.get('wait_time') is not None:
+                await asyncio.sleep(drission_meta['wait_time'])
+            
+            if drission_meta.get('wait_element'):
+                await tab.wait_ele(drission_meta['wait_element'])
+            
+            url = await tab.url()
+            html = await tab.html()
+        except Exception as e:
+            self.logger.error(f"CDP引擎处理 DrissionRequest 时出错: {e}", exc_info=True)
+            raise
+        finally:
+            manager.release_tab(tab)
+        
+        self.logger.debug(f"创建 DrissionResponse: {url}")
+        return DrissionResponse.from_html(url, html, request=request, **self._spool_options(spider))
+    
+    def _apply_viewport(self, page, viewport: Optional[Dict[str, Any]]) -> None:
+        """
+        为标签页设置或恢复视口大小
+        
+        参数:
+            page: 标签页对象
+            viewport: 请求的视口参数，None表示使用默认视口
+        """
+        change = self._viewport_change(page.tab_id, viewport)
+        if change is not None:
+            page.run_cdp(change[0], **change[1])
+    
+    def _viewport_change(
+        self, tab_id: str, viewport: Optional[Dict[str, Any]]
+    ) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        计算标签页需要执行的视口命令
+        
+        参数:
+            tab_id: 标签页ID
+            viewport: 请求的视口参数，None表示使用默认视口
+        
+        返回:
+            Tuple: (CDP命令, 参数字典)，视口无需变化时返回None
+        """
+        if viewport:
+            if self._viewports.get(tab_id) == viewport:
+                return None
+            self._viewports[tab_id] = viewport
+            return 'Emulation.setDeviceMetricsOverride', viewport
+        if self._viewports.pop(tab_id, None) is not None:
+            return 'Emulation.clearDeviceMetricsOverride', {}
+        return None
+    
+    def _get_browser_config(self, spider: SpiderType) -> BrowserConfig:
+        """
+        获取爬虫的浏览器配置，首次调用时解析设置
+        
+        参数:
+            spider: 爬虫实例
+        
+        返回:
+            BrowserConfig: 浏览器配置
+        """
+        config = self.browser_configs.get(spider.name)
+        if config is None:
+            # 有Crawler时与共享的浏览器管理器使用同一个配置
+            if self.crawler is not None:
+                config = BrowserManager.from_crawler(self.crawler).config
+            else:
+                config = BrowserConfig.from_settings(spider.settings)
+            self.browser_configs[spider.name] = config
+        return config
+    
+    def _get_async_browser_manager(self, spider: SpiderType) -> AsyncBrowserManager:
+        """
+        获取cdp引擎的浏览器管理器
+        
+        有Crawler时使用Crawler共享的实例
+        
+        参数:
+            spider: 爬虫实例
+        
+        返回:
+            AsyncBrowserManager: 浏览器管理器实例
+        """
+        if self.crawler is not None:
+            return AsyncBrowserManager.from_crawler(self.crawler)
+        
+        if spider.name not in self.async_browser_managers:
+            self.logger.info(f"为爬虫 {spider.name} 创建新的CDP浏览器管理器")
+            self.async_browser_managers[spider.name] = AsyncBrowserManager(spider.settings)
+        return self.async_browser_managers[spider.name]
+    
+    @staticmethod
+    def _session_kwargs(request: Request, drission_meta: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        生成会话模式请求的连接参数
+        
+        参数:
+            request: 请求对象
+            drission_meta: drission元数据
+        
+        返回:
+            Dict[str, Any]: 传给SessionPage.get/post或requests会话的参数
+        """
+        kwargs: Dict[str, Any] = {}
+        
+        headers = drission_meta.get('headers')
+        if headers:
+            kwargs['headers'] = dict(headers)
+        
+        if request.cookies:
+            if isinstance(request.cookies, dict):
+                kwargs['cookies'] = dict(request.cookies)
+            else:
+                kwargs['cookies'] = {c['name']: c['value'] for c in request.cookies}
+        
+        if request.method != 'GET' and request.body:
+            kwargs['data'] = request.body
+        
+        return kwargs
     
     def _get_browser_manager(self, spider: SpiderType) -> BrowserManager:
         """
@@ -177,9 +663,13 @@ class DrissionPageMiddleware:
             BrowserManager: 浏览器管理器实例
         """
         # 如果爬虫已有浏览器管理器，直接使用
-        if hasattr(spider, '_browser_manager'):
+        if getattr(spider, '_browser_manager', None) is not None:
             return spider._browser_manager
         
+        # 使用Crawler共享的浏览器管理器，与爬虫和下载器使用同一个浏览器
+        if self.crawler is not None:
+            return BrowserManager.from_crawler(self.crawler)
+        
         # 如果缓存中已有，直接返回
         if spider.name in self.browser_managers:
             return self.browser_managers[spider.name]
@@ -189,4 +679,121 @@ class DrissionPageMiddleware:
         browser_manager = BrowserManager(spider.settings)
         self.browser_managers[spider.name] = browser_manager
         
-        return browser_manager 
\ No newline at end of file
+        return browser_manager
+
+
+class DrissionSpiderMiddleware:
+    """
+    DrissionPage 爬虫中间件
+    
+    将请求动作产生的快照响应作为请求重新交给引擎，并在回调输出全部消费后释放响应的页面对象引用、
+    发送 ``response_processed`` 信号。DrissionSpider会自动在 SPIDER_MIDDLEWARES 中启用
+    
+    快照请求与原请求的回调、errback和cb_kwargs相同，meta的 ``drission_snapshot`` 中保存快照响应，
+    由DrissionPageMiddleware直接返回，不再渲染，因此像普通响应一样经过其他中间件
+    """
+    
+    def __init__(self, release_page: bool = True, crawler: Optional[Crawler] = None):
+        """
+        初始化中间件
+        
+        参数:
+            release_page: 回调完成后是否释放响应的页面对象引用
+            crawler: Crawler 实例，用于发送 response_processed 信号
+        """
+        self.release_page = release_page
+        self.crawler = crawler
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'DrissionSpiderMiddleware':
+        """
+        从 Crawler 创建中间件
+        
+        参数:
+            crawler: Crawler 实例
+        
+        返回:
+            DrissionSpiderMiddleware: 中间件实例
+        """
+        release_page = crawler.settings.getbool('DRISSIONPAGE_RELEASE_PAGE', True)
+        return cls(release_page=release_page, crawler=crawler)
+    
+    def process_spider_output(
+        self, response: Response, result: Iterable, spider: SpiderType
+    ) -> Iterable:
+        """
+        先输出主响应的结果，再依次输出快照请求
+        
+        参数:
+            response: 响应对象
+            result: 回调输出
+            spider: 爬虫实例
+        
+        返回:
+            Iterable: 合并后的输出
+        """
+        try:
+            yield from result
+            yield from self._snapshot_requests(response)
+        finally:
+            self._release(response, spider)
+    
+    async def process_spider_output_async(
+        self, response: Response, result: AsyncIterable, spider: SpiderType
+    ) -> AsyncIterable:
+        """
+        process_spider_output的异步版本
+        
+        参数:
+            response: 响应对象
+            result: 回调输出
+            spider: 爬虫实例
+        
+        返回:
+            AsyncIterable: 合并后的输出
+        """
+        try:
+            async for item in result:
+                yield item
+            for request in self._snapshot_requests(response):
+                yield request
+        finally:
+            self._release(response, spider)
+    
+    def _release(self, response: Response, spider: SpiderType) -> None:
+        """
+        回调输出消费完毕后释放响应的页面对象引用，并发送 response_processed 信号
+        
+        参数:
+            response: 响应对象
+            spider: 爬虫实例
+        """
+        if self.release_page and isinstance(response, DrissionResponse):
+            response.release_page()
+        if self.crawler is not None:
+            self.crawler.signals.send_catch_log(
+                signal=response_processed, response=response, spider=spider
+            )
+    
+    def _snapshot_requests(self, response: Response) -> List[Request]:
+        """
+        为快照响应创建请求
+        
+        参数:
+            response: 响应对象
+        
+        返回:
+            List[Request]: 快照请求，不去重，也不进入共享队列
+        """
+        snapshots = getattr(response, 'snapshots', None)
+        if not snapshots:
+            return []
+        
+        # 共享队列的租约属于原请求
+        meta = {key: value for key, value in response.meta.items() if key != 'frontier_id'}
+        self.logger.debug(f"将 {len(snapshots)} 个快照作为请求交给引擎: {response.url}")
+        return [
+            response.request.replace(dont_filter=True, meta={**meta, 'drission_snapshot': snapshot})
+            for snapshot in snapshots
+        ]
\ No newline at end of file
@@ -0,0 +1,263 @@
+"""
+数据管道 - 截图在进程池中解码、去重并按批写入本地存储
+"""
+
+import base64
+import hashlib
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, Executor
+from typing import Optional, Dict, Any, List, Tuple, NamedTuple
+
+from itemadapter import ItemAdapter
+from scrapy import Spider
+from scrapy.crawler import Crawler
+from scrapy.utils.defer import maybe_deferred_to_future
+from twisted.internet.defer import Deferred
+
+
+# 截图格式对应的文件扩展名
+SCREENSHOT_EXTENSIONS = {'png': 'png', 'jpeg': 'jpg', 'webp': 'webp'}
+
+# 写入完成后存放结果的字段
+RESULT_FIELDS = ('screenshot_path', 'screenshot_checksum')
+
+
+class ScreenshotData(NamedTuple):
+    """
+    CDP截图结果
+    
+    data为 ``Page.captureScreenshot`` 返回的base64字符串，解码在ScreenshotPipeline的进程池中进行
+    """
+    data: str
+    format: str = 'png'
+
+
+def store_batch(store_dir: str, batch: List[Tuple[str, str]]) -> List[Tuple[str, str, bool]]:
+    """
+    解码并写入一批截图(在进程池中执行)
+    
+    文件以内容的SHA1命名，相同的图片只保存一次
+    
+    参数:
+        store_dir: 存储目录
+        batch: [(base64数据, 格式)]
+    
+    返回:
+        List[Tuple[str, str, bool]]: [(相对路径, SHA1, 是否新写入)]
+    """
+    results = []
+    for data, image_format in batch:
+        content = base64.b64decode(data)
+        checksum = hashlib.sha1(content).hexdigest()
+        extension = SCREENSHOT_EXTENSIONS.get(image_format, image_format)
+        relative = os.path.join(checksum[:2], f"{checksum}.{extension}")
+        path = os.path.join(store_dir, relative)
+        
+        written = False
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # 先写临时文件再改名，避免并发写入时读到不完整的图片
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, path)
+            written = True
+        results.append((relative, checksum, written))
+    return results
+
+
+class ScreenshotPipeline:
+    """
+    截图管道
+    
+    回调中通过 ``response.capture_screenshot()`` 获取截图放入item的 ``screenshot`` 字段，
+    管道将截图交给进程池解码、计算哈希并写入内容寻址存储。截图按批提交，批次未满时在
+    DRISSIONPAGE_SCREENSHOT_FLUSH_INTERVAL秒后提交。
+    
+    item需要的字段:
+    
+    - ``screenshot``(或 ``field`` 指定的字段): 必需，存放截图数据
+    - ``screenshot_path`` 和 ``screenshot_checksum``: 可选。字典item，或声明了这两个字段的
+      ``scrapy.Item``、dataclass等item，写入完成后截图字段被删除，改为写入这两个字段；
+      未声明时截图字段替换为存储路径(文件名即内容哈希)
+    """
+    
+    def __init__(
+        self,
+        store_dir: str = 'screenshots',
+        batch_size: int = 16,
+        flush_interval: float = 1.0,
+        max_workers: Optional[int] = None,
+        field: str = 'screenshot',
+        stats=None
+    ):
+        """
+        初始化管道
+        
+        参数:
+            store_dir: 存储目录
+            batch_size: 每批截图数
+            flush_interval: 批次未满时的最长等待时间(秒)
+            max_workers: 进程池大小，None表示CPU核数
+            field: item中存放截图的字段名
+            stats: Scrapy统计收集器
+        """
+        self.store_dir = store_dir
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_workers = max_workers
+        self.field = field
+        self.stats = stats
+        self.executor: Optional[Executor] = None
+        self._batch: List[Tuple[Any, ScreenshotData, Deferred]] = []
+        self._pending: List[Deferred] = []
+        self._flush_call = None
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_crawler(cls, crawler: Crawler) -> 'ScreenshotPipeline':
+        """
+        从 Crawler 创建管道
+        
+        参数:
+            crawler: Crawler 实例
+        
+        返回:
+            ScreenshotPipeline: 管道实例
+        """
+        settings = crawler.settings
+        return cls(
+            store_dir=settings.get('DRISSIONPAGE_SCREENSHOT_STORE', 'screenshots'),
+            batch_size=settings.getint('DRISSIONPAGE_SCREENSHOT_BATCH', 16),
+            flush_interval=settings.getfloat('DRISSIONPAGE_SCREENSHOT_FLUSH_INTERVAL', 1.0),
+            max_workers=settings.getint('DRISSIONPAGE_SCREENSHOT_WORKERS') or None,
+            stats=crawler.stats
+        )
+    
+    def open_spider(self, spider: Spider) -> None:
+        """
+        爬虫开启时创建进程池
+        
+        参数:
+            spider: 爬虫实例
+        """
+        os.makedirs(self.store_dir, exist_ok=True)
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+    
+    async def process_item(self, item: Any, spider: Spider) -> Any:
+        """
+        处理item，包含截图时加入当前批次，写入完成后返回
+        
+        参数:
+            item: 数据项
+            spider: 爬虫实例
+        
+        返回:
+            处理后的item
+        """
+        adapter = ItemAdapter(item)
+        screenshot = adapter.get(self.field)
+        if not isinstance(screenshot, ScreenshotData):
+            return item
+        
+        d = Deferred()
+        self._batch.append((item, screenshot, d))
+        if len(self._batch) >= self.batch_size:
+            self.flush()
+        elif self._flush_call is None:
+            from twisted.internet import reactor
+            self._flush_call = reactor.callLater(self.flush_interval, self.flush)
+        return await maybe_deferred_to_future(d)
+    
+    def flush(self) -> None:
+        """将当前批次提交到进程池"""
+        if self._flush_call is not None:
+            if self._flush_call.active():
+                self._flush_call.cancel()
+            self._flush_call = None
+        if not self._batch:
+            return
+        
+        batch, self._batch = self._batch, []
+        future = self.executor.submit(
+            store_batch, self.store_dir, [(shot.data, shot.format) for _, shot, _ in batch]
+        )
+        done = Deferred()
+        self._pending.append(done)
+        done.addBoth(self._remove_pending, done)
+        
+        def on_done(f):
+            self._call_from_thread(self._finish_batch, batch, f, done)
+        
+        future.add_done_callback(on_done)
+    
+    @staticmethod
+    def _call_from_thread(func, *args) -> None:
+        """在reactor线程中执行回调"""
+        from twisted.internet import reactor
+        reactor.callFromThread(func, *args)
+    
+    def _remove_pending(self, result, done: Deferred):
+        self._pending.remove(done)
+        return result
+    
+    def _finish_batch(
+        self, batch: List[Tuple[Any, ScreenshotData, Deferred]], future, done: Deferred
+    ) -> None:
+        """批次写入完成后更新item"""
+        try:
+            results = future.result()
+        except Exception as e:
+            self.logger.error(f"写入截图失败: {e}", exc_info=True)
+            for _, _, d in batch:
+                d.errback(e)
+            done.callback(None)
+            return
+        
+        for (item, _, d), (relative, checksum, written) in zip(batch, results):
+            self._store_result(ItemAdapter(item), relative, checksum)
+            if self.stats:
+                key = 'stored' if written else 'duplicate'
+                self.stats.inc_value(f'drissionpage/screenshot/{key}')
+            d.callback(item)
+        done.callback(None)
+    
+    def _store_result(self, adapter: ItemAdapter, relative: str, checksum: str) -> None:
+        """
+        把写入结果放入item，只写入item声明的字段
+        
+        参数:
+            adapter: item适配器
+            relative: 相对于存储目录的路径
+            checksum: 内容哈希
+        """
+        if isinstance(adapter.item, dict) or set(RESULT_FIELDS) <= set(adapter.field_names()):
+            del adapter[self.field]
+            adapter['screenshot_path'] = relative
+            adapter['screenshot_checksum'] = checksum
+        else:
+            adapter[self.field] = relative
+    
+    def close_spider(self, spider: Spider) -> Optional[Deferred]:
+        """
+        爬虫关闭时提交剩余截图，等待写入完成后关闭进程池
+        
+        参数:
+            spider: 爬虫实例
+        
+        返回:
+            Deferred: 所有批次写入完成时触发
+        """
+        from twisted.internet.defer import DeferredList
+        
+        self.flush()
+        d = DeferredList(list(self._pending))
+        d.addBoth(lambda _: self._shutdown())
+        return d
+    
+    def _shutdown(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
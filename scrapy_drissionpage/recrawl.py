@@ -0,0 +1,139 @@
+"""
+增量重爬 - 按请求指纹保存页面的ETag、Last-Modified和文档哈希，用于条件请求和变化检测
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import time
+from threading import Lock
+from typing import Optional, Dict, Any
+
+
+class ValidatorStore:
+    """
+    页面校验信息存储
+    
+    使用本地SQLite数据库，以请求指纹为键保存上次抓取时的ETag、Last-Modified和主文档哈希。
+    写入按批提交，关闭时提交剩余的修改。连接在渲染线程间共享，所有操作都在锁内执行
+    """
+    
+    def __init__(self, path: str, commit_every: int = 100):
+        """
+        初始化存储
+        
+        参数:
+            path: 数据库文件路径
+            commit_every: 每写入多少条提交一次
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.path = path
+        self.commit_every = commit_every
+        self._pending = 0
+        self._lock = Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS validators ('
+            'fingerprint BLOB PRIMARY KEY, url TEXT, etag TEXT, last_modified TEXT, '
+            'content_hash TEXT, updated REAL)'
+        )
+        self.logger = logging.getLogger(__name__)
+    
+    def get(self, fingerprint: bytes) -> Optional[Dict[str, Any]]:
+        """
+        获取校验信息
+        
+        参数:
+            fingerprint: 请求指纹
+        
+        返回:
+            Optional[Dict[str, Any]]: 包含url、etag、last_modified、content_hash、updated的字典，
+                不存在时返回None
+        """
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT url, etag, last_modified, content_hash, updated '
+                'FROM validators WHERE fingerprint = ?',
+                (fingerprint,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('url', 'etag', 'last_modified', 'content_hash', 'updated'), row))
+    
+    def put(self, fingerprint: bytes, url: str, etag: Optional[str] = None,
+            last_modified: Optional[str] = None, content_hash: Optional[str] = None) -> None:
+        """
+        保存校验信息
+        
+        参数:
+            fingerprint: 请求指纹
+            url: 页面URL
+            etag: ETag响应头
+            last_modified: Last-Modified响应头
+            content_hash: 主文档哈希
+        """
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?, ?, ?)',
+                (fingerprint, url, etag, last_modified, content_hash, time.time())
+            )
+            self._pending += 1
+            if self._pending >= self.commit_every:
+                self._commit()
+    
+    def commit(self) -> None:
+        """提交未保存的修改"""
+        with self._lock:
+            self._commit()
+    
+    def _commit(self) -> None:
+        """提交未保存的修改，调用方需持有锁"""
+        self._conn.commit()
+        self._pending = 0
+    
+    def close(self) -> None:
+        """提交并关闭数据库"""
+        with self._lock:
+            self._commit()
+            self._conn.close()
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM validators').fetchone()[0]
+    
+    @staticmethod
+    def conditional_headers(record: Optional[Dict[str, Any]]) -> Dict[str, str]:
+        """
+        根据校验信息生成条件请求头
+        
+        参数:
+            record: get返回的校验信息
+        
+        返回:
+            Dict[str, str]: If-None-Match和If-Modified-Since请求头
+        """
+        headers = {}
+        if record:
+            if record.get('etag'):
+                headers['If-None-Match'] = record['etag']
+            if record.get('last_modified'):
+                headers['If-Modified-Since'] = record['last_modified']
+        return headers
+    
+    @staticmethod
+    def content_hash(content: bytes) -> str:
+        """
+        计算主文档哈希
+        
+        参数:
+            content: 文档内容
+        
+        返回:
+            str: SHA1十六进制字符串
+        """
+        return hashlib.sha1(content).hexdigest()
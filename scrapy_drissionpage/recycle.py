@@ -0,0 +1,158 @@
+"""
+标签页回收 - 渲染完成后软重置标签页，复用其渲染进程，每使用N次才换新标签页
+"""
+
+import logging
+from threading import Lock
+from typing import Optional, Dict
+from urllib.parse import urlsplit
+
+
+class TabRecycler:
+    """
+    标签页回收器
+    
+    新建标签页需要启动新的渲染进程，不清理直接复用又会残留上一个页面的监听、注入脚本和JS堆。
+    ``recycle`` 在标签页放回池中之前执行软重置:
+    
+    1. 停止数据包监听和控制台监听
+    2. 移除 ``add_init_js`` 注入的脚本
+    3. 可选：清除当前源的Cookie、存储、缓存和Service Worker(``Storage.clearDataForOrigin``)
+    4. 导航到 ``about:blank`` 并清空导航历史(``Page.resetNavigationHistory``)
+    5. 可选：执行垃圾回收(``HeapProfiler.collectGarbage``)
+    
+    同一个标签页使用 ``max_uses`` 次后，或软重置失败时，``recycle`` 返回False，
+    由调用方关闭标签页并新建。
+    Cookie和存储属于浏览器上下文，新建的标签页同样共享，因此默认不清除
+    """
+    
+    def __init__(
+        self, max_uses: int = 100, clear_storage: bool = False, collect_garbage: bool = True
+    ):
+        """
+        初始化标签页回收器
+        
+        参数:
+            max_uses: 每个标签页最多使用的次数，达到后关闭并新建，0表示不限制
+            clear_storage: 软重置时是否清除当前源的Cookie和存储
+            collect_garbage: 软重置时是否执行垃圾回收
+        """
+        if max_uses < 0:
+            raise ValueError(f"标签页最大使用次数不能为负数: {max_uses}")
+        
+        self.max_uses = max_uses
+        self.clear_storage = clear_storage
+        self.collect_garbage = collect_garbage
+        # 标签页ID -> 已使用次数
+        self._uses: Dict[str, int] = {}
+        self._lock = Lock()
+        self.logger = logging.getLogger(__name__)
+    
+    @classmethod
+    def from_settings(cls, settings) -> 'TabRecycler':
+        """
+        根据设置创建标签页回收器
+        
+        参数:
+            settings: Scrapy设置对象
+        
+        返回:
+            TabRecycler: 标签页回收器实例
+        """
+        return cls(
+            max_uses=settings.getint('DRISSIONPAGE_TAB_MAX_USES', 100),
+            clear_storage=settings.getbool('DRISSIONPAGE_TAB_CLEAR_STORAGE', False),
+            collect_garbage=settings.getbool('DRISSIONPAGE_TAB_COLLECT_GARBAGE', True)
+        )
+    
+    def uses(self, tab) -> int:
+        """
+        获取标签页已使用的次数
+        
+        参数:
+            tab: 标签页对象
+        
+        返回:
+            int: 使用次数
+        """
+        with self._lock:
+            return self._uses.get(tab.tab_id, 0)
+    
+    def recycle(self, tab) -> bool:
+        """
+        记录一次使用，并在标签页放回池中之前软重置
+        
+        参数:
+            tab: 用完的标签页
+        
+        返回:
+            bool: 可以放回池中时返回True；达到最大使用次数或重置失败时返回False，此时应关闭标签页
+        """
+        with self._lock:
+            uses = self._uses.get(tab.tab_id, 0) + 1
+            self._uses[tab.tab_id] = uses
+        
+        if self.max_uses and uses >= self.max_uses:
+            self.logger.debug(f"标签页 {tab.tab_id} 已使用 {uses} 次，关闭后新建")
+            self.forget(tab)
+            return False
+        
+        if not self.reset(tab):
+            self.forget(tab)
+            return False
+        return True
+    
+    def reset(self, tab) -> bool:
+        """
+        软重置标签页
+        
+        参数:
+            tab: 标签页对象
+        
+        返回:
+            bool: 是否重置成功
+        """
+        try:
+            # 停止监听，释放缓存的数据包
+            if tab.listen.listening:
+                tab.listen.stop()
+            if tab.console.listening:
+                tab.console.stop()
+            
+            # 移除注入的脚本，避免在后续页面中执行
+            tab.remove_init_js()
+            
+            # 离开页面前清除当前源的存储
+            if self.clear_storage:
+                origin = self._origin(tab.url)
+                if origin is not None:
+                    tab.run_cdp('Storage.clearDataForOrigin', origin=origin, storageTypes='all')
+            
+            # 卸载页面，释放页面中的定时器、事件监听和DOM
+            tab.get('about:blank')
+            tab.run_cdp('Page.resetNavigationHistory')
+            
+            if self.collect_garbage:
+                tab.run_cdp('HeapProfiler.collectGarbage')
+        except Exception as e:
+            self.logger.debug(f"软重置标签页 {getattr(tab, 'tab_id', tab)} 失败: {e}")
+            return False
+        return True
+    
+    def forget(self, tab) -> None:
+        """
+        清除标签页的使用记录，在标签页关闭时调用
+        
+        参数:
+            tab: 标签页对象
+        """
+        with self._lock:
+            self._uses.pop(tab.tab_id, None)
+    
+    @staticmethod
+    def _origin(url: str) -> Optional[str]:
+        """获取http(s)页面的源，其他页面返回None"""
+        parts = urlsplit(url or '')
+        if parts.scheme not in ('http', 'https') or not parts.netloc:
+            return None
+        return f'{parts.scheme}://{parts.netloc}'
@@ -2,14 +2,196 @@
 DrissionRequest类 - 自定义的集成DrissionPage功能的请求类
 """
 
-from typing import Optional, Dict, Any, Callable, Union
+import copy
+import weakref
+from collections.abc import MutableMapping
+from typing import Optional, Dict, Any, Callable, Union, List, Tuple, Iterator
 from scrapy.http import Request
+from scrapy.utils.request import request_from_dict
+
+
+class _SharedOptions(dict):
+    """多个请求共享的选项字典，只由DrissionOptions读取"""
+    
+    __slots__ = ('__weakref__',)
+
+
+class DrissionOptions(MutableMapping):
+    """
+    写时复制的drission选项
+    
+    相同的选项在所有请求间共享同一个字典，而不是每个请求复制一份。
+    修改某个请求的选项时，该请求先复制一份自己的字典，不影响其他请求::
+        
+        request.meta['drission']['wait_time'] = 3
+    
+    只复制顶层字典，修改headers等嵌套的值时请替换整个值
+    """
+    
+    __slots__ = ('_data', '_shared')
+    
+    def __init__(self, data: Optional[Dict[str, Any]] = None, shared: bool = False):
+        """
+        初始化选项
+        
+        参数:
+            data: 选项字典
+            shared: data是否为共享字典，共享时修改前先复制
+        """
+        self._data = data if data is not None else {}
+        self._shared = shared
+    
+    def __getitem__(self, key: str) -> Any:
+        return self._data[key]
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._data.get(key, default)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._data
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._data)
+    
+    def __len__(self) -> int:
+        return len(self._data)
+    
+    def __setitem__(self, key: str, value: Any) -> None:
+        self._own()[key] = value
+    
+    def __delitem__(self, key: str) -> None:
+        del self._own()[key]
+    
+    def __repr__(self) -> str:
+        return repr(self._data)
+    
+    def shares(self, other: 'DrissionOptions') -> bool:
+        """
+        是否与另一个选项对象共享同一个字典
+        
+        参数:
+            other: 另一个选项对象
+        
+        返回:
+            bool: 两者都未修改且选项相同时返回True
+        """
+        return self._shared and isinstance(other, DrissionOptions) and other._data is self._data
+    
+    def _own(self) -> Dict[str, Any]:
+        """首次修改时复制共享的字典"""
+        if self._shared:
+            self._data = dict(self._data)
+            self._shared = False
+        return self._data
+    
+    def __reduce__(self):
+        # 反序列化时重新共享相同的选项
+        return intern_options, (dict(self._data),)
+    
+    def __copy__(self) -> 'DrissionOptions':
+        if self._shared:
+            return DrissionOptions(self._data, shared=True)
+        return DrissionOptions(dict(self._data))
+    
+    def __deepcopy__(self, memo) -> 'DrissionOptions':
+        if self._shared:
+            return DrissionOptions(self._data, shared=True)
+        return DrissionOptions(copy.deepcopy(self._data, memo))
+
+
+# 已创建的共享字典，相同选项复用同一个字典
+_interned_options: 'weakref.WeakValueDictionary[Any, _SharedOptions]' = (
+    weakref.WeakValueDictionary()
+)
+
+
+def _freeze(value: Any) -> Any:
+    """将选项值转换为可哈希的键"""
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def intern_options(options: Dict[str, Any]) -> DrissionOptions:
+    """
+    获取与给定选项相同的共享选项对象
+    
+    参数:
+        options: drission选项字典
+    
+    返回:
+        DrissionOptions: 写时复制的选项，相同选项共享同一个字典
+    """
+    try:
+        key = _freeze(options)
+        hash(key)
+    except TypeError:
+        # 包含不可哈希的值时不共享
+        return DrissionOptions(dict(options))
+    
+    shared = _interned_options.get(key)
+    if shared is None:
+        shared = _SharedOptions(options)
+        _interned_options[key] = shared
+    return DrissionOptions(shared, shared=True)
+
+
+def viewport_metrics(viewport: Union[Tuple[int, int], Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    将视口设置转换为 ``Emulation.setDeviceMetricsOverride`` 的参数
+    
+    参数:
+        viewport: (宽, 高) 元组，或包含 width、height 以及可选 device_scale_factor、mobile 的字典
+    
+    返回:
+        Dict[str, Any]: CDP命令参数
+    """
+    if isinstance(viewport, (tuple, list)):
+        if len(viewport) != 2:
+            raise ValueError(f"视口必须为 (宽, 高): {viewport}")
+        viewport = {'width': viewport[0], 'height': viewport[1]}
+    elif not isinstance(viewport, dict):
+        raise ValueError(f"不支持的视口设置: {viewport!r}")
+    
+    width = viewport.get('width')
+    height = viewport.get('height')
+    if not isinstance(width, int) or not isinstance(height, int) or width <= 0 or height <= 0:
+        raise ValueError(f"视口宽高必须为正整数: {viewport}")
+    
+    return {
+        'width': width,
+        'height': height,
+        'deviceScaleFactor': viewport.get('device_scale_factor', 1),
+        'mobile': bool(viewport.get('mobile', False)),
+    }
 
 
 class DrissionRequest(Request):
     """
     集成DrissionPage功能的Scrapy请求对象
+    
+    ``meta['drission']`` 为写时复制的选项(DrissionOptions)，相同配置的请求共享同一个字典。
+    所有选项都保存在meta中，因此可以通过to_dict/from_dict写入JOBDIR磁盘队列并在恢复时还原
     """
+    
+    __slots__ = ()
+    
+    # to_dict中与默认值相同时省略的属性
+    _dict_defaults: Dict[str, Any] = {
+        'method': 'GET',
+        'headers': {},
+        'body': b'',
+        'cookies': {},
+        'encoding': 'utf-8',
+        'priority': 0,
+        'dont_filter': False,
+        'callback': None,
+        'errback': None,
+        'flags': [],
+        'cb_kwargs': {},
+    }
 
     def __init__(
         self,
@@ -26,12 +208,15 @@ class DrissionRequest(Request):
         errback: Optional[Callable] = None,
         flags: Optional[list] = None,
         cb_kwargs: Optional[Dict[str, Any]] = None,
-        page_type: str = 'chromium',
+        page_type: Optional[str] = None,
         timeout: Optional[int] = None,
         load_mode: Optional[str] = None,
         wait_time: Optional[float] = None,
         wait_element: Optional[str] = None,
         proxy: Optional[str] = None,
+        actions: Optional[List[Dict[str, Any]]] = None,
+        viewport: Optional[Union[Tuple[int, int], Dict[str, Any]]] = None,
+        identity: Optional[str] = None,
         **kwargs: Any
     ) -> None:
         """
@@ -51,30 +236,43 @@ class DrissionRequest(Request):
             errback: 错误回调函数
             flags: 请求标志
             cb_kwargs: 回调函数关键字参数
-            page_type: 页面类型，'chromium'或'session'
+            page_type: 页面类型，'chromium'或'session'，None表示沿用meta中的设置(默认'chromium')
             timeout: 请求超时时间
             load_mode: 加载模式，'normal'、'eager'或'none'
             wait_time: 加载后等待时间(秒)
             wait_element: 等待特定元素出现
             proxy: 代理地址
+            actions: 访问URL后在同一标签页中依次执行的动作列表，见ActionRunner
+            viewport: 视口大小，(宽, 高) 或 {'width', 'height', 'device_scale_factor', 'mobile'}
+            identity: 身份标识(如账号名)，相同身份的请求在同一个隔离的浏览器上下文中渲染，
+                只适用于浏览器模式
             **kwargs: 其他参数
         """
         # 初始化元数据
         meta = meta.copy() if meta else {}
         
-        # 添加DrissionPage特有的元数据
-        meta['drission'] = meta.get('drission', {})
-        meta['drission']['page_type'] = page_type
+        # 添加DrissionPage特有的元数据(不修改调用方传入的字典)
+        drission = dict(meta.get('drission') or {})
+        drission['page_type'] = page_type or drission.get('page_type', 'chromium')
         
         # 添加可选参数
         if timeout is not None:
-            meta['drission']['timeout'] = timeout
+            drission['timeout'] = timeout
         if load_mode is not None:
-            meta['drission']['load_mode'] = load_mode
+            drission['load_mode'] = load_mode
         if wait_time is not None:
-            meta['drission']['wait_time'] = wait_time
+            drission['wait_time'] = wait_time
         if wait_element is not None:
-            meta['drission']['wait_element'] = wait_element
+            drission['wait_element'] = wait_element
+        if actions is not None:
+            drission['actions'] = tuple(actions)
+        if viewport is not None:
+            drission['viewport'] = viewport_metrics(viewport)
+        if identity is not None:
+            drission['identity'] = identity
+        
+        # 相同选项的请求共享同一个字典，修改时复制
+        meta['drission'] = intern_options(drission)
         
         # 设置代理
         if proxy:
@@ -98,6 +296,41 @@ class DrissionRequest(Request):
             **kwargs
         )
     
+    def to_dict(self, *, spider=None) -> Dict[str, Any]:
+        """
+        转换为字典，用于磁盘队列
+        
+        drission选项转换为普通字典以兼容marshal队列，与默认值相同的属性被省略
+        
+        参数:
+            spider: 爬虫实例，指定时回调函数保存为方法名
+        
+        返回:
+            Dict[str, Any]: 请求字典，可通过from_dict或Scrapy的request_from_dict还原
+        """
+        d = super().to_dict(spider=spider)
+        meta = dict(d['meta'])
+        meta['drission'] = dict(meta['drission'])
+        d['meta'] = meta
+        for key, default in self._dict_defaults.items():
+            if key in d and d[key] == default:
+                del d[key]
+        return d
+    
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any], *, spider=None) -> 'DrissionRequest':
+        """
+        从to_dict的结果还原请求
+        
+        参数:
+            d: 请求字典
+            spider: 爬虫实例，用于按方法名还原回调函数
+        
+        返回:
+            DrissionRequest: 请求对象
+        """
+        return request_from_dict({**d, '_class': f"{cls.__module__}.{cls.__name__}"}, spider=spider)
+    
     def __str__(self) -> str:
         """返回请求的字符串表示"""
         page_type = self.meta.get('drission', {}).get('page_type', 'chromium')
@@ -2,8 +2,15 @@
 DrissionResponse类 - 自定义的集成DrissionPage功能的响应类
 """
 
-from typing import Optional, Any, Union, Dict, List, Callable, Tuple, Set
+from typing import Optional, Any, Union, Dict, List, Callable, Tuple, Set, Sequence
+from functools import partial
+import asyncio
+import io
+import json
 import logging
+import os
+import tempfile
+import weakref
 from scrapy.http import TextResponse
 from DrissionPage import ChromiumPage, SessionPage
 
@@ -11,9 +18,15 @@ from DrissionPage import ChromiumPage, SessionPage
 class DrissionResponse(TextResponse):
     """
     集成DrissionPage功能的Scrapy响应对象
+    
+    回调执行完毕后，DrissionSpiderMiddleware会调用release_page释放页面对象引用
     """
+    
+    __slots__ = ('_page', '_body_path', 'snapshots', 'action_results')
+    
+    logger = logging.getLogger(__name__)
 
-    def __init__(self, url, body, encoding=None, request=None, page=None):
+    def __init__(self, url, body, encoding=None, request=None, page=None, flags=None):
         """
         初始化DrissionResponse
         
@@ -23,10 +36,81 @@ class DrissionResponse(TextResponse):
             encoding (str): 编码方式
             request (Request): 请求对象
             page (ChromiumPage|SessionPage): 页面对象
+            flags (list): 响应标志
         """
-        super().__init__(url=url, body=body, encoding=encoding, request=request)
+        # 大页面溢出到临时文件时的文件路径，见from_html
+        self._body_path: Optional[str] = None
+        super().__init__(url=url, body=body, encoding=encoding, request=request, flags=flags)
         self._page = page
+        # 请求动作产生的快照响应和evaluate结果，默认使用共享的空元组
+        self.snapshots: Sequence['DrissionResponse'] = ()
+        self.action_results: Sequence[Any] = ()
+        
+    @classmethod
+    def from_html(cls, url: str, html: str, request=None, page=None, flags=None,
+                  spool_threshold: int = 0, spool_dir: Optional[str] = None) -> 'DrissionResponse':
+        """
+        由页面HTML字符串创建响应
+        
+        HTML只编码一次，并直接作为 ``text`` 的缓存，避免TextResponse再次解码；
+        超过阈值的页面分块写入临时文件，响应体在首次访问时才读入内存
         
+        参数:
+            url: 响应URL
+            html: 页面HTML
+            request: 请求对象
+            page: 页面对象
+            flags: 响应标志
+            spool_threshold: 溢出到临时文件的字符数阈值，0表示不溢出
+            spool_dir: 临时文件目录，None表示系统临时目录
+        
+        返回:
+            DrissionResponse: 响应对象
+        """
+        if spool_threshold and len(html) > spool_threshold:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', suffix='.html',
+                                             dir=spool_dir, delete=False) as f:
+                f.write(html)
+            response = cls(
+                url=url, body=b'', encoding='utf-8', request=request, page=page, flags=flags
+            )
+            response._body_path = f.name
+            # 响应被回收时删除临时文件
+            weakref.finalize(response, _remove_quietly, f.name)
+            cls.logger.debug(f"页面 {url} 共 {len(html)} 个字符，已写入临时文件 {f.name}")
+            return response
+        
+        response = cls(
+            url=url, body=html.encode('utf-8'), encoding='utf-8',
+            request=request, page=page, flags=flags
+        )
+        response._cached_ubody = html
+        return response
+    
+    @property
+    def body(self) -> bytes:
+        """响应体，溢出到临时文件时在首次访问时读取"""
+        if self._body_path is not None and not self._body:
+            with open(self._body_path, 'rb') as f:
+                self._body = f.read()
+        return self._body
+    
+    @property
+    def is_spooled(self) -> bool:
+        """响应体是否保存在临时文件中"""
+        return self._body_path is not None
+    
+    def open_body(self):
+        """
+        以二进制文件对象打开响应体，可分块读取大页面而无需整体载入内存
+        
+        返回:
+            文件对象
+        """
+        if self._body_path is not None and not self._body:
+            return open(self._body_path, 'rb')
+        return io.BytesIO(self._body)
+    
     @property
     def page(self):
         """
@@ -37,6 +121,24 @@ class DrissionResponse(TextResponse):
         """
         return self._page
     
+    def release_page(self) -> None:
+        """
+        释放页面对象引用
+        
+        释放后响应仍可使用css/xpath等静态解析，但不能再执行点击、输入等页面操作
+        """
+        self._page = None
+    
+    @property
+    def is_session(self) -> bool:
+        """是否为会话模式页面"""
+        return isinstance(self._page, SessionPage)
+    
+    @property
+    def is_chromium(self) -> bool:
+        """是否为浏览器模式页面(ChromiumPage或标签页)"""
+        return self._page is not None and not self.is_session
+    
     def xpath(self, xpath, **kwargs):
         """
         使用XPath查找元素(利用DrissionPage的查找功能)
@@ -144,6 +246,67 @@ class DrissionResponse(TextResponse):
         from scrapy.selector import Selector
         return Selector(text=element.html)
     
+    def extract(self, spec, static=False):
+        """
+        按声明式规则批量提取字段(新增功能)
+        
+        浏览器模式下所有字段在一次run_js调用中提取并以单个JSON返回，
+        会话模式或未关联页面时在响应内容上按相同规则静态提取
+        
+        参数:
+            spec (dict|ExtractionSpec): 提取规则，字段名 → 选择器
+            static (bool): 是否强制使用响应内容静态提取
+        
+        返回:
+            dict: 提取结果
+        """
+        from .utils.extractor import ExtractionSpec, EXTRACT_JS
+        
+        spec = ExtractionSpec.wrap(spec)
+        
+        if static or self._page is None or not hasattr(self._page, 'run_js'):
+            return spec.extract_static(self.selector)
+        
+        return json.loads(self._page.run_js(EXTRACT_JS, spec.json))
+    
+    def tables(self, selector='table', header=None, infer_types=True, static=False):
+        """
+        按列提取表格
+        
+        浏览器模式下所有单元格在一次run_js调用中收集，会话模式或未关联页面时
+        在已解析的响应内容上直接遍历表格节点，不对每行每列分别执行选择器
+        
+        参数:
+            selector (str): 表格的CSS选择器
+            header (bool): 是否以第一行为列名，None表示自动判断(th行或thead)
+            infer_types (bool): 是否将整列为数字的列转换为int或float
+            static (bool): 是否强制使用响应内容静态提取
+        
+        返回:
+            list[Table]: 表格列表，可通过to_pandas/to_arrow转换
+        """
+        from .utils.tables import static_tables, live_tables
+        
+        if static or self._page is None or not hasattr(self._page, 'run_js'):
+            return static_tables(self.selector, selector, header=header, infer_types=infer_types)
+        return live_tables(self._page, selector, header=header, infer_types=infer_types)
+    
+    def extract_table(self, selector='table', header=None, infer_types=True, static=False):
+        """
+        按列提取第一个匹配的表格
+        
+        参数:
+            selector (str): 表格的CSS选择器
+            header (bool): 是否以第一行为列名，None表示自动判断
+            infer_types (bool): 是否推断数值列
+            static (bool): 是否强制使用响应内容静态提取
+        
+        返回:
+            Table: 表格，没有匹配的表格时返回None
+        """
+        tables = self.tables(selector, header=header, infer_types=infer_types, static=static)
+        return tables[0] if tables else None
+    
     def follow(self, url, callback=None, **kwargs):
         """
         根据URL创建新请求
@@ -181,10 +344,58 @@ class DrissionResponse(TextResponse):
         返回:
             截图保存路径或二进制数据
         """
-        if self._page is None or not hasattr(self._page, 'screenshot'):
+        if not self.is_chromium:
             raise ValueError("无法截图，当前响应对象不包含页面对象或页面对象不支持截图")
         
-        return self._page.screenshot(path=path, name=name, full_page=full_page)
+        return self._page.get_screenshot(path=path, name=name, full_page=full_page)
+    
+    def capture_screenshot(
+        self, format: str = 'png', quality: Optional[int] = None,
+        clip: Optional[Union[Dict[str, float], Tuple[float, float, float, float]]] = None,
+        scale: float = 1.0, full_page: bool = False
+    ):
+        """
+        通过CDP截图，不在当前进程中解码和写入(新增功能)
+        
+        返回的截图可放入item的 ``screenshot`` 字段，由ScreenshotPipeline在进程池中解码并保存
+        
+        参数:
+            format: 图片格式，'png'、'jpeg'或'webp'
+            quality: jpeg/webp的压缩质量(0-100)
+            clip: 截图区域，{'x', 'y', 'width', 'height'} 或 (x, y, width, height)
+            scale: 缩放比例，如0.5表示输出一半尺寸的图片
+            full_page: 是否截取整个页面
+        
+        返回:
+            ScreenshotData: base64编码的截图和格式
+        """
+        from .pipelines import ScreenshotData, SCREENSHOT_EXTENSIONS
+        
+        if not self.is_chromium:
+            raise ValueError("无法截图，当前响应对象不包含浏览器页面对象")
+        if format not in SCREENSHOT_EXTENSIONS:
+            raise ValueError(f"不支持的截图格式: {format}")
+        
+        params: Dict[str, Any] = {'format': format, 'captureBeyondViewport': full_page}
+        if quality is not None and format != 'png':
+            params['quality'] = int(quality)
+        
+        if isinstance(clip, (tuple, list)):
+            clip = dict(zip(('x', 'y', 'width', 'height'), clip))
+        if clip is None and (full_page or scale != 1):
+            metrics = self._page.run_cdp('Page.getLayoutMetrics')
+            if full_page:
+                size = metrics.get('cssContentSize') or metrics['contentSize']
+                clip = {'x': 0, 'y': 0, 'width': size['width'], 'height': size['height']}
+            else:
+                viewport = metrics.get('cssLayoutViewport') or metrics['layoutViewport']
+                clip = {'x': viewport['pageX'], 'y': viewport['pageY'],
+                        'width': viewport['clientWidth'], 'height': viewport['clientHeight']}
+        if clip is not None:
+            params['clip'] = {**clip, 'scale': scale}
+        
+        result = self._page.run_cdp('Page.captureScreenshot', **params)
+        return ScreenshotData(result['data'], format)
     
     def json(self):
         """
@@ -244,14 +455,16 @@ class DrissionResponse(TextResponse):
             self.logger.error(f"输入文本失败: {e}")
             return False
     
-    def scroll(self, selector: str = None, direction: str = 'down', distance: int = None) -> bool:
+    def scroll(self, selector: str = None, direction: str = 'down', distance: int = None,
+               smooth: bool = False) -> bool:
         """
         滚动页面或元素
         
         参数:
             selector: 元素选择器，None表示滚动整个页面
             direction: 滚动方向，'up', 'down', 'left', 'right'
-            distance: 滚动距离，None表示自动
+            distance: 滚动距离，None表示滚动到顶部/底部(水平方向默认300/100像素)
+            smooth: 是否使用平滑滚动动画，默认瞬间跳转
             
         返回:
             bool: 是否滚动成功
@@ -260,38 +473,76 @@ class DrissionResponse(TextResponse):
             self.logger.warning("页面对象不存在，无法执行滚动操作")
             return False
         
+        from .harvest import scroll
+        
         try:
-            # 滚动整个页面
-            if selector is None:
-                if direction == 'down':
-                    self._page.scroll.to_bottom(smooth=True)
-                elif direction == 'up':
-                    self._page.scroll.to_top(smooth=True)
-                elif direction in ('left', 'right'):
-                    # 处理水平滚动
-                    distance = distance or 300
-                    self._page.scroll.by(
-                        x=distance if direction == 'right' else -distance, 
-                        y=0
-                    )
-            # 滚动特定元素
-            else:
-                element = self._page.ele(selector)
-                if direction == 'down':
-                    element.scroll.to_bottom(smooth=True)
-                elif direction == 'up':
-                    element.scroll.to_top(smooth=True)
-                elif direction in ('left', 'right'):
-                    distance = distance or 100
-                    element.scroll.by(
-                        x=distance if direction == 'right' else -distance, 
-                        y=0
-                    )
+            scroll(self._page, direction, distance, selector, smooth)
             return True
         except Exception as e:
             self.logger.error(f"滚动操作失败: {e}")
             return False
     
+    def fast_scroll(self, selector: str = None, max_steps: int = 100) -> int:
+        """
+        快速滚动到底部(新增功能)
+        
+        按视口高度逐屏瞬间跳转，每一步让出一帧以触发基于IntersectionObserver的懒加载，
+        不产生平滑滚动动画
+        
+        参数:
+            selector: 滚动容器的CSS选择器，None表示整个页面
+            max_steps: 最大跳转次数
+        
+        返回:
+            int: 实际跳转次数，未找到容器时返回-1
+        """
+        from .harvest import FAST_SCROLL_JS
+        
+        if not self._page:
+            self.logger.warning("页面对象不存在，无法执行滚动操作")
+            return -1
+        
+        return self._page.run_js(FAST_SCROLL_JS, selector, max_steps)
+    
+    def scroll_harvest(self, item_selector: str = None, container: str = None, max_steps: int = 50,
+                       idle_steps: int = 2, interval: float = 0.5):
+        """
+        无限滚动采集(新增功能)
+        
+        反复滚动到底部，每次只取回MutationObserver记录的新增节点，
+        并作为只包含增量内容的部分响应逐个返回
+        
+        参数:
+            item_selector: 只记录匹配该CSS选择器的新增节点，None表示所有新增元素
+            container: 滚动容器的CSS选择器，None表示整个页面
+            max_steps: 最大滚动次数
+            idle_steps: 连续多少次没有新内容时停止
+            interval: 每次滚动后等待新内容的时间(秒)
+        
+        返回:
+            Iterator[DrissionResponse]: 部分响应，可直接使用css/xpath提取
+        """
+        from .harvest import ScrollHarvester
+        
+        if not self.is_chromium:
+            raise ValueError("无限滚动采集需要浏览器模式页面")
+        
+        harvester = ScrollHarvester(
+            self._page,
+            item_selector=item_selector,
+            container=container,
+            max_steps=max_steps,
+            idle_steps=idle_steps,
+            interval=interval
+        )
+        for nodes in harvester.deltas():
+            yield DrissionResponse.from_html(
+                self.url,
+                harvester.wrap(nodes),
+                request=self.request,
+                flags=['scroll_harvest']
+            )
+    
     def wait(self, time: float) -> 'DrissionResponse':
         """
         等待指定时间
@@ -342,7 +593,7 @@ class DrissionResponse(TextResponse):
         返回:
             Any: 脚本执行结果
         """
-        if not self._page or not self._is_chromium:
+        if not self._page or not self.is_chromium:
             self.logger.warning("页面对象不存在或不是ChromiumPage，无法执行JavaScript脚本")
             return None
         
@@ -352,9 +603,116 @@ class DrissionResponse(TextResponse):
             self.logger.error(f"执行JavaScript脚本失败: {e}")
             return None
     
+    async def _run_in_executor(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """
+        在线程池中执行阻塞的DrissionPage调用，避免阻塞asyncio事件循环
+        
+        参数:
+            func: 阻塞函数
+            *args: 位置参数
+            **kwargs: 关键字参数
+        
+        返回:
+            Any: 函数返回值
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, partial(func, *args, **kwargs))
+    
+    async def aclick(self, selector: str, timeout: float = 10) -> bool:
+        """
+        点击元素(异步版本)
+        
+        参数:
+            selector: 元素选择器
+            timeout: 等待元素出现的超时时间
+        
+        返回:
+            bool: 是否点击成功
+        """
+        return await self._run_in_executor(self.click, selector, timeout=timeout)
+    
+    async def ainput(self, selector: str, text: str, timeout: float = 10) -> bool:
+        """
+        输入文本(异步版本)
+        
+        参数:
+            selector: 元素选择器
+            text: 要输入的文本
+            timeout: 等待元素出现的超时时间
+        
+        返回:
+            bool: 是否输入成功
+        """
+        return await self._run_in_executor(self.input, selector, text, timeout=timeout)
+    
+    async def ascroll(self, selector: str = None, direction: str = 'down', distance: int = None,
+                      smooth: bool = False) -> bool:
+        """
+        滚动页面或元素(异步版本)
+        
+        参数:
+            selector: 元素选择器，None表示滚动整个页面
+            direction: 滚动方向，'up', 'down', 'left', 'right'
+            distance: 滚动距离，None表示自动
+            smooth: 是否使用平滑滚动动画，默认瞬间跳转
+        
+        返回:
+            bool: 是否滚动成功
+        """
+        return await self._run_in_executor(self.scroll, selector, direction, distance, smooth)
+    
+    async def asleep(self, time: float) -> 'DrissionResponse':
+        """
+        等待指定时间(wait的异步版本)
+        
+        直接使用asyncio.sleep，不占用线程
+        
+        参数:
+            time: 等待时间(秒)
+        
+        返回:
+            DrissionResponse: 响应对象自身
+        """
+        if not self._page:
+            self.logger.warning("页面对象不存在，无法执行等待操作")
+            return self
+        
+        await asyncio.sleep(time)
+        return self
+    
+    async def arefresh(self) -> 'DrissionResponse':
+        """
+        刷新页面(异步版本)
+        
+        返回:
+            DrissionResponse: 响应对象自身
+        """
+        return await self._run_in_executor(self.refresh)
+    
+    async def aexecute_script(self, script: str, *args: Any) -> Any:
+        """
+        执行JavaScript脚本(异步版本)
+        
+        参数:
+            script: JavaScript脚本
+            *args: 脚本参数
+        
+        返回:
+            Any: 脚本执行结果
+        """
+        return await self._run_in_executor(self.execute_script, script, *args)
+    
     def __str__(self) -> str:
         """返回响应的字符串表示"""
-        page_type = 'chromium' if self._is_chromium else 'session' if self._is_session else 'unknown'
+        page_type = 'chromium' if self.is_chromium else 'session' if self.is_session else 'unknown'
         return f"<DrissionResponse {self.status} {self.url} [{page_type}]>"
     
-    __repr__ = __str__ 
\ No newline at end of file
+    __repr__ = __str__ 
+
+
+def _remove_quietly(path: str) -> None:
+    """删除临时文件，忽略文件不存在等错误"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
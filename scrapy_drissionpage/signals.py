@@ -0,0 +1,9 @@
+"""
+信号 - 本包发送的Scrapy信号
+
+通过 ``crawler.signals.connect(handler, signal=response_processed)`` 连接
+"""
+
+# 响应的回调输出(包括快照响应的回调输出)全部消费后发送，参数: response, spider
+# 需启用DrissionSpiderMiddleware
+response_processed = object()
@@ -8,6 +8,12 @@ from DrissionPage import ChromiumPage, SessionPage
 
 from .request import DrissionRequest
 from .browser_manager import BrowserManager
+from .utils.api_replay import ApiReplayer
+
+# 爬虫依赖的下载器中间件
+MIDDLEWARE_PATH = 'scrapy_drissionpage.middleware.DrissionPageMiddleware'
+# 处理快照响应和页面释放的爬虫中间件
+SPIDER_MIDDLEWARE_PATH = 'scrapy_drissionpage.middleware.DrissionSpiderMiddleware'
 
 
 class DrissionSpider(Spider):
@@ -19,25 +25,50 @@ class DrissionSpider(Spider):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         
-        # 确保中间件启用
-        if 'DOWNLOADER_MIDDLEWARES' not in self.settings:
-            self.settings['DOWNLOADER_MIDDLEWARES'] = {}
-        if 'scrapy_drissionpage.middleware.DrissionPageMiddleware' not in self.settings['DOWNLOADER_MIDDLEWARES']:
-            self.settings['DOWNLOADER_MIDDLEWARES']['scrapy_drissionpage.middleware.DrissionPageMiddleware'] = 543
-        
-        # 初始化浏览器管理器
-        self._browser_manager = BrowserManager(self.settings)
+        # 浏览器管理器在首次使用时获取，此时爬虫已绑定Crawler和设置
+        self._browser_manager = None
         self._global_proxy = None
+        self._api_replayer = None
+    
+    @classmethod
+    def update_settings(cls, settings):
+        """
+        合并爬虫设置，确保中间件启用
+        
+        参数:
+            settings: Scrapy设置对象
+        """
+        super().update_settings(settings)
+        # 只加入本包的中间件，保留项目中配置的其他中间件
+        if MIDDLEWARE_PATH not in settings.getdict('DOWNLOADER_MIDDLEWARES'):
+            settings['DOWNLOADER_MIDDLEWARES'].set(MIDDLEWARE_PATH, 543, 'spider')
+        if SPIDER_MIDDLEWARE_PATH not in settings.getdict('SPIDER_MIDDLEWARES'):
+            settings['SPIDER_MIDDLEWARES'].set(SPIDER_MIDDLEWARE_PATH, 543, 'spider')
+    
+    @property
+    def browser_manager(self):
+        """
+        获取浏览器管理器
+        
+        通过Crawler启动时与中间件、下载器共享同一个实例
+        """
+        if self._browser_manager is None:
+            crawler = getattr(self, 'crawler', None)
+            if crawler is not None:
+                self._browser_manager = BrowserManager.from_crawler(crawler)
+            else:
+                self._browser_manager = BrowserManager(self.settings)
+        return self._browser_manager
     
     @property
     def chromium(self):
         """获取浏览器实例"""
-        return self._browser_manager.get_browser()
+        return self.browser_manager.get_browser()
     
     @property
     def session(self):
         """获取会话实例(新增属性)"""
-        return self._browser_manager.get_session()
+        return self.browser_manager.get_session()
     
     @property
     def current_tab(self):
@@ -122,7 +153,7 @@ class DrissionSpider(Spider):
         """
         self._global_proxy = proxy
         # 同时设置浏览器和会话的代理
-        self._browser_manager.set_proxy(proxy)
+        self.browser_manager.set_proxy(proxy)
     
     def listen_packets(self, pattern, tab=None):
         """
@@ -154,10 +185,107 @@ class DrissionSpider(Spider):
         tab = tab or self.current_tab
         return tab.listen.wait(pattern=pattern, timeout=timeout)
     
+    @property
+    def api_replayer(self):
+        """获取接口重放器(新增属性)"""
+        if self._api_replayer is None:
+            self._api_replayer = ApiReplayer(self.browser_manager)
+        return self._api_replayer
+    
+    def replay_packet(self, packet, callback=None, learn=False, tab=None, **kwargs):
+        """
+        将监听到的数据包转换为会话模式请求(新增功能)
+        
+        参数:
+            packet: listen_packets/wait_packet获取的数据包
+            callback: 回调函数
+            learn: 是否同时学习该域名的接口模板
+            tab: 读取cookies的标签页，默认为浏览器实例
+            **kwargs: 其他参数
+        
+        返回:
+            DrissionRequest: 携带请求方法、请求头、请求体和浏览器cookies的会话模式请求
+        """
+        if learn:
+            self.api_replayer.learn(packet)
+        if self._global_proxy and 'proxy' not in kwargs:
+            kwargs['proxy'] = self._global_proxy
+        return self.api_replayer.to_request(
+            packet,
+            callback=callback or self.parse,
+            tab=tab,
+            **kwargs
+        )
+    
+    @property
+    def downloads(self):
+        """获取下载管理器"""
+        return self.browser_manager.downloads
+    
+    def download(self, locator, name=None, tab=None, timeout=None):
+        """
+        点击元素下载文件，下载开始后返回，下载在后台进行
+        
+        文件保存在以标签页ID命名的独立目录中，多个回调同时下载不会互相覆盖文件名
+        
+        参数:
+            locator: 触发下载的元素定位符或元素
+            name: 文件名，None表示使用服务器建议的文件名
+            tab: 指定标签页，默认为当前标签页
+            timeout: 等待下载开始的超时时间
+        
+        返回:
+            DownloadTask: 下载任务
+        """
+        tab = tab or self.current_tab
+        return self.downloads.click(tab, locator, name=name, timeout=timeout)
+    
+    def fetch_file(self, url, name=None, tab=None, headers=None):
+        """
+        以会话模式下载文件，支持断点续传
+        
+        参数:
+            url: 文件URL
+            name: 文件名，None表示取URL路径的最后一段
+            tab: 提供Cookie和User-Agent的标签页
+            headers: 额外的请求头
+        
+        返回:
+            DownloadTask: 下载任务
+        """
+        return self.downloads.fetch(url, name=name, tab=tab, headers=headers)
+    
+    def download_item(self, task):
+        """
+        等待下载完成，返回与FilesPipeline结果格式相同的item的Deferred
+        
+        字段名取自FILES_URLS_FIELD和FILES_RESULT_FIELD设置，path相对于下载根目录
+        
+        参数:
+            task: 下载任务
+        
+        返回:
+            Deferred: 结果为item字典，下载失败时为失败原因
+        """
+        downloads = self.downloads
+        
+        def to_item(finished):
+            if finished.state != 'completed':
+                raise finished.error or RuntimeError(f"下载未完成: {finished!r}")
+            return finished.to_item(
+                downloads.root,
+                urls_field=self.settings.get('FILES_URLS_FIELD', 'file_urls'),
+                result_field=self.settings.get('FILES_RESULT_FIELD', 'files')
+            )
+        
+        return downloads.when_done(task).addCallback(to_item)
+    
     def set_download_path(self, path, tab=None):
         """
         设置下载路径(新增功能)
         
+        该设置作用于整个标签页，多个回调同时下载时建议使用download
+        
         参数:
             path: 下载路径
             tab: 指定标签页，默认为当前标签页
@@ -169,6 +297,8 @@ class DrissionSpider(Spider):
         """
         设置下载文件名(新增功能)
         
+        该设置作用于标签页的下一次下载，多个回调同时下载时建议使用download(name=...)
+        
         参数:
             name: 文件名
             tab: 指定标签页，默认为当前标签页
@@ -197,6 +327,8 @@ class DrissionSpider(Spider):
         参数:
             reason (str): 关闭原因
         """
-        # 关闭浏览器管理器
-        self._browser_manager.close()
-        super().closed(reason) 
\ No newline at end of file
+        # 关闭爬虫自行创建的浏览器管理器，Crawler共享的实例在引擎停止时关闭
+        crawler = getattr(self, 'crawler', None)
+        shared = getattr(crawler, 'drission_browser_manager', None) if crawler is not None else None
+        if self._browser_manager is not None and self._browser_manager is not shared:
+            self._browser_manager.close() 
\ No newline at end of file
@@ -1,8 +1,47 @@
 """
 工具模块 - 提供各种辅助功能
+
+工具类在首次访问时才导入对应模块
 """
 
-from .mode_switcher import ModeSwitcher
-from .selector import EnhancedSelector
+import importlib
+from typing import TYPE_CHECKING
+
+# 导出名 -> 所在的子模块
+_LAZY_ATTRS = {
+    'ModeSwitcher': '.mode_switcher',
+    'EnhancedSelector': '.selector',
+    'SelectorCache': '.selector',
+    'ApiReplayer': '.api_replay',
+    'ApiTemplate': '.api_replay',
+    'ExtractionSpec': '.extractor',
+    'Table': '.tables',
+}
+
+if TYPE_CHECKING:
+    from .mode_switcher import ModeSwitcher
+    from .selector import EnhancedSelector, SelectorCache
+    from .api_replay import ApiReplayer, ApiTemplate
+    from .extractor import ExtractionSpec
+    from .tables import Table
+
+
+def __getattr__(name: str):
+    """首次访问工具类时导入对应子模块，并缓存到模块命名空间"""
+    try:
+        module_name = _LAZY_ATTRS[name]
+    except KeyError:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}") from None
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY_ATTRS))
+
 
-__all__ = ['ModeSwitcher', 'EnhancedSelector'] 
\ No newline at end of file
+__all__ = [
+    'ModeSwitcher', 'EnhancedSelector', 'SelectorCache', 'ApiReplayer', 'ApiTemplate',
+    'ExtractionSpec', 'Table',
+]
@@ -0,0 +1,293 @@
+"""
+接口重放工具 - 将浏览器监听到的XHR数据包转换为会话模式请求
+"""
+
+import json
+import logging
+from threading import RLock
+from typing import Optional, Dict, Any, Callable, List
+from urllib.parse import urlparse, urlencode, parse_qsl, urlunparse
+
+from ..request import DrissionRequest
+
+
+# 不应随重放请求原样发送的请求头(小写)
+SKIP_HEADERS = frozenset({'host', 'content-length', 'cookie', 'connection'})
+
+
+class ApiTemplate:
+    """
+    接口模板
+    
+    记录某个域名下接口请求的方法、路径、请求头和请求体，用于直接构造后续请求
+    """
+    
+    def __init__(self, method: str, url: str, headers: Dict[str, str], body: Optional[str] = None):
+        """
+        初始化接口模板
+        
+        参数:
+            method: 请求方法
+            url: 学习时的请求URL
+            headers: 请求头
+            body: 请求体
+        """
+        parsed = urlparse(url)
+        self.method = method
+        self.url = url
+        self.domain = parsed.netloc
+        self.path = parsed.path
+        self.params = dict(parse_qsl(parsed.query, keep_blank_values=True))
+        self.headers = headers
+        self.body = body
+    
+    def build_url(self, url: Optional[str] = None, params: Optional[Dict[str, Any]] = None) -> str:
+        """
+        根据模板生成请求URL
+        
+        URL没有路径时使用模板路径；路径与模板相同时，模板的查询参数作为默认值，
+        依次被URL中的查询参数和params覆盖
+        
+        参数:
+            url: 目标URL，None表示使用模板URL
+            params: 需要覆盖的查询参数
+        
+        返回:
+            str: 请求URL
+        """
+        parsed = urlparse(url or self.url)
+        path = parsed.path if parsed.path not in ('', '/') else self.path
+        query = dict(self.params) if path == self.path else {}
+        query.update(parse_qsl(parsed.query, keep_blank_values=True))
+        if params:
+            query.update(params)
+        return urlunparse(parsed._replace(path=path, query=urlencode(query)))
+    
+    def __repr__(self) -> str:
+        return f"<ApiTemplate [{self.method}] {self.domain}{self.path}>"
+
+
+class ApiReplayer:
+    """
+    接口重放器
+    
+    将 ``tab.listen`` 捕获的数据包转换为可直接调度的会话模式 DrissionRequest，
+    并可按域名学习接口模板，之后的页面直接通过接口获取而无需浏览器渲染
+    """
+    
+    def __init__(self, browser_manager=None):
+        """
+        初始化接口重放器
+        
+        参数:
+            browser_manager: 浏览器管理器，用于读取当前浏览器的cookies
+        """
+        self.browser_manager = browser_manager
+        self._templates: Dict[str, ApiTemplate] = {}
+        self._lock = RLock()
+        self.logger = logging.getLogger(__name__)
+    
+    @staticmethod
+    def packet_headers(packet) -> Dict[str, str]:
+        """
+        从数据包中提取可重放的请求头
+        
+        参数:
+            packet: DrissionPage数据包对象
+        
+        返回:
+            Dict[str, str]: 请求头字典
+        """
+        headers = {}
+        for key, value in dict(packet.request.headers or {}).items():
+            # 跳过HTTP/2伪首部和由会话自动生成的首部
+            if key.startswith(':') or key.lower() in SKIP_HEADERS:
+                continue
+            headers[key] = value
+        return headers
+    
+    @staticmethod
+    def packet_body(packet) -> Optional[str]:
+        """
+        从数据包中提取请求体
+        
+        参数:
+            packet: DrissionPage数据包对象
+        
+        返回:
+            Optional[str]: 请求体文本，没有请求体时返回None
+        """
+        post_data = packet.request.postData
+        if not post_data:
+            return None
+        if isinstance(post_data, (dict, list)):
+            return json.dumps(post_data, ensure_ascii=False, separators=(',', ':'))
+        return str(post_data)
+    
+    def browser_cookies(self, tab=None, url: Optional[str] = None) -> Dict[str, str]:
+        """
+        获取浏览器中发送到指定URL的cookies
+        
+        通过CDP按URL读取，接口与页面不同域名(如api子域名)时也能取到对应的cookies
+        
+        参数:
+            tab: 指定标签页，默认使用浏览器管理器的浏览器实例
+            url: 请求URL，None表示标签页当前页面的URL
+        
+        返回:
+            Dict[str, str]: cookies字典
+        """
+        source = tab
+        if source is None and self.browser_manager is not None:
+            source = self.browser_manager.get_browser()
+        if source is None:
+            return {}
+        
+        try:
+            if url is None:
+                cookies = source.run_cdp('Network.getCookies')['cookies']
+            else:
+                cookies = source.run_cdp('Network.getCookies', urls=[url])['cookies']
+            return {cookie['name']: cookie['value'] for cookie in cookies}
+        except Exception as e:
+            self.logger.error(f"读取浏览器cookies失败: {e}")
+            return {}
+    
+    def to_request(
+        self,
+        packet,
+        callback: Optional[Callable] = None,
+        tab=None,
+        with_cookies: bool = True,
+        **kwargs: Any
+    ) -> DrissionRequest:
+        """
+        将数据包转换为会话模式请求
+        
+        参数:
+            packet: DrissionPage数据包对象
+            callback: 回调函数
+            tab: 读取cookies的标签页，默认使用浏览器实例
+            with_cookies: 是否携带当前浏览器cookies
+            **kwargs: 传给DrissionRequest的其他参数
+        
+        返回:
+            DrissionRequest: 会话模式请求
+        """
+        return self._make_request(
+            url=packet.url,
+            method=packet.method or 'GET',
+            headers=self.packet_headers(packet),
+            body=self.packet_body(packet),
+            callback=callback,
+            cookies=self.browser_cookies(tab, packet.url) if with_cookies else None,
+            **kwargs
+        )
+    
+    def learn(self, packet) -> ApiTemplate:
+        """
+        从数据包中学习接口模板，以域名为键保存
+        
+        参数:
+            packet: DrissionPage数据包对象
+        
+        返回:
+            ApiTemplate: 学到的接口模板
+        """
+        template = ApiTemplate(
+            method=packet.method or 'GET',
+            url=packet.url,
+            headers=self.packet_headers(packet),
+            body=self.packet_body(packet)
+        )
+        with self._lock:
+            self._templates[template.domain] = template
+        self.logger.debug(f"已学习接口模板: {template}")
+        return template
+    
+    def get_template(self, url: str) -> Optional[ApiTemplate]:
+        """
+        获取URL所在域名的接口模板
+        
+        参数:
+            url: 页面或接口URL
+        
+        返回:
+            Optional[ApiTemplate]: 接口模板，不存在时返回None
+        """
+        with self._lock:
+            return self._templates.get(urlparse(url).netloc)
+    
+    @property
+    def templates(self) -> List[ApiTemplate]:
+        """已学习的接口模板列表"""
+        with self._lock:
+            return list(self._templates.values())
+    
+    def request_for(
+        self,
+        url: str,
+        callback: Optional[Callable] = None,
+        params: Optional[Dict[str, Any]] = None,
+        body: Optional[str] = None,
+        tab=None,
+        with_cookies: bool = True,
+        **kwargs: Any
+    ) -> Optional[DrissionRequest]:
+        """
+        根据已学习的模板直接构造接口请求
+        
+        参数:
+            url: 接口URL，其域名需已学习过模板
+            callback: 回调函数
+            params: 需要覆盖的查询参数
+            body: 请求体，None表示使用模板中的请求体
+            tab: 读取cookies的标签页，默认使用浏览器实例
+            with_cookies: 是否携带当前浏览器cookies
+            **kwargs: 传给DrissionRequest的其他参数
+        
+        返回:
+            Optional[DrissionRequest]: 会话模式请求，没有对应模板时返回None
+        """
+        template = self.get_template(url)
+        if template is None:
+            return None
+        
+        request_url = template.build_url(url, params)
+        return self._make_request(
+            url=request_url,
+            method=template.method,
+            headers=dict(template.headers),
+            body=body if body is not None else template.body,
+            callback=callback,
+            cookies=self.browser_cookies(tab, request_url) if with_cookies else None,
+            **kwargs
+        )
+    
+    def _make_request(
+        self,
+        url: str,
+        method: str,
+        headers: Dict[str, str],
+        body: Optional[str],
+        callback: Optional[Callable],
+        cookies: Optional[Dict[str, str]],
+        **kwargs: Any
+    ) -> DrissionRequest:
+        """构造会话模式请求，请求头保存在drission元数据中，由中间件原样发送"""
+        meta = kwargs.pop('meta', None)
+        meta = meta.copy() if meta else {}
+        drission = dict(meta.get('drission', {}))
+        drission['headers'] = headers
+        meta['drission'] = drission
+        
+        return DrissionRequest(
+            url=url,
+            callback=callback,
+            method=method,
+            body=body,
+            cookies=cookies or None,
+            meta=meta,
+            page_type='session',
+            **kwargs
+        )
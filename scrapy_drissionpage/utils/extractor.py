@@ -0,0 +1,172 @@
+"""
+批量提取工具 - 将声明式提取规则编译为一次JavaScript调用
+"""
+
+import json
+import re
+from typing import Union, Dict, Any, Optional
+
+from scrapy.selector import Selector
+
+
+# 字段规则格式: CSS选择器 + 可选的 ::text / ::alltext / ::html / ::attr(name) 后缀
+FIELD_PATTERN = re.compile(
+    r'^(?P<css>.*?)(?:::(?P<type>alltext|text|html|attr)(?:\((?P<attr>[^)]+)\))?)?$', re.S
+)
+
+# 列表规则中指定根选择器的键
+ITEMS_KEY = '_items'
+
+# 在浏览器中按编译后的规则一次性提取全部字段，以单个JSON字符串返回
+EXTRACT_JS = '''function(specJson) {
+    const spec = JSON.parse(specJson);
+    function one(root, css) { return css ? root.querySelector(css) : root; }
+    function all(root, css) { return css ? Array.from(root.querySelectorAll(css)) : [root]; }
+    function value(el, node) {
+        if (!el) return null;
+        if (node.t === 'attr') return el.getAttribute(node.a);
+        if (node.t === 'html') return el.outerHTML;
+        if (node.t === 'text') {
+            for (const child of el.childNodes) {
+                if (child.nodeType === Node.TEXT_NODE) return child.data;
+            }
+            return null;
+        }
+        const text = el.textContent;
+        return text === null ? null : text.trim();
+    }
+    function obj(root, fields) {
+        const out = {};
+        for (const key in fields) out[key] = run(root, fields[key]);
+        return out;
+    }
+    function run(root, node) {
+        if (node.o) {
+            if (node.m) return all(root, node.s).map(el => obj(el, node.o));
+            const el = one(root, node.s);
+            return el ? obj(el, node.o) : null;
+        }
+        if (node.m) return all(root, node.s).map(el => value(el, node));
+        return value(one(root, node.s), node);
+    }
+    return JSON.stringify(obj(document, spec.o));
+}'''
+
+
+class ExtractionSpec:
+    """
+    声明式提取规则
+
+    规则为 字段名 → 选择器 的字典，选择器写法:
+
+    - ``'h1::text'``: 第一个匹配元素的第一个直接文本节点，不去除空白，
+      与Scrapy的 ``css('h1::text').get()`` 相同
+    - ``'h1::alltext'``: 第一个匹配元素所有后代文本拼接并去除首尾空白，不写后缀时的默认类型
+    - ``'a::attr(href)'``: 第一个匹配元素的属性
+    - ``'div.item::html'``: 第一个匹配元素的HTML
+    - ``['a::attr(href)']``: 所有匹配元素的值列表
+    - ``{'_items': 'div.quote', 'text': 'span.text::text'}``: 以 ``_items`` 为根的对象列表
+    - ``{'name': 'h1::text'}``: 不指定 ``_items`` 时为同一作用域下的嵌套对象
+
+    规则在创建时编译一次，可在模块级别定义后重复使用
+    """
+
+    def __init__(self, spec: Dict[str, Any]):
+        """
+        初始化提取规则
+
+        参数:
+            spec: 提取规则字典
+        """
+        self.spec = spec
+        self.compiled = {'o': self._compile_fields(spec)}
+        self.json = json.dumps(self.compiled, ensure_ascii=False, separators=(',', ':'))
+
+    @classmethod
+    def wrap(cls, spec: Union['ExtractionSpec', Dict[str, Any]]) -> 'ExtractionSpec':
+        """
+        将规则字典包装为ExtractionSpec，已编译的规则直接返回
+
+        参数:
+            spec: 提取规则字典或ExtractionSpec
+
+        返回:
+            ExtractionSpec: 编译后的提取规则
+        """
+        return spec if isinstance(spec, cls) else cls(spec)
+
+    def _compile_fields(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        """编译一组字段"""
+        return {
+            name: self._compile_node(rule)
+            for name, rule in fields.items()
+            if name != ITEMS_KEY
+        }
+
+    def _compile_node(self, rule: Any) -> Dict[str, Any]:
+        """编译单个字段规则"""
+        if isinstance(rule, dict):
+            node = {'o': self._compile_fields(rule)}
+            if ITEMS_KEY in rule:
+                node['s'] = rule[ITEMS_KEY]
+                node['m'] = True
+            return node
+
+        if isinstance(rule, (list, tuple)):
+            if len(rule) != 1:
+                raise ValueError(f"列表规则只能包含一个选择器: {rule}")
+            node = self._compile_node(rule[0])
+            node['m'] = True
+            return node
+
+        if isinstance(rule, str):
+            match = FIELD_PATTERN.match(rule.strip())
+            node = {'s': match.group('css').strip(), 't': match.group('type') or 'alltext'}
+            if node['t'] == 'attr':
+                if not match.group('attr'):
+                    raise ValueError(f"attr规则缺少属性名: {rule}")
+                node['a'] = match.group('attr').strip()
+            return node
+
+        raise ValueError(f"不支持的提取规则: {rule!r}")
+
+    def extract_static(self, root: Selector) -> Dict[str, Any]:
+        """
+        在静态HTML上按相同规则提取，用于会话模式或页面对象已释放的响应
+
+        参数:
+            root: Scrapy选择器
+
+        返回:
+            Dict[str, Any]: 提取结果
+        """
+        return self._static_obj(root, self.compiled['o'])
+
+    def _static_obj(self, root: Selector, fields: Dict[str, Any]) -> Dict[str, Any]:
+        return {name: self._static_run(root, node) for name, node in fields.items()}
+
+    def _static_run(self, root: Selector, node: Dict[str, Any]) -> Any:
+        css = node.get('s')
+        matches = root.css(css) if css else [root]
+
+        if 'o' in node:
+            if node.get('m'):
+                return [self._static_obj(sel, node['o']) for sel in matches]
+            return self._static_obj(matches[0], node['o']) if matches else None
+
+        if node.get('m'):
+            return [self._static_value(sel, node) for sel in matches]
+        return self._static_value(matches[0], node) if matches else None
+
+    @staticmethod
+    def _static_value(sel: Selector, node: Dict[str, Any]) -> Optional[str]:
+        if node['t'] == 'attr':
+            return sel.attrib.get(node['a'])
+        if node['t'] == 'html':
+            return sel.get()
+        if node['t'] == 'text':
+            return sel.xpath('./text()').get()
+        return ''.join(sel.xpath('.//text()').getall()).strip()
+
+    def __repr__(self) -> str:
+        return f"<ExtractionSpec fields={list(self.compiled['o'])}>"
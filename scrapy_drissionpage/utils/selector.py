@@ -2,30 +2,213 @@
 增强选择器 - 整合Scrapy选择器和DrissionPage元素定位功能
 """
 
-from typing import Union, List, Optional, Any
+from collections import OrderedDict
+from threading import Lock
+from typing import Union, List, Optional, Any, Callable, Dict, Hashable, Pattern
 import logging
-from scrapy.selector import Selector, SelectorList
-from DrissionPage import ChromiumPage, SessionPage, WebElement
+import re
+from scrapy.selector import Selector
+from parsel.csstranslator import css2xpath
+from DrissionPage import ChromiumPage, SessionPage
+from DrissionPage.items import ChromiumElement, SessionElement
+from lxml.etree import XPath, _Element
+
+
+class LRUCache:
+    """
+    线程安全的LRU缓存，记录命中和未命中次数
+    """
+    
+    def __init__(self, maxsize: int = 128):
+        """
+        初始化缓存
+        
+        参数:
+            maxsize: 最多保留的条目数
+        """
+        if maxsize < 1:
+            raise ValueError(f"缓存容量必须大于0: {maxsize}")
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._data: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._lock = Lock()
+    
+    def get(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        """
+        获取缓存的值，不存在时调用factory创建
+        
+        参数:
+            key: 缓存键
+            factory: 创建值的函数
+        
+        返回:
+            Any: 缓存的值
+        """
+        with self._lock:
+            if key in self._data:
+                self.hits += 1
+                self._data.move_to_end(key)
+                return self._data[key]
+            self.misses += 1
+        
+        # 在锁外创建，解析大文档时不阻塞其他线程
+        value = factory()
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return value
+    
+    def info(self) -> Dict[str, int]:
+        """
+        获取缓存统计
+        
+        返回:
+            Dict[str, int]: 包含hits、misses、size、maxsize的字典
+        """
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'size': len(self._data),
+            'maxsize': self.maxsize,
+        }
+    
+    def clear(self) -> None:
+        """清空缓存和统计"""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = 0
+    
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SelectorCache:
+    """
+    选择器缓存
+    
+    缓存解析后的HTML文档、编译后的XPath和正则表达式。同一段HTML多次查询时只解析一次；
+    HTML字符串作为键，同一个字符串对象的哈希值只计算一次。
+    parsel每次查询都会重新编译XPath，这里缓存 ``lxml.etree.XPath`` 对象，CSS选择器先转换为XPath
+    """
+    
+    def __init__(self, max_documents: int = 16, max_patterns: int = 256, max_xpaths: int = 256):
+        """
+        初始化缓存
+        
+        参数:
+            max_documents: 最多缓存的文档数
+            max_patterns: 最多缓存的正则表达式数
+            max_xpaths: 最多缓存的编译后XPath数
+        """
+        self.documents = LRUCache(max_documents)
+        self.patterns = LRUCache(max_patterns)
+        self.xpaths = LRUCache(max_xpaths)
+    
+    def document(self, html: str) -> Selector:
+        """
+        获取HTML解析后的选择器
+        
+        参数:
+            html: HTML内容
+        
+        返回:
+            Selector: Scrapy选择器
+        """
+        return self.documents.get(html, lambda: Selector(text=html))
+    
+    def pattern(self, pattern: Union[str, Pattern], flags: int = 0) -> Pattern:
+        """
+        获取编译后的正则表达式
+        
+        参数:
+            pattern: 正则表达式模式
+            flags: 正则表达式标志
+        
+        返回:
+            Pattern: 编译后的正则表达式
+        """
+        if isinstance(pattern, re.Pattern):
+            return pattern
+        return self.patterns.get((pattern, flags), lambda: re.compile(pattern, flags))
+    
+    def xpath(self, query: str) -> XPath:
+        """
+        获取编译后的XPath，命名空间和返回值类型与parsel一致
+        
+        参数:
+            query: XPath表达式
+        
+        返回:
+            XPath: 编译后的XPath
+        """
+        return self.xpaths.get(query, lambda: XPath(
+            query, namespaces=Selector._default_namespaces, smart_strings=False
+        ))
+    
+    def info(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取各缓存的命中统计
+        
+        返回:
+            Dict[str, Dict[str, int]]: documents、patterns和xpaths的统计
+        """
+        return {
+            'documents': self.documents.info(),
+            'patterns': self.patterns.info(),
+            'xpaths': self.xpaths.info(),
+        }
+    
+    def clear(self) -> None:
+        """清空所有缓存"""
+        self.documents.clear()
+        self.patterns.clear()
+        self.xpaths.clear()
+
+
+# 所有EnhancedSelector默认共享的缓存
+selector_cache = SelectorCache()
 
 
 class EnhancedSelector:
     """
     增强选择器类
     
-    整合Scrapy选择器和DrissionPage元素定位功能
+    整合Scrapy选择器和DrissionPage元素定位功能。
+    使用 ``html`` 参数查询时，解析结果、编译后的XPath和正则表达式缓存在SelectorCache中，
+    同一段HTML执行多个选择器只解析一次。匹配到的元素为基于同一次解析结果的SessionElement，
+    与页面查询返回的元素一样支持 ``.attr``、``.text``、``.ele``、``.eles``
     """
     
-    def __init__(self, page: Union[ChromiumPage, SessionPage, None] = None):
+    def __init__(
+        self, page: Union[ChromiumPage, SessionPage, None] = None,
+        cache: Optional[SelectorCache] = None
+    ):
         """
         初始化增强选择器
         
         参数:
             page: DrissionPage页面对象
+            cache: 选择器缓存，None表示使用共享的selector_cache
         """
         self.page = page
+        self.cache = cache if cache is not None else selector_cache
         self.logger = logging.getLogger(__name__)
     
-    def css(self, selector: str, html: Optional[str] = None) -> List[WebElement]:
+    def cache_info(self) -> Dict[str, Dict[str, int]]:
+        """
+        获取缓存命中统计
+        
+        返回:
+            Dict[str, Dict[str, int]]: documents、patterns和xpaths的hits、misses、size、maxsize
+        """
+        return self.cache.info()
+    
+    def css(
+        self, selector: str, html: Optional[str] = None
+    ) -> List[Union[ChromiumElement, SessionElement, str]]:
         """
         使用CSS选择器查找元素
         
@@ -34,7 +217,8 @@ class EnhancedSelector:
             html: HTML内容，如果提供则使用该内容，否则使用页面内容
             
         返回:
-            List[WebElement]: 元素列表
+            List[Union[ChromiumElement, SessionElement, str]]: 元素列表；
+            使用HTML内容时为SessionElement，选取文本或属性(如 ``::text``、``@href``)时为字符串
         """
         if not self.page and not html:
             self.logger.error("需要提供页面对象或HTML内容")
@@ -42,10 +226,8 @@ class EnhancedSelector:
         
         try:
             if html:
-                # 使用Scrapy选择器处理HTML内容
-                scrapy_selector = Selector(text=html)
-                elements = scrapy_selector.css(selector)
-                return self._convert_to_elements(elements)
+                # CSS转换为XPath后在缓存的解析结果上查询
+                return self._query(css2xpath(selector), html)
             else:
                 # 使用DrissionPage的元素定位功能
                 return self.page.eles(f'css:{selector}')
@@ -53,7 +235,9 @@ class EnhancedSelector:
             self.logger.error(f"CSS选择器查找失败: {e}")
             return []
     
-    def xpath(self, selector: str, html: Optional[str] = None) -> List[WebElement]:
+    def xpath(
+        self, selector: str, html: Optional[str] = None
+    ) -> List[Union[ChromiumElement, SessionElement, str]]:
         """
         使用XPath选择器查找元素
         
@@ -62,7 +246,8 @@ class EnhancedSelector:
             html: HTML内容，如果提供则使用该内容，否则使用页面内容
             
         返回:
-            List[WebElement]: 元素列表
+            List[Union[ChromiumElement, SessionElement, str]]: 元素列表；
+            使用HTML内容时为SessionElement，选取文本或属性(如 ``::text``、``@href``)时为字符串
         """
         if not self.page and not html:
             self.logger.error("需要提供页面对象或HTML内容")
@@ -70,10 +255,8 @@ class EnhancedSelector:
         
         try:
             if html:
-                # 使用Scrapy选择器处理HTML内容
-                scrapy_selector = Selector(text=html)
-                elements = scrapy_selector.xpath(selector)
-                return self._convert_to_elements(elements)
+                # 使用缓存的解析结果和编译后的XPath
+                return self._query(selector, html)
             else:
                 # 使用DrissionPage的元素定位功能
                 return self.page.eles(f'xpath:{selector}')
@@ -81,19 +264,20 @@ class EnhancedSelector:
             self.logger.error(f"XPath选择器查找失败: {e}")
             return []
     
-    def regex(self, pattern: str, html: Optional[str] = None) -> List[str]:
+    def regex(
+        self, pattern: Union[str, Pattern], html: Optional[str] = None, flags: int = 0
+    ) -> List[str]:
         """
         使用正则表达式查找内容
         
         参数:
             pattern: 正则表达式模式
             html: HTML内容，如果提供则使用该内容，否则使用页面内容
+            flags: 正则表达式标志
             
         返回:
             List[str]: 匹配结果列表
         """
-        import re
-        
         if not self.page and not html:
             self.logger.error("需要提供页面对象或HTML内容")
             return []
@@ -103,23 +287,32 @@ class EnhancedSelector:
             content = html if html else self.page.html
             
             # 使用正则表达式查找
-            matches = re.findall(pattern, content)
+            matches = self.cache.pattern(pattern, flags).findall(content)
             return matches
         except Exception as e:
             self.logger.error(f"正则表达式查找失败: {e}")
             return []
     
-    def _convert_to_elements(self, selector_list: SelectorList) -> List[WebElement]:
+    def _query(self, query: str, html: str) -> List[Union[SessionElement, str]]:
         """
-        将Scrapy选择器列表转换为WebElement列表
+        在缓存的解析结果上执行编译后的XPath
+        
+        元素节点包装为SessionElement，直接使用已解析的lxml节点，不再重新解析；
+        文本和属性等非元素结果按parsel的规则转换为字符串
         
         参数:
-            selector_list: Scrapy选择器列表
+            query: XPath表达式
+            html: HTML内容
             
         返回:
-            List[WebElement]: WebElement列表
+            List[Union[SessionElement, str]]: 元素列表
         """
-        # 注意：这是一个不完整的实现，因为无法直接将Scrapy选择器转换为WebElement
-        # 这里只是返回选择器的文本内容
-        self.logger.warning("转换为WebElement的功能不完整，只返回文本内容")
-        return [selector.get() for selector in selector_list] 
\ No newline at end of file
+        document = self.cache.document(html)
+        result = self.cache.xpath(query)(document.root)
+        if not isinstance(result, list):
+            result = [result]
+        return [
+            SessionElement(node) if isinstance(node, _Element)
+            else node if isinstance(node, str) else Selector(root=node, type='html').get()
+            for node in result
+        ]
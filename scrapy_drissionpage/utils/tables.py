@@ -0,0 +1,385 @@
+"""
+表格提取工具 - 一次解析提取整个HTML表格，按列返回并批量推断类型
+"""
+
+import json
+import re
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
+
+# 单元格: (文本, colspan, rowspan)
+Cell = Tuple[str, int, int]
+# 行: (是否表头行, 单元格列表)
+RawRow = Tuple[bool, List[Cell]]
+
+# 在浏览器中一次性收集匹配表格的所有单元格，以单个JSON字符串返回
+# 每个单元格为文本，或跨行跨列时为 [文本, colspan, rowspan]
+TABLES_JS = '''function(selector) {
+    const out = [];
+    for (const table of document.querySelectorAll(selector)) {
+        if (!table.rows) continue;
+        const rows = [];
+        for (const row of table.rows) {
+            const cells = [];
+            let header = row.cells.length > 0;
+            for (const cell of row.cells) {
+                const text = cell.textContent.trim();
+                if (cell.tagName !== 'TH') header = false;
+                const spanned = cell.colSpan > 1 || cell.rowSpan > 1;
+                cells.push(spanned ? [text, cell.colSpan, cell.rowSpan] : text);
+            }
+            rows.push([header || row.parentElement.tagName === 'THEAD', cells]);
+        }
+        out.push({caption: table.caption ? table.caption.textContent.trim() : null, rows: rows});
+    }
+    return JSON.stringify(out);
+}'''
+
+# 表格自身的行，不包括嵌套表格中的行
+ROWS_XPATH = './tr | ./thead/tr | ./tbody/tr | ./tfoot/tr'
+
+# 整列一次匹配: 各值以换行连接后用一个正则判断
+INT_PATTERN = r'[+-]?(?:\d{1,3}(?:,\d{3})+|\d+)'
+FLOAT_PATTERN = r'[+-]?(?:(?:\d{1,3}(?:,\d{3})+|\d+)(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?'
+INT_COLUMN = re.compile(rf'{INT_PATTERN}(?:\n{INT_PATTERN})*')
+FLOAT_COLUMN = re.compile(rf'{FLOAT_PATTERN}(?:\n{FLOAT_PATTERN})*')
+
+
+class Table:
+    """
+    按列保存的表格
+    
+    ``table['价格']`` 返回一列的值列表，``table.rows()`` 逐行返回字典。
+    安装了pandas或pyarrow时可通过to_pandas/to_arrow转换
+    """
+    
+    def __init__(
+        self, columns: Sequence[str], data: Dict[str, List[Any]], caption: Optional[str] = None
+    ):
+        """
+        初始化表格
+        
+        参数:
+            columns: 列名
+            data: 列名 -> 该列的值列表
+            caption: 表格标题
+        """
+        self.columns = list(columns)
+        self.data = data
+        self.caption = caption
+    
+    @classmethod
+    def from_rows(
+        cls,
+        raw_rows: Sequence[RawRow],
+        header: Optional[bool] = None,
+        infer_types: bool = True,
+        caption: Optional[str] = None
+    ) -> 'Table':
+        """
+        根据原始行创建表格
+        
+        展开colspan和rowspan；header为None时，开头的表头行(全部为th或位于thead中)作为列名，
+        多行表头以 ``/`` 连接
+        
+        参数:
+            raw_rows: 原始行
+            header: 是否以第一行为列名，None表示自动判断
+            infer_types: 是否推断整数和浮点数列
+            caption: 表格标题
+        
+        返回:
+            Table: 表格
+        """
+        grid = _expand(raw_rows)
+        width = max((len(row) for row in grid), default=0)
+        
+        if header is None:
+            header_rows = 0
+            while header_rows < len(grid) - 1 and raw_rows[header_rows][0]:
+                header_rows += 1
+        else:
+            header_rows = 1 if header and grid else 0
+        
+        if header_rows:
+            names = [
+                '/'.join(_unique_parts(
+                    row[i] if i < len(row) else '' for row in grid[:header_rows]
+                ))
+                for i in range(width)
+            ]
+        else:
+            names = []
+        columns = _column_names(names, width)
+        
+        body = grid[header_rows:]
+        data: Dict[str, List[Any]] = {}
+        for i, name in enumerate(columns):
+            values = [row[i] if i < len(row) else '' for row in body]
+            data[name] = infer_column(values) if infer_types else values
+        return cls(columns, data, caption)
+    
+    def __getitem__(self, column: str) -> List[Any]:
+        return self.data[column]
+    
+    def __len__(self) -> int:
+        return len(self.data[self.columns[0]]) if self.columns else 0
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        return self.rows()
+    
+    def __repr__(self) -> str:
+        return f'<Table {len(self)}x{len(self.columns)} columns={self.columns}>'
+    
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """
+        逐行返回 列名 -> 值 的字典
+        
+        返回:
+            Iterator[Dict[str, Any]]: 行迭代器
+        """
+        for values in zip(*(self.data[name] for name in self.columns)):
+            yield dict(zip(self.columns, values))
+    
+    def to_dict(self) -> Dict[str, List[Any]]:
+        """
+        转换为 列名 -> 值列表 的字典
+        
+        返回:
+            Dict[str, List[Any]]: 按列的字典
+        """
+        return {name: self.data[name] for name in self.columns}
+    
+    def to_pandas(self):
+        """
+        转换为pandas.DataFrame
+        
+        返回:
+            pandas.DataFrame: 数据框
+        """
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError("to_pandas需要安装pandas: pip install pandas")
+        return pandas.DataFrame(self.to_dict(), columns=self.columns)
+    
+    def to_arrow(self):
+        """
+        转换为pyarrow.Table
+        
+        返回:
+            pyarrow.Table: Arrow表格
+        """
+        try:
+            import pyarrow
+        except ImportError:
+            raise ImportError("to_arrow需要安装pyarrow: pip install pyarrow")
+        return pyarrow.table(self.to_dict())
+
+
+def infer_column(values: List[str]) -> List[Any]:
+    """
+    推断一列的类型
+    
+    整列(忽略空值)都是整数时转换为int，都是数字时转换为float，否则保持字符串；空值为None。
+    整列以换行连接后只用一次正则匹配判断
+    
+    参数:
+        values: 单元格文本
+    
+    返回:
+        List[Any]: 转换后的值
+    """
+    present = [value for value in values if value]
+    joined = '\n'.join(present)
+    # 值本身包含换行时不能按行匹配
+    if not present or joined.count('\n') != len(present) - 1:
+        return [value or None for value in values]
+    
+    if INT_COLUMN.fullmatch(joined):
+        convert = int
+    elif FLOAT_COLUMN.fullmatch(joined):
+        convert = float
+    else:
+        return [value or None for value in values]
+    
+    if ',' in joined:
+        return [convert(value.replace(',', '')) if value else None for value in values]
+    return [convert(value) if value else None for value in values]
+
+
+def static_rows(table) -> List[RawRow]:
+    """
+    从已解析的lxml表格节点中读取原始行
+    
+    参数:
+        table: lxml表格元素
+    
+    返回:
+        List[RawRow]: 原始行
+    """
+    raw_rows = []
+    for row in table.xpath(ROWS_XPATH):
+        cells = []
+        header = True
+        for cell in row:
+            tag = cell.tag
+            if tag != 'td' and tag != 'th':
+                continue
+            if tag == 'td':
+                header = False
+            # 没有子元素的单元格直接取text，避免遍历文本节点
+            text = ''.join(cell.itertext()) if len(cell) else (cell.text or '')
+            attrib = cell.attrib
+            cells.append((
+                _normalize(text),
+                _span(attrib['colspan']) if 'colspan' in attrib else 1,
+                _span(attrib['rowspan']) if 'rowspan' in attrib else 1,
+            ))
+        raw_rows.append((bool(cells) and (header or row.getparent().tag == 'thead'), cells))
+    return raw_rows
+
+
+def static_tables(
+    selector,
+    css: str = 'table',
+    header: Optional[bool] = None,
+    infer_types: bool = True
+) -> List[Table]:
+    """
+    在已解析的静态HTML上提取表格
+    
+    参数:
+        selector: Scrapy选择器
+        css: 表格的CSS选择器
+        header: 是否以第一行为列名，None表示自动判断
+        infer_types: 是否推断数值列
+    
+    返回:
+        List[Table]: 表格列表
+    """
+    tables = []
+    for match in selector.css(css):
+        element = match.root
+        if getattr(element, 'tag', None) != 'table':
+            continue
+        caption = element.find('caption')
+        tables.append(Table.from_rows(
+            static_rows(element),
+            header=header,
+            infer_types=infer_types,
+            caption=' '.join(caption.text_content().split()) if caption is not None else None,
+        ))
+    return tables
+
+
+def live_tables(
+    page,
+    css: str = 'table',
+    header: Optional[bool] = None,
+    infer_types: bool = True
+) -> List[Table]:
+    """
+    在浏览器中通过一次run_js调用收集表格
+    
+    参数:
+        page: 页面或标签页对象
+        css: 表格的CSS选择器
+        header: 是否以第一行为列名，None表示自动判断
+        infer_types: 是否推断数值列
+    
+    返回:
+        List[Table]: 表格列表
+    """
+    tables = []
+    for raw in json.loads(page.run_js(TABLES_JS, css)):
+        raw_rows = [
+            (is_header, [
+                (_normalize(cell), 1, 1) if isinstance(cell, str)
+                else (_normalize(cell[0]), cell[1], cell[2])
+                for cell in cells
+            ])
+            for is_header, cells in raw['rows']
+        ]
+        tables.append(Table.from_rows(
+            raw_rows, header=header, infer_types=infer_types, caption=raw['caption']
+        ))
+    return tables
+
+
+def _normalize(text: str) -> str:
+    """去掉首尾空白，内部连续空白合并为一个空格"""
+    text = text.strip()
+    if '\n' in text or '  ' in text or '\t' in text or '\r' in text:
+        return ' '.join(text.split())
+    return text
+
+
+def _span(value: Optional[str]) -> int:
+    """解析colspan/rowspan属性"""
+    try:
+        return max(1, min(int(value), 1000))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _expand(raw_rows: Sequence[RawRow]) -> List[List[str]]:
+    """展开colspan和rowspan，返回文本网格"""
+    if all(colspan == 1 and rowspan == 1 for _, cells in raw_rows for _, colspan, rowspan in cells):
+        return [[cell[0] for cell in cells] for _, cells in raw_rows]
+    
+    grid: List[List[str]] = []
+    # 列号 -> (剩余行数, 文本)
+    pending: Dict[int, Tuple[int, str]] = {}
+    for _, cells in raw_rows:
+        row: List[str] = []
+        cells = iter(cells)
+        column = 0
+        while True:
+            if column in pending:
+                remaining, text = pending[column]
+                row.append(text)
+                if remaining > 1:
+                    pending[column] = (remaining - 1, text)
+                else:
+                    del pending[column]
+                column += 1
+                continue
+            cell = next(cells, None)
+            if cell is None:
+                if any(index > column for index in pending):
+                    row.append('')
+                    column += 1
+                    continue
+                break
+            text, colspan, rowspan = cell
+            for _ in range(colspan):
+                row.append(text)
+                if rowspan > 1:
+                    pending[column] = (rowspan - 1, text)
+                column += 1
+        grid.append(row)
+    return grid
+
+
+def _unique_parts(parts) -> List[str]:
+    """多行表头合并时去掉重复和空白部分"""
+    result: List[str] = []
+    for part in parts:
+        if part and (not result or result[-1] != part):
+            result.append(part)
+    return result
+
+
+def _column_names(names: List[str], width: int) -> List[str]:
+    """补全空列名并去重"""
+    columns: List[str] = []
+    seen: Dict[str, int] = {}
+    for i in range(width):
+        name = names[i] if i < len(names) and names[i] else f'column_{i}'
+        if name in seen:
+            seen[name] += 1
+            name = f'{name}_{seen[name]}'
+        else:
+            seen[name] = 0
+        columns.append(name)
+    return columns
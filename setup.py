@@ -35,5 +35,8 @@ setup(
     ],
     python_requires=">=3.9",
     install_requires=read_requirements("requirements.txt"),
+    extras_require={
+        "cdp": ["websockets>=10.0"],
+    },
     keywords="scrapy, drissionpage, crawler, spider, web scraping, automation, commercial-use, personal-use",
 ) 
\ No newline at end of file
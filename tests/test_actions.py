@@ -0,0 +1,82 @@
+"""
+ActionRunner测试
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from scrapy_drissionpage.actions import ActionRunner
+from scrapy_drissionpage.harvest import SCROLL_PAGE_JS
+
+
+class TestActionRunner:
+    """ActionRunner测试类"""
+    
+    def test_run(self):
+        """测试依次执行动作并收集快照和evaluate结果"""
+        page = MagicMock()
+        page.url = 'https://example.com'
+        page.html = '<html></html>'
+        page.run_js.return_value = 3
+        
+        snapshots, results = ActionRunner().run(page, [
+            {'method': 'click', 'args': ['#more'], 'kwargs': {'timeout': 2}},
+            {'method': 'wait_for', 'args': ['.item']},
+            {'method': 'evaluate', 'args': ['return 1 + 2']},
+            {'method': 'snapshot'},
+        ])
+        
+        # 验证动作调用
+        page.ele.assert_called_once_with('#more', timeout=2)
+        page.ele.return_value.click.assert_called_once()
+        page.wait.eles_loaded.assert_called_once_with('.item', timeout=None, raise_err=True)
+        
+        # 验证快照和结果
+        assert snapshots == [('https://example.com', '<html></html>')]
+        assert results == [3]
+    
+    def test_scroll(self):
+        """测试scroll动作与response.scroll相同：页面通过脚本滚动，元素水平方向默认100像素"""
+        page = MagicMock()
+        ActionRunner().run(page, [
+            {'method': 'scroll'},
+            {'method': 'scroll', 'kwargs': {'direction': 'right'}},
+            {'method': 'scroll', 'kwargs': {'direction': 'up', 'distance': 50, 'smooth': True}},
+            {'method': 'scroll', 'kwargs': {'direction': 'left', 'locator': '#list'}},
+        ])
+        
+        assert page.run_js.call_args_list == [
+            ((SCROLL_PAGE_JS, 'down', None, False),),
+            ((SCROLL_PAGE_JS, 'right', 300, False),),
+            ((SCROLL_PAGE_JS, 'up', 50, True),),
+        ]
+        page.scroll.to_bottom.assert_not_called()
+        page.ele.return_value.scroll.left.assert_called_once_with(100)
+        
+        with pytest.raises(ValueError):
+            ActionRunner().run(page, [{'method': 'scroll', 'kwargs': {'direction': 'sideways'}}])
+    
+    def test_unknown_action(self):
+        """测试不支持的动作"""
+        with pytest.raises(ValueError):
+            ActionRunner().run(MagicMock(), [{'method': 'fly'}])
+    
+    def test_scroll_harvest(self):
+        """测试scroll_harvest动作将每次新增节点记录为快照"""
+        from scrapy_drissionpage.harvest import INSTALL_JS, DRAIN_JS
+        
+        drains = iter(['["<li>a</li>", "<li>b</li>"]', '[]'])
+        page = MagicMock()
+        page.url = 'https://example.com/feed'
+        page.run_js.side_effect = lambda script, *args: (
+            True if script == INSTALL_JS else next(drains) if script == DRAIN_JS else None
+        )
+        
+        snapshots, _ = ActionRunner().run(page, [
+            {'method': 'scroll_harvest', 'kwargs': {'idle_steps': 1, 'interval': 0}},
+        ])
+        
+        # 验证快照只包含新增节点
+        assert snapshots == [
+            ('https://example.com/feed', '<html><body><li>a</li><li>b</li></body></html>')
+        ]
@@ -0,0 +1,169 @@
+"""
+asyncio CDP引擎测试
+"""
+
+import asyncio
+import json
+
+import pytest
+from unittest.mock import patch
+from scrapy.settings import Settings
+
+from scrapy_drissionpage.async_cdp import (
+    AsyncCDPConnection, AsyncCDPTab, AsyncBrowser, AsyncBrowserManager, CDPError
+)
+
+
+class FakeWebSocket:
+    """模拟浏览器websocket，按命令名称自动回复"""
+    
+    def __init__(self, handlers=None):
+        self.handlers = handlers or {}
+        self.sent = []
+        self.incoming = asyncio.Queue()
+    
+    async def send(self, raw):
+        message = json.loads(raw)
+        self.sent.append(message)
+        handler = self.handlers.get(message['method'])
+        result, events = handler(message) if handler else ({}, [])
+        # 先推送事件，再回复命令结果
+        for event in events:
+            await self.incoming.put(json.dumps(event))
+        await self.incoming.put(json.dumps({'id': message['id'], 'result': result}))
+    
+    def __aiter__(self):
+        return self
+    
+    async def __anext__(self):
+        raw = await self.incoming.get()
+        if raw is None:
+            raise StopAsyncIteration
+        return raw
+    
+    def drop(self):
+        """模拟浏览器断开连接"""
+        self.incoming.put_nowait(None)
+    
+    async def close(self):
+        pass
+
+
+class TestAsyncCDPConnection:
+    """AsyncCDPConnection测试类"""
+    
+    def test_multiplex_sessions(self):
+        """测试多个会话的命令在同一连接上并发收发"""
+        def evaluate(message):
+            return {'result': {'value': message['sessionId']}}, []
+        
+        async def run():
+            ws = FakeWebSocket({'Runtime.evaluate': evaluate})
+            connection = await AsyncCDPConnection('ws://fake').connect(ws)
+            tabs = [AsyncCDPTab(connection, f'target-{i}', f'session-{i}') for i in range(3)]
+            
+            results = await asyncio.gather(*(tab.run_js('1') for tab in tabs))
+            await connection.close()
+            return ws, results
+        
+        ws, results = asyncio.run(run())
+        
+        # 验证每个标签页拿到自己会话的结果
+        assert results == ['session-0', 'session-1', 'session-2']
+        assert len({message['id'] for message in ws.sent}) == 3
+    
+    def test_error_response(self):
+        """测试命令错误转换为CDPError"""
+        class ErrorWebSocket(FakeWebSocket):
+            async def send(self, raw):
+                message = json.loads(raw)
+                error = {'id': message['id'], 'error': {'message': 'boom'}}
+                await self.incoming.put(json.dumps(error))
+        
+        async def run():
+            connection = await AsyncCDPConnection('ws://fake').connect(ErrorWebSocket())
+            try:
+                await connection.send('Page.navigate', url='https://example.com')
+            finally:
+                await connection.close()
+        
+        with pytest.raises(CDPError):
+            asyncio.run(run())
+
+
+class TestAsyncBrowser:
+    """AsyncBrowser测试类"""
+    
+    def test_new_tab_and_get(self):
+        """测试以flatten模式创建标签页并等待加载事件"""
+        def navigate(message):
+            event = {
+                'sessionId': message['sessionId'], 'method': 'Page.loadEventFired', 'params': {}
+            }
+            return {'frameId': 'frame'}, [event]
+        
+        handlers = {
+            'Target.createTarget': lambda m: ({'targetId': 'target-1'}, []),
+            'Target.attachToTarget': lambda m: ({'sessionId': 'session-1'}, []),
+            'Page.navigate': navigate,
+        }
+        
+        async def run():
+            ws = FakeWebSocket(handlers)
+            connection = await AsyncCDPConnection('ws://fake').connect(ws)
+            browser = AsyncBrowser(connection)
+            tab = await browser.new_tab('https://example.com')
+            await connection.close()
+            return ws, tab
+        
+        ws, tab = asyncio.run(run())
+        
+        # 验证附加会话时使用flatten模式
+        attach = next(m for m in ws.sent if m['method'] == 'Target.attachToTarget')
+        assert attach['params'] == {'targetId': 'target-1', 'flatten': True}
+        
+        # 验证标签页命令携带sessionId
+        navigate_message = next(m for m in ws.sent if m['method'] == 'Page.navigate')
+        assert navigate_message['sessionId'] == 'session-1'
+        assert tab.tab_id == 'target-1'
+
+
+class TestAsyncBrowserManager:
+    """AsyncBrowserManager测试类"""
+    
+    def test_reconnect_after_drop(self):
+        """测试websocket断开后丢弃空闲标签页并重新连接"""
+        handlers = {
+            'Target.createTarget': lambda m: ({'targetId': 'target-1'}, []),
+            'Target.attachToTarget': lambda m: ({'sessionId': 'session-1'}, []),
+        }
+        sockets = []
+        
+        async def connect(cls, host='127.0.0.1', port=9222):
+            ws = FakeWebSocket(handlers)
+            sockets.append(ws)
+            return cls(await AsyncCDPConnection('ws://fake').connect(ws))
+        
+        async def run():
+            manager = AsyncBrowserManager(Settings({'DRISSIONPAGE_INIT_MODE': 'connect'}))
+            with patch.object(AsyncBrowser, 'connect', classmethod(connect)):
+                first = await manager.acquire_tab()
+                manager.release_tab(first)
+                
+                # 断开连接，等待接收循环退出
+                sockets[0].drop()
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+                
+                second = await manager.acquire_tab()
+                manager.release_tab(second)
+            await manager.close()
+            return first, second
+        
+        first, second = asyncio.run(run())
+        
+        # 验证断开的标签页没有被复用，新标签页使用新连接
+        assert first.connection.closed
+        assert second is not first
+        assert second.connection is not first.connection
+        assert len(sockets) == 2
@@ -34,17 +34,18 @@ class TestBrowserManager:
         mock_chromium_page.assert_not_called()
     
     @patch('scrapy_drissionpage.browser_manager.ChromiumPage')
-    def test_get_browser_connect_mode(self, mock_chromium_page, browser_manager, settings):
+    def test_get_browser_connect_mode(self, mock_chromium_page, settings):
         """测试获取浏览器(connect模式)"""
-        # 设置为connect模式
+        # 设置为connect模式，配置在创建浏览器管理器时解析
         settings.set('DRISSIONPAGE_INIT_MODE', 'connect')
         settings.set('DRISSIONPAGE_CONNECT_HOST', '127.0.0.1')
         settings.set('DRISSIONPAGE_CONNECT_PORT', 9222)
+        browser_manager = BrowserManager(settings)
         
         # 调用获取浏览器
         browser = browser_manager.get_browser()
         assert browser is not None
-        mock_chromium_page.assert_called_once()
+        mock_chromium_page.assert_called_once_with(9222)
     
     @patch('scrapy_drissionpage.browser_manager.SessionPage')
     def test_get_session(self, mock_session_page, browser_manager):
@@ -80,4 +81,35 @@ class TestBrowserManager:
         mock_browser.quit.assert_called_once()
         mock_session.close.assert_called_once()
         assert browser_manager._browser is None
-        assert browser_manager._session is None 
\ No newline at end of file
+        assert browser_manager._session is None
+    
+    def test_from_crawler_shared(self, settings):
+        """测试同一个Crawler中的爬虫、中间件和下载器共享浏览器管理器"""
+        from types import SimpleNamespace
+        from scrapy import signals
+        from scrapy_drissionpage.middleware import DrissionPageMiddleware
+        from scrapy_drissionpage.spider import DrissionSpider
+        
+        crawler = SimpleNamespace(settings=settings, signals=MagicMock())
+        manager = BrowserManager.from_crawler(crawler)
+        assert BrowserManager.from_crawler(crawler) is manager
+        assert crawler.drission_browser_manager is manager
+        crawler.signals.connect.assert_called_once_with(
+            manager.engine_stopped, signal=signals.engine_stopped
+        )
+        
+        spider = DrissionSpider(name='shared')
+        spider.crawler = crawler
+        spider.settings = settings
+        middleware = DrissionPageMiddleware()
+        middleware.crawler = crawler
+        assert spider.browser_manager is manager
+        assert middleware._get_browser_manager(spider) is manager
+        assert not middleware.browser_managers
+        
+        # 共享的实例在引擎停止时关闭，而不是在爬虫关闭时
+        manager._browser = mock_browser = MagicMock()
+        spider.closed('finished')
+        mock_browser.quit.assert_not_called()
+        manager.engine_stopped()
+        mock_browser.quit.assert_called_once()
@@ -0,0 +1,101 @@
+"""
+浏览器配置测试
+"""
+
+import logging
+from dataclasses import FrozenInstanceError
+from unittest.mock import patch
+
+import pytest
+from DrissionPage import ChromiumOptions, SessionOptions
+
+from scrapy_drissionpage.browser_manager import BrowserManager
+from scrapy_drissionpage.config import BrowserConfig, warn_unknown_settings
+
+
+class TestBrowserConfig:
+    """BrowserConfig测试类"""
+    
+    def test_from_settings(self, settings):
+        """测试解析设置"""
+        settings.set('DRISSIONPAGE_HEADLESS', 'False')
+        settings.set('DRISSIONPAGE_LOAD_MODE', 'eager')
+        settings.set('DRISSIONPAGE_TIMEOUT', '15')
+        settings.set('DRISSIONPAGE_CHROME_OPTIONS', ['--mute-audio'])
+        config = BrowserConfig.from_settings(settings)
+        
+        assert config.headless is False
+        assert config.load_mode == 'eager'
+        assert config.timeout == 15.0
+        with pytest.raises(FrozenInstanceError):
+            config.load_mode = 'none'
+    
+    def test_options(self):
+        """测试创建DrissionPage 4.x的ChromiumOptions和SessionOptions"""
+        config = BrowserConfig(
+            headless=True, chrome_options=('--mute-audio', '--window-size=800,600'),
+            load_mode='eager', timeout=15, retry_times=2, retry_interval=0.5,
+            user_agent='test-agent', proxy='http://127.0.0.1:8080'
+        )
+        
+        browser_options = config.browser_options()
+        assert isinstance(browser_options, ChromiumOptions)
+        assert browser_options.is_headless
+        assert '--mute-audio' in browser_options.arguments
+        assert '--window-size=800,600' in browser_options.arguments
+        assert browser_options.load_mode == 'eager'
+        assert browser_options.timeouts['base'] == 15
+        assert (browser_options.retry_times, browser_options.retry_interval) == (2, 0.5)
+        
+        session_options = config.session_options()
+        assert isinstance(session_options, SessionOptions)
+        assert session_options.timeout == 15
+        assert (session_options.retry_times, session_options.retry_interval) == (2, 0.5)
+        assert session_options.headers['user-agent'] == 'test-agent'
+        assert session_options.proxies['https'] == 'http://127.0.0.1:8080'
+    
+    @pytest.mark.parametrize('name, value', [
+        ('DRISSIONPAGE_LOAD_MODE', 'eagre'),
+        ('DRISSIONPAGE_INIT_MODE', 'attach'),
+        ('DRISSIONPAGE_TIMEOUT', 'soon'),
+        ('DRISSIONPAGE_RETRY_TIMES', -1),
+        ('DRISSIONPAGE_CONNECT_PORT', 'localhost'),
+    ])
+    def test_invalid_settings(self, settings, name, value):
+        """测试非法的设置在创建浏览器管理器时抛出ValueError"""
+        settings.set(name, value)
+        with pytest.raises(ValueError):
+            BrowserManager(settings)
+    
+    def test_merge(self):
+        """测试合并请求的覆盖项"""
+        config = BrowserConfig(timeout=10)
+        assert config.merge({}) is config
+        assert config.merge({'page_type': 'chromium', 'load_mode': 'normal'}) is config
+        
+        merged = config.merge({'load_mode': 'eager', 'timeout': 5})
+        assert (merged.load_mode, merged.timeout) == ('eager', 5)
+        assert config.merge({'load_mode': 'eager', 'timeout': 5}) is merged
+        
+        with pytest.raises(ValueError):
+            config.merge({'load_mode': 'fast'})
+    
+    def test_unknown_settings(self, settings, caplog):
+        """测试拼写错误的设置名输出警告并提示已知设置"""
+        settings.set('DRISSIONPAGE_HEADLES', False)
+        with caplog.at_level(logging.WARNING, logger='scrapy_drissionpage.config'):
+            warn_unknown_settings(settings)
+        assert 'DRISSIONPAGE_HEADLES' in caplog.text
+        assert 'DRISSIONPAGE_HEADLESS' in caplog.text
+    
+    @patch('scrapy_drissionpage.browser_manager.ChromiumPage')
+    def test_create_in_parallel(self, mock_chromium_page, settings):
+        """测试按同一个配置创建多个浏览器，不修改管理器的共享状态"""
+        settings.set('DRISSIONPAGE_LOAD_MODE', 'none')
+        manager = BrowserManager(settings)
+        browsers = [manager.create_browser(manager.config) for _ in range(2)]
+        
+        assert mock_chromium_page.call_count == 2
+        options = mock_chromium_page.call_args.kwargs['addr_or_opts']
+        assert options.load_mode == 'none'
+        assert manager._browser is None
@@ -0,0 +1,173 @@
+"""
+浏览器上下文池测试
+"""
+
+import threading
+from itertools import count
+from unittest.mock import MagicMock
+
+import pytest
+
+from scrapy_drissionpage.browser_manager import BrowserManager
+from scrapy_drissionpage.contexts import ContextPool
+from scrapy_drissionpage.dedup import DrissionRequestFingerprinter
+from scrapy_drissionpage.middleware import DrissionPageMiddleware
+from scrapy_drissionpage.request import DrissionRequest
+
+
+def fake_browser_manager():
+    """模拟浏览器，每个新上下文的标签页和上下文ID依次编号"""
+    ids = count()
+    browser = MagicMock()
+    browser.new_tab.side_effect = lambda new_context=False: MagicMock(
+        tab_id=f'tab-{next(ids)}',
+        url='https://example.com/account',
+        html='<html><body>ok</body></html>',
+    )
+    browser.run_cdp.side_effect = lambda cmd, **kwargs: (
+        {'targetInfo': {'browserContextId': 'ctx-' + kwargs['targetId']}}
+        if cmd == 'Target.getTargetInfo' else {}
+    )
+    browser_manager = MagicMock()
+    browser_manager.get_browser.return_value = browser
+    return browser_manager
+
+
+class TestContextPool:
+    """ContextPool测试类"""
+    
+    def test_reuse_by_identity(self):
+        """测试相同身份复用上下文，不同身份使用隔离的上下文"""
+        browser_manager = fake_browser_manager()
+        pool = ContextPool(browser_manager)
+        
+        with pool.use('alice') as first:
+            pass
+        with pool.use('alice') as again:
+            pass
+        with pool.use('bob') as other:
+            pass
+        
+        assert first is again
+        assert first is not other
+        browser_manager.get_browser.return_value.new_tab.assert_called_with(new_context=True)
+        assert pool.stats()['alice']['uses'] == 2
+    
+    def test_lru_eviction(self):
+        """测试超出容量时关闭最久未使用的空闲上下文"""
+        browser_manager = fake_browser_manager()
+        browser = browser_manager.get_browser.return_value
+        pool = ContextPool(browser_manager, max_contexts=2)
+        
+        for identity in ('alice', 'bob', 'alice', 'carol'):
+            pool.release(pool.acquire(identity))
+        
+        assert pool.identities == ['alice', 'carol']
+        browser.run_cdp.assert_any_call(
+            'Target.disposeBrowserContext', browserContextId='ctx-tab-1'
+        )
+    
+    def test_wait_when_all_in_use(self):
+        """测试上下文都在使用中时等待归还"""
+        pool = ContextPool(fake_browser_manager(), max_contexts=1)
+        busy = pool.acquire('alice')
+        
+        with pytest.raises(TimeoutError):
+            pool.acquire('bob', timeout=0.05)
+        
+        threading.Timer(0.05, pool.release, (busy,)).start()
+        context = pool.acquire('bob', timeout=5)
+        assert context.identity == 'bob'
+        assert 'alice' not in pool
+    
+    def test_create_outside_lock(self):
+        """测试创建和销毁上下文时不持有锁，其他线程可以同时访问上下文池"""
+        browser_manager = fake_browser_manager()
+        browser = browser_manager.get_browser.return_value
+        pool = ContextPool(browser_manager, max_contexts=1)
+        unlocked = []
+        
+        def check_unlocked(cmd, **kwargs):
+            # 在另一个线程中访问上下文池，锁被占用时会超时
+            thread = threading.Thread(target=pool.stats)
+            thread.start()
+            thread.join(1)
+            unlocked.append(not thread.is_alive())
+            if cmd == 'Target.getTargetInfo':
+                return {'targetInfo': {'browserContextId': 'ctx'}}
+            return {}
+        
+        browser.run_cdp.side_effect = check_unlocked
+        pool.release(pool.acquire('alice'))
+        # 容量已满，销毁alice的上下文后为bob创建
+        pool.release(pool.acquire('bob'))
+        
+        assert pool.identities == ['bob']
+        assert unlocked == [True, True, True]
+        browser.run_cdp.assert_any_call('Target.disposeBrowserContext', browserContextId='ctx')
+    
+    def test_evict_and_close(self):
+        """测试手动关闭上下文和关闭上下文池"""
+        pool = ContextPool(fake_browser_manager())
+        context = pool.acquire('alice')
+        assert not pool.evict('alice')
+        pool.release(context)
+        assert pool.evict('alice')
+        
+        pool.release(pool.acquire('bob'))
+        pool.close()
+        assert len(pool) == 0
+    
+    def test_invalid_size(self):
+        """测试非法的容量"""
+        with pytest.raises(ValueError):
+            ContextPool(MagicMock(), max_contexts=0)
+    
+    def test_browser_manager(self, settings):
+        """测试BrowserManager按设置创建上下文池"""
+        settings.set('DRISSIONPAGE_MAX_CONTEXTS', 4)
+        manager = BrowserManager(settings)
+        assert manager.contexts.max_contexts == 4
+        manager.close()
+        assert manager._contexts is None
+
+
+class TestIdentityRequests:
+    """身份标识请求测试类"""
+    
+    def test_render_in_identity_context(self, settings):
+        """测试指定身份标识的请求在该身份的上下文中渲染，完成后归还"""
+        browser_manager = fake_browser_manager()
+        browser_manager.contexts = ContextPool(browser_manager)
+        middleware = DrissionPageMiddleware()
+        middleware._get_browser_manager = MagicMock(return_value=browser_manager)
+        
+        request = DrissionRequest('https://example.com/account', identity='alice')
+        response = middleware.render(request, MagicMock(settings=settings))
+        
+        # 上下文归还后响应不再关联其中的标签页
+        context = browser_manager.contexts._contexts['alice']
+        assert response.page is None
+        assert response.css('body::text').get() == 'ok'
+        context.tab.get.assert_called_once_with('https://example.com/account', timeout=None)
+        assert not context.in_use
+        browser_manager.get_browser.return_value.latest_tab.get.assert_not_called()
+    
+    def test_identity_with_session_mode(self, settings):
+        """测试会话模式请求指定身份标识时抛出ValueError，不会静默共用会话"""
+        browser_manager = fake_browser_manager()
+        middleware = DrissionPageMiddleware()
+        middleware._get_browser_manager = MagicMock(return_value=browser_manager)
+        
+        request = DrissionRequest('https://example.com/api', page_type='session', identity='alice')
+        with pytest.raises(ValueError):
+            middleware.render(request, MagicMock(settings=settings))
+        browser_manager.get_session.assert_not_called()
+    
+    def test_identity_in_fingerprint(self):
+        """测试身份标识参与请求指纹"""
+        fingerprinter = DrissionRequestFingerprinter()
+        alice = DrissionRequest('https://example.com/account', identity='alice')
+        bob = DrissionRequest('https://example.com/account', identity='bob')
+        assert fingerprinter.fingerprint(alice) != fingerprinter.fingerprint(bob)
+        assert alice.meta['drission']['identity'] == 'alice'
@@ -0,0 +1,176 @@
+"""
+去重工具测试
+"""
+
+import pytest
+from unittest.mock import MagicMock
+
+from scrapy.exceptions import IgnoreRequest
+from scrapy.http import HtmlResponse
+
+from scrapy_drissionpage.dedup import (
+    DrissionRequestFingerprinter, SimHashIndex, ContentDedupMiddleware, simhash, text_features
+)
+from scrapy_drissionpage.request import DrissionRequest
+from scrapy_drissionpage.response import DrissionResponse
+
+
+def page(url, text):
+    """创建渲染结果响应"""
+    request = DrissionRequest(url=url)
+    html = f'<html><body><script>var t = {hash(url)};</script><div>{text}</div></body></html>'
+    return request, DrissionResponse.from_html(url, html, request=request)
+
+
+ARTICLE = '这是一篇关于网页爬虫的文章，介绍如何使用浏览器渲染动态页面并提取数据。' * 5
+
+
+class TestDrissionRequestFingerprinter:
+    """DrissionRequestFingerprinter测试类"""
+    
+    def test_drission_options(self):
+        """测试影响渲染结果的drission选项参与指纹计算"""
+        fingerprinter = DrissionRequestFingerprinter()
+        url = 'https://example.com/list'
+        
+        base = fingerprinter.fingerprint(DrissionRequest(url=url))
+        
+        # 不同的页面类型和等待元素产生不同指纹
+        assert fingerprinter.fingerprint(DrissionRequest(url=url, page_type='session')) != base
+        assert fingerprinter.fingerprint(DrissionRequest(url=url, wait_element='.item')) != base
+        
+        # 只影响加载过程的选项不参与
+        assert fingerprinter.fingerprint(DrissionRequest(url=url, wait_time=3, timeout=10)) == base
+    
+    def test_learn_equivalent(self):
+        """测试记录等价URL后忽略不影响渲染结果的查询参数"""
+        fingerprinter = DrissionRequestFingerprinter()
+        
+        first = DrissionRequest(url='https://example.com/item?id=1&utm_source=a')
+        other = DrissionRequest(url='https://example.com/item?id=1&utm_source=b')
+        assert fingerprinter.fingerprint(first) != fingerprinter.fingerprint(other)
+        
+        # 确认两次后新的请求忽略utm_source
+        assert fingerprinter.learn_equivalent(first.url, other.url) == set()
+        assert fingerprinter.learn_equivalent(
+            first.url, 'https://example.com/item?id=1&utm_source=d'
+        ) == {'utm_source'}
+        third = DrissionRequest(url='https://example.com/item?id=1&utm_source=c')
+        plain = DrissionRequest(url='https://example.com/item?id=1')
+        assert fingerprinter.fingerprint(third) == fingerprinter.fingerprint(plain)
+        
+        # 不同路径不受影响
+        assert fingerprinter.learn_equivalent(
+            'https://example.com/a?x=1', 'https://example.com/b?x=2'
+        ) == set()
+    
+    def test_learn_confirmations(self):
+        """测试需要多次确认才忽略参数，且规则变化后指纹缓存失效"""
+        fingerprinter = DrissionRequestFingerprinter(confirmations=2)
+        request = DrissionRequest(url='https://example.com/item?id=1&sort=a')
+        before = fingerprinter.fingerprint(request)
+        
+        # 第一次只记录，不忽略
+        assert fingerprinter.learn_equivalent(
+            'https://example.com/item?id=1&sort=a', 'https://example.com/item?id=1&sort=b'
+        ) == set()
+        assert fingerprinter.fingerprint(request) == before
+        
+        # 第二次确认后忽略，同一请求对象的指纹重新计算
+        assert fingerprinter.learn_equivalent(
+            'https://example.com/item?id=2&sort=a', 'https://example.com/item?id=2&sort=c'
+        ) == {'sort'}
+        assert fingerprinter.fingerprint(request) != before
+        assert fingerprinter.fingerprint(request) == fingerprinter.fingerprint(
+            DrissionRequest(url='https://example.com/item?id=1')
+        )
+
+
+class TestSimHash:
+    """SimHash测试类"""
+    
+    def test_noise(self):
+        """测试数字等动态内容不影响指纹"""
+        first = simhash(text_features(ARTICLE + '阅读 1024 次，发布于 2024-01-01'))
+        second = simhash(text_features(ARTICLE + '阅读 2048 次，发布于 2024-02-15'))
+        other = simhash(text_features('完全不同的内容：商品列表、价格和库存信息。' * 5))
+        
+        assert bin(first ^ second).count('1') == 0
+        assert bin(first ^ other).count('1') > 3
+    
+    def test_index(self):
+        """测试分段索引查找近似重复"""
+        index = SimHashIndex(distance=3)
+        index.add(0b1011 << 40, 'a')
+        
+        assert index.find((0b1011 << 40) ^ 0b111) == 'a'
+        assert index.find((0b1011 << 40) ^ 0b1111) is None
+        assert len(index) == 1
+        
+        with pytest.raises(ValueError):
+            SimHashIndex(distance=64)
+
+
+class TestContentDedupMiddleware:
+    """ContentDedupMiddleware测试类"""
+    
+    def test_near_duplicate(self):
+        """测试跳过近似重复的渲染结果，并反馈给指纹计算器"""
+        fingerprinter = DrissionRequestFingerprinter()
+        stats = MagicMock()
+        middleware = ContentDedupMiddleware(distance=3, fingerprinter=fingerprinter, stats=stats)
+        spider = MagicMock()
+        
+        request, response = page('https://example.com/#/list?tab=1', ARTICLE + '在线 12 人')
+        assert middleware.process_response(request, response, spider) is response
+        
+        # 同一SPA状态的另一个URL
+        request, response = page(
+            'https://example.com/#/list?tab=1&ref=home', ARTICLE + '在线 15 人'
+        )
+        with pytest.raises(IgnoreRequest):
+            middleware.process_response(request, response, spider)
+        stats.inc_value.assert_called_once_with('drissionpage/dedup/near_duplicate')
+        
+        # dont_filter的请求不参与去重
+        request = request.replace(dont_filter=True)
+        assert middleware.process_response(request, response, spider) is response
+    
+    def test_learn_only_from_full_pages(self):
+        """测试非2xx响应不参与去重，内容过短的页面不记录查询参数"""
+        fingerprinter = DrissionRequestFingerprinter(confirmations=1)
+        middleware = ContentDedupMiddleware(distance=3, fingerprinter=fingerprinter)
+        spider = MagicMock()
+        
+        for ref in ('a', 'b'):
+            request, response = page(f'https://example.com/missing?ref={ref}', ARTICLE)
+            response = HtmlResponse(
+                response.url, status=404, body=response.body, encoding='utf-8', request=request
+            )
+            assert middleware.process_response(request, response, spider) is response
+        assert len(middleware.index) == 0
+        
+        request, response = page('https://example.com/empty?ref=a', '暂无数据')
+        middleware.process_response(request, response, spider)
+        request, response = page('https://example.com/empty?ref=b', '暂无数据')
+        with pytest.raises(IgnoreRequest):
+            middleware.process_response(request, response, spider)
+        assert fingerprinter.ignored_params.get(('example.com', '/empty'), set()) == set()
+    
+    def test_page_response(self):
+        """测试关联页面对象的响应按静态HTML提取文本"""
+        middleware = ContentDedupMiddleware(distance=3)
+        spider = MagicMock()
+        url = 'https://example.com/a'
+        request = DrissionRequest(url=url)
+        html = f'<html><body><div>{ARTICLE}</div></body></html>'
+        response = DrissionResponse.from_html(url, html, request=request, page=MagicMock())
+        
+        assert middleware.process_response(request, response, spider) is response
+        assert len(middleware.index) == 1
+        
+        # 同样内容的另一个页面被丢弃
+        other = DrissionRequest(url='https://example.com/b')
+        response = DrissionResponse.from_html(other.url, html, request=other, page=MagicMock())
+        with pytest.raises(IgnoreRequest):
+            middleware.process_response(other, response, spider)
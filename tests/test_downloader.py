@@ -0,0 +1,141 @@
+"""
+DrissionPageDownloader测试
+"""
+
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from scrapy import Request, Spider
+from scrapy.utils.test import get_crawler
+from twisted.internet.defer import Deferred, succeed
+
+from scrapy_drissionpage.downloader import DrissionPageDownloader
+from scrapy_drissionpage.middleware import DrissionPageMiddleware
+from scrapy_drissionpage.request import DrissionRequest
+
+
+class TestDrissionPageDownloader:
+    """DrissionPageDownloader测试类"""
+    
+    @pytest.fixture
+    def downloader(self):
+        """创建下载器，不加载下载处理器和槽位回收定时器"""
+        # maybe_deferred_to_future需要已安装的reactor
+        from twisted.internet import reactor  # noqa: F401
+        
+        crawler = get_crawler(Spider, {
+            'DRISSIONPAGE_RENDER_CONCURRENCY': 2,
+            'CONCURRENT_REQUESTS_PER_DOMAIN': 8,
+            'DOWNLOAD_HANDLERS': {'http': None, 'https': None},
+        })
+        crawler.spider = Spider('test_spider')
+        downloader = DrissionPageDownloader(crawler)
+        downloader._start_slot_gc = lambda: None
+        return downloader
+    
+    def test_slot_key(self, downloader):
+        """测试DrissionRequest使用独立的槽位和渲染并发数"""
+        slot_key = downloader.get_slot_key(DrissionRequest('https://example.com/a'))
+        assert slot_key == 'drission:example.com'
+        assert downloader.get_slot_key(Request('https://example.com/a')) == 'example.com'
+        
+        key, slot = downloader._get_slot(DrissionRequest('https://example.com/a'))
+        assert slot.concurrency == 2
+        _, plain_slot = downloader._get_slot(Request('https://example.com/a'))
+        assert plain_slot.concurrency == 8
+    
+    def test_download_counts_transferring(self, downloader):
+        """测试渲染期间请求计入槽位的transferring"""
+        request = DrissionRequest('https://example.com/a')
+        key, slot = downloader._get_slot(request)
+        pending = Deferred()
+        downloader._render = MagicMock(return_value=pending)
+        
+        result = Deferred.fromCoroutine(downloader._download(slot, request))
+        assert request in slot.transferring
+        assert not result.called
+        
+        pending.callback('response')
+        assert result.result == 'response'
+        assert not slot.transferring
+    
+    def test_render_leases_tabs(self, downloader):
+        """测试渲染线程租用并归还标签页"""
+        tab = MagicMock()
+        browser_manager = MagicMock(fleet=None)
+        browser_manager.get_browser.return_value.new_tab.return_value = tab
+        middleware = downloader.drission_middleware
+        middleware._get_browser_manager = MagicMock(return_value=browser_manager)
+        middleware.render = MagicMock(return_value='response')
+        spider = downloader.crawler.spider
+        
+        request = DrissionRequest('https://example.com/a')
+        assert downloader._render_in_thread(request, spider) == 'response'
+        assert middleware.render.call_args.kwargs['tab'] is tab
+        
+        # 第二次渲染复用池中的标签页
+        downloader._render_in_thread(request, spider)
+        browser_manager.get_browser.return_value.new_tab.assert_called_once()
+        
+        downloader.close()
+        tab.close.assert_called_once()
+    
+    def test_render_retires_tabs(self, downloader):
+        """测试标签页软重置后复用，达到最大使用次数后换新"""
+        downloader.tab_recycler.max_uses = 2
+        browser_manager = MagicMock(fleet=None)
+        new_tab = browser_manager.get_browser.return_value.new_tab
+        new_tab.side_effect = lambda: MagicMock(tab_id=f'tab-{new_tab.call_count}')
+        middleware = downloader.drission_middleware
+        middleware._get_browser_manager = MagicMock(return_value=browser_manager)
+        middleware.render = MagicMock(return_value='response')
+        spider = downloader.crawler.spider
+        
+        request = DrissionRequest('https://example.com/a')
+        for _ in range(3):
+            downloader._render_in_thread(request, spider)
+        
+        tabs = [c.kwargs['tab'] for c in middleware.render.call_args_list]
+        assert tabs[0] is tabs[1] is not tabs[2]
+        tabs[0].get.assert_called_once_with('about:blank')
+        tabs[0].close.assert_called_once()
+        stats = downloader.crawler.stats
+        assert stats.get_value('drissionpage/tabs/recycled') == 2
+        assert stats.get_value('drissionpage/tabs/retired') == 1
+    
+    def test_response_detached_from_pooled_tab(self, downloader):
+        """测试标签页在回调执行前被后续请求复用时，响应仍是自己的渲染结果"""
+        tab = MagicMock(tab_id='tab-1')
+        
+        def get(url, **kwargs):
+            tab.url = url
+            tab.html = f'<html><body><h1>{url}</h1></body></html>'
+        
+        tab.get.side_effect = get
+        browser_manager = MagicMock(fleet=None)
+        browser_manager.get_browser.return_value.new_tab.return_value = tab
+        middleware = downloader.drission_middleware
+        middleware._get_browser_manager = MagicMock(return_value=browser_manager)
+        spider = downloader.crawler.spider
+        spider.settings = downloader.crawler.settings
+        
+        first = downloader._render_in_thread(DrissionRequest('https://example.com/a'), spider)
+        second = downloader._render_in_thread(DrissionRequest('https://example.com/b'), spider)
+        
+        # 两次渲染使用同一个标签页，第一个响应的回调仍看到自己的内容
+        browser_manager.get_browser.return_value.new_tab.assert_called_once()
+        assert first.page is None and second.page is None
+        assert first.css('h1::text').get() == 'https://example.com/a'
+        assert second.css('h1::text').get() == 'https://example.com/b'
+    
+    def test_middleware_defers_to_downloader(self):
+        """测试使用DrissionPageDownloader时中间件不再渲染"""
+        middleware = DrissionPageMiddleware()
+        downloader = SimpleNamespace(renders_drission_requests=True)
+        middleware.crawler = SimpleNamespace(engine=SimpleNamespace(downloader=downloader))
+        middleware.render = MagicMock()
+        
+        request = DrissionRequest('https://example.com')
+        assert middleware.process_request(request, MagicMock()) is None
+        middleware.render.assert_not_called()
@@ -0,0 +1,200 @@
+"""
+下载管理测试
+"""
+
+import hashlib
+import os
+import threading
+import time
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from scrapy_drissionpage.downloads import DownloadManager, DownloadTask
+
+
+class FakeResponse:
+    """模拟requests的流式响应，支持Range请求"""
+    
+    def __init__(self, content, headers):
+        start = 0
+        range_header = headers.get('Range')
+        if range_header:
+            start = int(range_header[len('bytes='):-1])
+        self.status_code = 206 if start else 200
+        self.body = content[start:]
+        self.headers = {'Content-Length': str(len(self.body))}
+        if start:
+            self.headers['Content-Range'] = f'bytes {start}-{len(content) - 1}/{len(content)}'
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *args):
+        return False
+    
+    def raise_for_status(self):
+        pass
+    
+    def iter_content(self, chunk_size):
+        for i in range(0, len(self.body), chunk_size):
+            yield self.body[i:i + chunk_size]
+
+
+class TestDownloadManager:
+    """DownloadManager测试类"""
+    
+    CONTENT = b'0123456789' * 100
+    
+    @pytest.fixture
+    def session_page(self):
+        """模拟会话，记录请求头"""
+        session_page = MagicMock()
+        session_page.calls = []
+        
+        def get(url, headers=None, cookies=None, **kwargs):
+            session_page.calls.append(headers)
+            session_page.cookies_sent = cookies
+            return FakeResponse(self.CONTENT, headers)
+        
+        session_page.session.get.side_effect = get
+        return session_page
+    
+    @pytest.fixture
+    def manager(self, tmp_path, session_page):
+        """创建下载管理器"""
+        browser_manager = MagicMock()
+        browser_manager.get_session.return_value = session_page
+        return DownloadManager(browser_manager, root=str(tmp_path), chunk_size=128)
+    
+    def test_fetch_resumes_part_file(self, manager, session_page):
+        """测试会话下载从 .part 文件续传"""
+        folder = manager.folder_for('tab-1')
+        with open(os.path.join(folder, 'data.bin.part'), 'wb') as f:
+            f.write(self.CONTENT[:300])
+        
+        tab = SimpleNamespace(tab_id='tab-1', cookies=lambda: [{'name': 'sid', 'value': '1'}])
+        task = manager.fetch('https://example.com/files/data.bin', tab=tab)
+        assert task.wait(5)
+        
+        assert task.state == 'completed'
+        assert session_page.calls[0] == {'Range': 'bytes=300-'}
+        assert session_page.cookies_sent == {'sid': '1'}
+        session_page.set.cookies.assert_not_called()
+        assert task.total_bytes == len(self.CONTENT)
+        with open(task.path, 'rb') as f:
+            assert f.read() == self.CONTENT
+        assert not os.path.exists(task.path + '.part')
+        
+        item = task.to_item(manager.root)
+        assert item['file_urls'] == ['https://example.com/files/data.bin']
+        assert item['files'][0]['path'] == 'tab-1/data.bin'
+        assert item['files'][0]['checksum'] == hashlib.md5(self.CONTENT).hexdigest()
+        assert manager.progress()[task.id]['progress'] == 1.0
+    
+    def test_tabs_use_separate_folders(self, manager):
+        """测试不同标签页同名文件不会互相覆盖"""
+        url = 'https://example.com/report.pdf'
+        first = manager.fetch(url, tab=SimpleNamespace(tab_id='a', cookies=list))
+        second = manager.fetch(url, tab=SimpleNamespace(tab_id='b', cookies=list))
+        assert first.wait(5) and second.wait(5)
+        
+        assert first.id != second.id
+        assert first.path != second.path
+        assert os.path.dirname(first.path).endswith('a')
+        assert len(manager.tasks) == 2
+    
+    def test_click_resumes_failed_browser_download(self, manager, session_page):
+        """测试浏览器下载中断后改用会话续传"""
+        mission = SimpleNamespace(
+            url='https://example.com/big.zip', name='big.zip', folder='', state='canceled',
+            is_done=True, received_bytes=0, total_bytes=None, final_path=None
+        )
+        tab = MagicMock(tab_id='tab-2')
+        tab.ele.return_value.click.to_download.return_value = mission
+        tab.cookies.return_value = []
+        
+        task = manager.click(tab, '#download', name='big.zip')
+        assert task.wait(5)
+        
+        kwargs = tab.ele.return_value.click.to_download.call_args.kwargs
+        assert kwargs['save_path'] == manager.folder_for(tab)
+        assert kwargs['rename'] == 'big.zip'
+        assert task.state == 'completed'
+        assert task.via == 'session'
+        assert os.path.basename(task.path) == 'big.zip'
+    
+    def test_click_without_download(self, manager):
+        """测试下载未能开始时任务失败并释放并发名额"""
+        tab = MagicMock(tab_id='tab-3')
+        tab.ele.return_value.click.to_download.return_value = False
+        
+        for _ in range(manager.max_concurrent + 1):
+            task = manager.click(tab, '#download', timeout=0)
+            assert task.wait(5)
+            assert task.state == 'failed'
+        with pytest.raises(ValueError):
+            task.to_item()
+    
+    def test_click_is_synchronous(self, manager):
+        """测试click在调用线程中点击元素，不等待会话下载的并发名额"""
+        tab = MagicMock(tab_id='tab-4')
+        tab.ele.return_value.click.to_download.return_value = False
+        for _ in range(manager.max_concurrent):
+            manager._slots.acquire()
+        
+        task = manager.click(tab, '#download', timeout=0)
+        assert task.state == 'failed'
+        tab.ele.assert_called_once_with('#download', timeout=0)
+    
+    def test_same_tab_clicks_serialized(self, manager):
+        """测试同一标签页的点击依次进行，下载开始前不会被其他点击改写设置"""
+        active = []
+        overlaps = []
+        
+        def to_download(**kwargs):
+            overlaps.append(bool(active))
+            active.append(kwargs['rename'])
+            time.sleep(0.05)
+            active.remove(kwargs['rename'])
+            return False
+        
+        tab = MagicMock(tab_id='tab-5')
+        tab.ele.return_value.click.to_download.side_effect = to_download
+        threads = [
+            threading.Thread(
+                target=manager.click, args=(tab, '#download'), kwargs={'name': f'{i}.bin'}
+            )
+            for i in range(3)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+        
+        assert overlaps == [False, False, False]
+    
+    def test_from_settings(self):
+        """测试按类型读取设置"""
+        manager = DownloadManager.from_settings(
+            {'DRISSIONPAGE_DOWNLOAD_RESUME': 'False', 'DRISSIONPAGE_DOWNLOAD_CONCURRENCY': '2',
+             'DRISSIONPAGE_TIMEOUT': '5'},
+            MagicMock()
+        )
+        assert manager.resume is False
+        assert manager.max_concurrent == 2
+        assert manager.timeout == 5.0
+        assert DownloadManager.from_settings({}, MagicMock()).timeout is None
+    
+    def test_invalid_concurrency(self):
+        """测试非法的并发数"""
+        with pytest.raises(ValueError):
+            DownloadManager(MagicMock(), max_concurrent=0)
+    
+    def test_progress(self):
+        """测试进度计算"""
+        task = DownloadTask('https://example.com/a', '.')
+        assert task.progress is None
+        task.total_bytes, task.received_bytes = 200, 50
+        assert task.progress == 0.25
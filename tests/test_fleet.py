@@ -0,0 +1,125 @@
+"""
+浏览器集群测试
+"""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from itertools import count
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from scrapy_drissionpage.browser_manager import BrowserManager
+from scrapy_drissionpage.fleet import BrowserFleet
+
+
+class VersionHandler(BaseHTTPRequestHandler):
+    """模拟浏览器调试接口的 /json/version"""
+    
+    def do_GET(self):
+        host, port = self.server.server_address[0], self.server.server_port
+        body = json.dumps({
+            'Browser': 'HeadlessChrome/120.0',
+            'webSocketDebuggerUrl': f'ws://{host}:{port}/devtools/browser/x',
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endpoints():
+    """启动两个本地调试接口，模拟远程浏览器"""
+    servers = [HTTPServer(('127.0.0.1', 0), VersionHandler) for _ in range(2)]
+    for server in servers:
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield servers
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def address(server):
+    return f'127.0.0.1:{server.server_port}'
+
+
+def fake_browser(address):
+    """模拟连接到端点的浏览器，新建的标签页ID带端点地址"""
+    browser = MagicMock()
+    ids = count()
+    browser.new_tab.side_effect = lambda: MagicMock(tab_id=f'{address}-{next(ids)}')
+    return browser
+
+
+class TestBrowserFleet:
+    """BrowserFleet测试类"""
+    
+    @pytest.fixture(autouse=True)
+    def chromium_page(self):
+        with patch(
+            'scrapy_drissionpage.fleet.ChromiumPage', side_effect=fake_browser
+        ) as chromium_page:
+            yield chromium_page
+    
+    def test_balance(self, endpoints):
+        """测试标签页分配给负载最低的端点"""
+        fleet = BrowserFleet([address(server) for server in endpoints])
+        
+        tabs = [fleet.acquire_tab() for _ in range(4)]
+        assert [stats['active'] for stats in fleet.stats().values()] == [2, 2]
+        assert all(stats['browser'] == 'HeadlessChrome/120.0' for stats in fleet.stats().values())
+        
+        fleet.release_tab(tabs[0])
+        tabs[0].close.assert_called_once()
+        tab = fleet.acquire_tab()
+        assert tab.tab_id.startswith(tabs[0].tab_id.rsplit('-', 1)[0])
+    
+    def test_health_check(self, endpoints):
+        """测试不可用的端点不参与分配"""
+        down = address(endpoints[1])
+        endpoints[1].shutdown()
+        endpoints[1].server_close()
+        fleet = BrowserFleet([address(endpoints[0]), down], check_interval=0, timeout=1)
+        
+        assert fleet.check_all() == {address(endpoints[0]): True, down: False}
+        for _ in range(3):
+            assert fleet.acquire_tab().tab_id.startswith(address(endpoints[0]))
+        
+        # 所有端点都不可用
+        endpoints[0].shutdown()
+        endpoints[0].server_close()
+        with pytest.raises(RuntimeError):
+            fleet.acquire_tab()
+    
+    def test_add_remove_at_runtime(self, endpoints):
+        """测试运行时加入和移出端点"""
+        fleet = BrowserFleet([address(endpoints[0])])
+        tab = fleet.acquire_tab()
+        
+        fleet.add(address(endpoints[1]))
+        assert fleet.acquire_tab().tab_id.startswith(address(endpoints[1]))
+        
+        # 移出后已分配的标签页需要归还，新标签页分配到其他端点
+        fleet.remove(address(endpoints[0]))
+        assert not fleet.in_rotation(tab)
+        assert fleet.acquire_tab().tab_id.startswith(address(endpoints[1]))
+        assert list(fleet.stats()) == [address(endpoints[1])]
+    
+    def test_browser_manager(self, endpoints, settings):
+        """测试设置多个端点时BrowserManager使用集群"""
+        settings.set('DRISSIONPAGE_CONNECT_ENDPOINTS', [address(server) for server in endpoints])
+        manager = BrowserManager(settings)
+        
+        assert isinstance(manager.fleet, BrowserFleet)
+        assert manager.get_browser() is manager.fleet.endpoints[0].browser
+        manager.close()
+        assert manager._fleet is None
+    
+    def test_no_endpoints(self, settings):
+        """测试未设置端点时不创建集群"""
+        assert BrowserManager(settings).fleet is None
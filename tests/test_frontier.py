@@ -0,0 +1,259 @@
+"""
+共享抓取队列测试
+"""
+
+import time
+
+import pytest
+from scrapy import Request, Spider, signals
+from scrapy.exceptions import DontCloseSpider
+from scrapy.http import HtmlResponse
+from scrapy.utils.test import get_crawler
+
+from scrapy_drissionpage.frontier import SharedFrontier, FrontierScheduler, run_workers
+from scrapy_drissionpage.middleware import DrissionSpiderMiddleware
+from scrapy_drissionpage.request import DrissionRequest
+
+
+class FrontierSpider(Spider):
+    name = 'frontier_spider'
+    
+    def parse_detail(self, response):
+        pass
+
+
+class TestSharedFrontier:
+    """SharedFrontier测试类"""
+    
+    def test_priority_and_dedup(self, tmp_path):
+        """测试按优先级出队，重复指纹不再入队"""
+        frontier = SharedFrontier(str(tmp_path / 'frontier.db'))
+        assert frontier.push(b'low', b'fp-1', priority=0)
+        assert frontier.push(b'high', b'fp-2', priority=10)
+        assert not frontier.push(b'again', b'fp-1')
+        assert frontier.push(b'unfiltered', None)
+        
+        assert frontier.pop('a')[1] == b'high'
+        assert frontier.pop('a')[1] == b'low'
+        assert frontier.pending() == 1
+        assert frontier.in_progress() == 2
+        assert frontier.in_progress(exclude='a') == 0
+    
+    def test_shared_between_connections(self, tmp_path):
+        """测试两个进程的连接共享请求、去重和统计"""
+        path = str(tmp_path / 'frontier.db')
+        first, second = SharedFrontier(path), SharedFrontier(path)
+        
+        first.push(b'request', b'fp')
+        assert second.seen(b'fp')
+        request_id, data = second.pop('b')
+        assert data == b'request'
+        assert first.pop('a') is None
+        
+        second.ack(request_id)
+        assert len(first) == 0
+        
+        first.set_stats('a', {'item_scraped_count': 3, 'start_time': 'x', 'memusage/max': 1.5})
+        second.set_stats('b', {'item_scraped_count': 4})
+        assert first.stats() == {'item_scraped_count': 7, 'memusage/max': 1.5}
+        assert second.stats('a')['item_scraped_count'] == 3
+        assert first.workers() == ['a', 'b']
+    
+    def test_lease_expires(self, tmp_path):
+        """测试租约超时的请求重新入队"""
+        frontier = SharedFrontier(str(tmp_path / 'frontier.db'), lease_timeout=0.05)
+        frontier.push(b'request')
+        assert frontier.pop('crashed') is not None
+        assert frontier.pop('b') is None
+        
+        time.sleep(0.1)
+        assert frontier.pop('b')[1] == b'request'
+    
+    def test_renew(self, tmp_path):
+        """测试续租的请求不会超时"""
+        frontier = SharedFrontier(str(tmp_path / 'frontier.db'), lease_timeout=0.2)
+        frontier.push(b'request')
+        assert frontier.pop('a') is not None
+        
+        time.sleep(0.15)
+        assert frontier.renew('a') == 1
+        time.sleep(0.1)
+        assert frontier.pop('b') is None
+        assert frontier.in_progress() == 1
+    
+    def test_invalid_lease_timeout(self, tmp_path):
+        """测试非法的租约超时时间"""
+        with pytest.raises(ValueError):
+            SharedFrontier(str(tmp_path / 'frontier.db'), lease_timeout=0)
+
+
+class TestFrontierScheduler:
+    """FrontierScheduler测试类"""
+    
+    @pytest.fixture(autouse=True)
+    def stop_renewal(self):
+        """测试结束时停止续租"""
+        self.opened = []
+        yield
+        for scheduler in self.opened:
+            if scheduler._renewal.running:
+                scheduler._renewal.stop()
+    
+    def open_scheduler(self, path, worker, **settings):
+        crawler = get_crawler(FrontierSpider, {
+            'DRISSIONPAGE_FRONTIER_PATH': path,
+            'DRISSIONPAGE_FRONTIER_WORKER': worker,
+            'SCHEDULER_PRIORITY_QUEUE': 'scrapy.pqueues.ScrapyPriorityQueue',
+            **settings,
+        })
+        crawler.spider = crawler._create_spider()
+        scheduler = FrontierScheduler.from_crawler(crawler)
+        scheduler.open(crawler.spider)
+        self.opened.append(scheduler)
+        return scheduler
+    
+    def test_requests_shared_between_workers(self, tmp_path):
+        """测试DrissionRequest由其他工作进程取出，普通请求留在本进程"""
+        path = str(tmp_path / 'frontier.db')
+        first = self.open_scheduler(path, 'a')
+        second = self.open_scheduler(path, 'b')
+        
+        request = DrissionRequest(
+            'https://example.com/detail', callback=first.spider.parse_detail,
+            page_type='session', wait_time=2, priority=5
+        )
+        assert first.enqueue_request(request)
+        assert not second.enqueue_request(request.replace())
+        assert first.enqueue_request(Request('https://example.com/plain'))
+        
+        leased = second.next_request()
+        assert isinstance(leased, DrissionRequest)
+        assert leased.url == 'https://example.com/detail'
+        assert leased.callback == second.spider.parse_detail
+        assert leased.meta['drission']['page_type'] == 'session'
+        assert leased.priority == 5
+        assert second.next_request() is None
+        assert first.next_request().url == 'https://example.com/plain'
+        
+        # 携带快照响应的请求留在本进程
+        snapshot = request.replace(meta={**request.meta, 'drission_snapshot': object()})
+        assert first.enqueue_request(snapshot)
+        assert second.next_request() is None
+        assert first.next_request().meta['drission_snapshot'] is snapshot.meta['drission_snapshot']
+        
+        # 其他工作进程还有未完成的请求时不关闭
+        with pytest.raises(DontCloseSpider):
+            first._spider_idle(first.spider)
+        second._ack(leased)
+        first._spider_idle(first.spider)
+    
+    def test_ack_after_callback(self, tmp_path):
+        """测试启用爬虫中间件时收到响应不确认，回调输出全部消费后才确认"""
+        scheduler = self.open_scheduler(
+            str(tmp_path / 'frontier.db'), 'a',
+            SPIDER_MIDDLEWARES={'scrapy_drissionpage.middleware.DrissionSpiderMiddleware': 543}
+        )
+        assert scheduler.ack_after_callback
+        scheduler.enqueue_request(DrissionRequest('https://example.com/detail'))
+        leased = scheduler.next_request()
+        response = HtmlResponse(leased.url, body=b'<html></html>', request=leased)
+        
+        crawler = scheduler.crawler
+        crawler.signals.send_catch_log(
+            signal=signals.response_received,
+            response=response,
+            request=leased,
+            spider=scheduler.spider,
+        )
+        assert scheduler.frontier.in_progress() == 1
+        
+        middleware = DrissionSpiderMiddleware.from_crawler(crawler)
+        output = middleware.process_spider_output(response, iter(['item']), scheduler.spider)
+        assert next(output) == 'item'
+        # 回调输出未消费完时崩溃，请求会重新分配
+        assert scheduler.frontier.in_progress() == 1
+        assert list(output) == []
+        assert scheduler.frontier.in_progress() == 0
+    
+    def test_ack_without_spider_middleware(self, tmp_path):
+        """测试未启用爬虫中间件时收到响应即确认，被丢弃的请求立即确认"""
+        scheduler = self.open_scheduler(str(tmp_path / 'frontier.db'), 'a')
+        assert not scheduler.ack_after_callback
+        scheduler.enqueue_request(DrissionRequest('https://example.com/1'))
+        scheduler.enqueue_request(DrissionRequest('https://example.com/2'))
+        first, second = scheduler.next_request(), scheduler.next_request()
+        
+        signal_manager = scheduler.crawler.signals
+        signal_manager.send_catch_log(
+            signal=signals.response_received,
+            response=HtmlResponse(first.url, body=b'', request=first),
+            request=first,
+            spider=scheduler.spider,
+        )
+        assert scheduler.frontier.in_progress() == 1
+        signal_manager.send_catch_log(
+            signal=signals.request_dropped, request=second, spider=scheduler.spider
+        )
+        assert scheduler.frontier.in_progress() == 0
+    
+    def test_retry_acks_original(self, tmp_path):
+        """测试重试的请求入队后确认原请求"""
+        scheduler = self.open_scheduler(str(tmp_path / 'frontier.db'), 'a')
+        scheduler.enqueue_request(DrissionRequest('https://example.com/1'))
+        leased = scheduler.next_request()
+        
+        assert scheduler.enqueue_request(leased.replace(dont_filter=True))
+        assert scheduler.frontier.in_progress() == 0
+        assert scheduler.frontier.pending() == 1
+    
+    def test_renewal_loop(self, tmp_path):
+        """测试打开时开始定期续租，关闭时停止"""
+        scheduler = self.open_scheduler(
+            str(tmp_path / 'frontier.db'), 'a', DRISSIONPAGE_FRONTIER_LEASE_TIMEOUT=30
+        )
+        assert scheduler._renewal.running
+        assert scheduler._renewal.interval == 10
+        scheduler.close('finished')
+        assert not scheduler._renewal.running
+    
+    def test_start_requests_enqueued_once(self, tmp_path):
+        """测试多个工作进程的起始请求只入队一次"""
+        path = str(tmp_path / 'frontier.db')
+        workers = [self.open_scheduler(path, name) for name in ('a', 'b')]
+        for scheduler in workers:
+            start = DrissionRequest(
+                'https://example.com/', dont_filter=True, meta={'is_start_request': True}
+            )
+            scheduler.enqueue_request(start)
+        assert workers[0].frontier.pending() == 1
+        
+        # 普通的dont_filter请求不去重
+        assert workers[0].enqueue_request(DrissionRequest('https://example.com/', dont_filter=True))
+        assert len(workers[1]) == 2
+    
+    def test_close_saves_stats(self, tmp_path):
+        """测试关闭时保存统计，中途关闭时放回租用的请求"""
+        path = str(tmp_path / 'frontier.db')
+        scheduler = self.open_scheduler(path, 'a')
+        scheduler.enqueue_request(DrissionRequest('https://example.com/1'))
+        assert scheduler.next_request() is not None
+        scheduler.close('shutdown')
+        
+        frontier = SharedFrontier(path)
+        assert frontier.pending() == 1
+        assert frontier.stats('a')['scheduler/enqueued/frontier'] == 1
+    
+    def test_requires_path(self):
+        """测试未设置共享队列路径"""
+        with pytest.raises(ValueError):
+            FrontierScheduler.from_crawler(get_crawler(FrontierSpider))
+    
+    def test_run_workers_validation(self, tmp_path):
+        """测试run_workers的参数检查"""
+        with pytest.raises(ValueError):
+            run_workers(
+                FrontierSpider, workers=0,
+                settings={'DRISSIONPAGE_FRONTIER_PATH': str(tmp_path / 'f.db')}
+            )
+        with pytest.raises(ValueError):
+            run_workers(FrontierSpider, workers=2)
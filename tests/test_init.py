@@ -0,0 +1,48 @@
+"""
+包初始化测试
+"""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import scrapy_drissionpage
+from scrapy_drissionpage import utils
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class TestLazyImport:
+    """延迟导入测试类"""
+    
+    def test_request_only(self):
+        """测试只导入DrissionRequest时不加载爬虫、中间件和工具模块"""
+        code = (
+            'import sys\n'
+            'from scrapy_drissionpage import DrissionRequest\n'
+            'print(sorted(m for m in sys.modules if m.startswith("scrapy_drissionpage")))\n'
+        )
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=ROOT, check=True, capture_output=True, text=True
+        ).stdout
+        assert output.strip() == "['scrapy_drissionpage', 'scrapy_drissionpage.request']"
+    
+    def test_exports(self):
+        """测试所有导出名都可访问，且访问后缓存到模块命名空间"""
+        for name in scrapy_drissionpage.__all__:
+            assert getattr(scrapy_drissionpage, name) is not None
+            assert name in vars(scrapy_drissionpage)
+        for name in utils.__all__:
+            assert getattr(utils, name) is not None
+        
+        assert scrapy_drissionpage.Chromium is scrapy_drissionpage.ChromiumPage
+        assert set(scrapy_drissionpage.__all__) <= set(dir(scrapy_drissionpage))
+    
+    def test_unknown_attribute(self):
+        """测试不存在的属性"""
+        with pytest.raises(AttributeError):
+            scrapy_drissionpage.NotExported
+        with pytest.raises(ImportError):
+            from scrapy_drissionpage import NotExported  # noqa: F401
@@ -9,7 +9,7 @@ from scrapy import signals
 from scrapy.http import Request
 from scrapy.crawler import Crawler
 
-from scrapy_drissionpage.middleware import DrissionPageMiddleware
+from scrapy_drissionpage.middleware import DrissionPageMiddleware, DrissionSpiderMiddleware
 from scrapy_drissionpage.request import DrissionRequest
 from scrapy_drissionpage.response import DrissionResponse
 
@@ -72,9 +72,9 @@ class TestDrissionPageMiddleware:
         # 模拟_get_browser_manager方法
         middleware._get_browser_manager = MagicMock(return_value=mock_browser_manager)
         
-        # 创建模拟响应
+        # 创建模拟响应，中间件通过from_html复用页面文本创建响应
         mock_response_instance = MagicMock(spec=DrissionResponse)
-        mock_response.return_value = mock_response_instance
+        mock_response.from_html.return_value = mock_response_instance
         
         # 处理请求
         result = middleware.process_request(request, spider)
@@ -82,8 +82,117 @@ class TestDrissionPageMiddleware:
         # 验证返回了正确的响应
         assert result is mock_response_instance
         
-        # 验证浏览器访问了正确的URL
-        mock_tab.get.assert_called_once_with('https://example.com')
+        # 验证浏览器访问了正确的URL，并用页面的URL和HTML创建响应
+        mock_tab.get.assert_called_once_with('https://example.com', timeout=None)
+        mock_response.from_html.assert_called_once()
+        assert mock_response.from_html.call_args.args == (mock_tab.url, mock_tab.html)
+        assert mock_response.from_html.call_args.kwargs['page'] is mock_tab
+    
+    def test_process_request_session_post(self, middleware):
+        """测试会话模式下原样发送请求头、请求体和cookies"""
+        mock_session = MagicMock()
+        mock_session.url = 'https://example.com/api'
+        mock_session.html = '{"ok": true}'
+        
+        mock_browser_manager = MagicMock()
+        mock_browser_manager.get_session.return_value = mock_session
+        middleware._get_browser_manager = MagicMock(return_value=mock_browser_manager)
+        
+        # 创建带请求头的会话模式POST请求
+        request = DrissionRequest(
+            url='https://example.com/api',
+            method='POST',
+            body='{"page":1}',
+            cookies={'sid': 'xyz'},
+            meta={'drission': {'headers': {'X-Token': 'abc'}}},
+            page_type='session'
+        )
+        
+        # 处理请求
+        spider = MagicMock()
+        spider.settings = {}
+        result = middleware.process_request(request, spider)
+        
+        # 验证使用post发送，且参数完整
+        assert isinstance(result, DrissionResponse)
+        mock_session.post.assert_called_once_with(
+            'https://example.com/api',
+            timeout=None,
+            headers={'X-Token': 'abc'},
+            cookies={'sid': 'xyz'},
+            data=b'{"page":1}'
+        )
+    
+    def test_process_request_session_put(self, middleware):
+        """测试会话模式下GET、POST以外的方法通过requests会话发送"""
+        mock_session = MagicMock()
+        mock_session.session.request.return_value = MagicMock(
+            url='https://example.com/api/item/1', text='{"ok": true}'
+        )
+        mock_browser_manager = MagicMock()
+        mock_browser_manager.get_session.return_value = mock_session
+        middleware._get_browser_manager = MagicMock(return_value=mock_browser_manager)
+        
+        request = DrissionRequest(
+            url='https://example.com/api/item/1',
+            method='PUT',
+            body='{"name":"a"}',
+            page_type='session'
+        )
+        spider = MagicMock()
+        spider.settings = {}
+        result = middleware.process_request(request, spider)
+        
+        mock_session.session.request.assert_called_once_with(
+            'PUT', 'https://example.com/api/item/1',
+            timeout=mock_session.timeout, data=b'{"name":"a"}'
+        )
+        assert result.text == '{"ok": true}'
+        assert result.page is None
+    
+    def test_process_request_viewport(self, middleware):
+        """测试按请求设置视口，后续未指定视口的请求恢复默认"""
+        mock_tab = MagicMock()
+        mock_tab.tab_id = 'tab-1'
+        mock_tab.url = 'https://example.com'
+        mock_tab.html = '<html></html>'
+        
+        mock_browser_manager = MagicMock()
+        mock_browser_manager.get_browser.return_value.latest_tab = mock_tab
+        middleware._get_browser_manager = MagicMock(return_value=mock_browser_manager)
+        spider = MagicMock()
+        spider.settings = {}
+        
+        # 同一视口只设置一次
+        tall = DrissionRequest(url='https://example.com', viewport=(1280, 20000))
+        middleware.process_request(tall, spider)
+        middleware.process_request(tall, spider)
+        mock_tab.run_cdp.assert_called_once_with(
+            'Emulation.setDeviceMetricsOverride',
+            width=1280, height=20000, deviceScaleFactor=1, mobile=False
+        )
+        
+        # 未指定视口时清除覆盖
+        middleware.process_request(DrissionRequest(url='https://example.com'), spider)
+        mock_tab.run_cdp.assert_called_with('Emulation.clearDeviceMetricsOverride')
+        assert mock_tab.run_cdp.call_count == 2
+    
+    @pytest.mark.parametrize('kwargs', [
+        {'meta': {'proxy': 'http://127.0.0.1:8080'}},
+        {'identity': 'user-1'},
+        {'actions': [{'click': '#more'}]},
+    ])
+    def test_process_request_cdp_unsupported(self, middleware, kwargs):
+        """测试cdp引擎遇到不支持的请求选项时抛出异常而不是忽略"""
+        middleware._get_browser_manager = MagicMock()
+        middleware._process_request_cdp = MagicMock()
+        spider = MagicMock()
+        spider.settings = {'DRISSIONPAGE_ENGINE': 'cdp'}
+        
+        request = DrissionRequest(url='https://example.com', **kwargs)
+        with pytest.raises(ValueError):
+            middleware.process_request(request, spider)
+        middleware._process_request_cdp.assert_not_called()
     
     def test_get_browser_manager(self, middleware, spider):
         """测试_get_browser_manager方法"""
@@ -120,4 +229,76 @@ class TestDrissionPageMiddleware:
         mock_browser_manager.close.assert_called_once()
         
         # 验证已从缓存中删除
-        assert spider.name not in middleware.browser_managers 
\ No newline at end of file
+        assert spider.name not in middleware.browser_managers
+
+
+class TestDrissionSpiderMiddleware:
+    """DrissionSpiderMiddleware测试类"""
+    
+    def test_snapshots_fan_out(self, settings):
+        """测试快照响应依次交给回调"""
+        # 模拟标签页，每次读取html返回不同内容
+        mock_tab = MagicMock()
+        mock_tab.url = 'https://example.com'
+        click = mock_tab.ele.return_value.click
+        type(mock_tab).html = property(lambda self: f'<p>{click.call_count}</p>')
+        
+        mock_browser_manager = MagicMock()
+        mock_browser_manager.get_browser.return_value.latest_tab = mock_tab
+        
+        downloader_mw = DrissionPageMiddleware()
+        downloader_mw._get_browser_manager = MagicMock(return_value=mock_browser_manager)
+        
+        spider = MagicMock()
+        spider.settings = settings
+        
+        # 两次点击加载更多，每次点击后记录快照
+        callback = MagicMock(side_effect=lambda response: [response.text])
+        request = DrissionRequest(
+            url='https://example.com',
+            callback=callback,
+            actions=[
+                {'method': 'click', 'args': ['#more']},
+                {'method': 'snapshot'},
+                {'method': 'click', 'args': ['#more']},
+                {'method': 'snapshot'},
+            ]
+        )
+        response = downloader_mw.process_request(request, spider)
+        assert len(response.snapshots) == 2
+        
+        # 主响应结果之后依次输出不去重的快照请求
+        output = list(DrissionSpiderMiddleware().process_spider_output(response, ['main'], spider))
+        assert output[0] == 'main'
+        snapshot_requests = output[1:]
+        assert len(snapshot_requests) == 2
+        assert all(isinstance(r, DrissionRequest) and r.dont_filter for r in snapshot_requests)
+        
+        # 下载器中间件直接返回快照响应，回调与原请求相同
+        texts = []
+        for snapshot_request in snapshot_requests:
+            snapshot = downloader_mw.process_request(snapshot_request, spider)
+            assert snapshot.request is snapshot_request
+            assert 'drission_snapshot' not in snapshot.meta
+            assert 'snapshot' in snapshot.flags
+            texts.extend(snapshot_request.callback(snapshot))
+        assert texts == ['<p>1</p>', '<p>2</p>']
+        assert mock_tab.get.call_count == 1
+    
+    def test_release_page(self, request_obj):
+        """测试回调输出消费完毕后释放页面对象引用"""
+        response = DrissionResponse(
+            url='https://example.com', body=b'', request=request_obj, page=MagicMock()
+        )
+        
+        middleware = DrissionSpiderMiddleware()
+        output = middleware.process_spider_output(response, iter(['item']), MagicMock())
+        
+        # 输出未消费完时保留页面对象
+        assert next(output) == 'item'
+        assert response.page is not None
+        
+        # 消费完毕后释放
+        assert list(output) == []
+        assert response.page is None
+
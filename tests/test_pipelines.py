@@ -0,0 +1,110 @@
+"""
+数据管道测试
+"""
+
+import base64
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from typing import Any
+from unittest.mock import MagicMock
+
+import scrapy
+from twisted.internet.defer import Deferred
+
+from scrapy_drissionpage.pipelines import ScreenshotData, ScreenshotPipeline, store_batch
+
+
+PNG = base64.b64encode(b'\x89PNG fake image').decode()
+JPEG = base64.b64encode(b'\xff\xd8 fake image').decode()
+
+
+class ImmediateExecutor(Executor):
+    """在当前线程中立即执行任务的执行器"""
+    
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        future.set_result(fn(*args, **kwargs))
+        return future
+
+
+class PageItem(scrapy.Item):
+    """声明了结果字段的item"""
+    screenshot = scrapy.Field()
+    screenshot_path = scrapy.Field()
+    screenshot_checksum = scrapy.Field()
+
+
+@dataclass
+class ShotItem:
+    """只声明了截图字段的dataclass item"""
+    url: str
+    screenshot: Any = None
+
+
+class TestStoreBatch:
+    """store_batch测试类"""
+    
+    def test_dedup(self, tmp_path):
+        """测试按内容哈希命名，相同图片只写入一次"""
+        results = store_batch(str(tmp_path), [(PNG, 'png'), (JPEG, 'jpeg'), (PNG, 'png')])
+        
+        assert [written for _, _, written in results] == [True, True, False]
+        assert results[0][0] == results[2][0]
+        assert results[1][0].endswith('.jpg')
+        assert (tmp_path / results[0][0]).read_bytes() == b'\x89PNG fake image'
+        assert len(list(tmp_path.rglob('*.*'))) == 2
+
+
+class TestScreenshotPipeline:
+    """ScreenshotPipeline测试类"""
+    
+    def test_batch(self, tmp_path):
+        """测试截图按批写入后替换为路径和哈希"""
+        pipeline = ScreenshotPipeline(store_dir=str(tmp_path), batch_size=2, stats=MagicMock())
+        pipeline.executor = ImmediateExecutor()
+        pipeline._call_from_thread = lambda func, *args: func(*args)
+        spider = MagicMock()
+        
+        # 没有截图的item直接返回
+        plain = {'title': 'a'}
+        assert Deferred.fromCoroutine(pipeline.process_item(plain, spider)).result is plain
+        
+        # 第二个截图填满批次后提交
+        results = [
+            Deferred.fromCoroutine(
+                pipeline.process_item({'screenshot': ScreenshotData(PNG)}, spider)
+            )
+            for _ in range(2)
+        ]
+        pipeline.close_spider(spider)
+        
+        items = [d.result for d in results]
+        assert items[0] == items[1]
+        assert set(items[0]) == {'screenshot_path', 'screenshot_checksum'}
+        assert (tmp_path / items[0]['screenshot_path']).exists()
+        pipeline.stats.inc_value.assert_any_call('drissionpage/screenshot/duplicate')
+    
+    def test_declared_fields(self, tmp_path):
+        """测试只写入item声明的字段"""
+        pipeline = ScreenshotPipeline(store_dir=str(tmp_path), batch_size=2)
+        pipeline.executor = ImmediateExecutor()
+        pipeline._call_from_thread = lambda func, *args: func(*args)
+        spider = MagicMock()
+        
+        results = [
+            Deferred.fromCoroutine(
+                pipeline.process_item(PageItem(screenshot=ScreenshotData(PNG)), spider)
+            ),
+            Deferred.fromCoroutine(
+                pipeline.process_item(ShotItem('a', ScreenshotData(PNG)), spider)
+            ),
+        ]
+        pipeline.close_spider(spider)
+        item, shot = [d.result for d in results]
+        
+        # 声明了结果字段的Item写入路径和哈希
+        assert 'screenshot' not in item
+        assert (tmp_path / item['screenshot_path']).exists()
+        
+        # 未声明结果字段时截图字段替换为存储路径
+        assert shot.screenshot == item['screenshot_path']
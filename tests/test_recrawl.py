@@ -0,0 +1,153 @@
+"""
+增量重爬测试
+"""
+
+from threading import Thread
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from scrapy.exceptions import IgnoreRequest
+from scrapy.settings import Settings
+
+from scrapy_drissionpage.middleware import DrissionPageMiddleware
+from scrapy_drissionpage.recrawl import ValidatorStore
+from scrapy_drissionpage.request import DrissionRequest
+from scrapy_drissionpage.response import DrissionResponse
+
+
+class TestValidatorStore:
+    """ValidatorStore测试类"""
+    
+    def test_put_get(self, tmp_path):
+        """测试保存校验信息并在重新打开后读取"""
+        path = str(tmp_path / 'state' / 'recrawl.db')
+        store = ValidatorStore(path)
+        store.put(b'fp', 'https://example.com', etag='"v1"', content_hash='abc')
+        store.close()
+        
+        store = ValidatorStore(path)
+        record = store.get(b'fp')
+        assert record['etag'] == '"v1"'
+        assert record['content_hash'] == 'abc'
+        assert store.get(b'other') is None
+        assert store.conditional_headers(record) == {'If-None-Match': '"v1"'}
+        store.close()
+    
+    def test_threads(self, tmp_path):
+        """测试多个线程共享连接同时读写"""
+        store = ValidatorStore(str(tmp_path / 'recrawl.db'), commit_every=7)
+        
+        def work(n):
+            for i in range(50):
+                fp = f'{n}-{i}'.encode()
+                store.put(fp, 'https://example.com', content_hash=str(i))
+                assert store.get(fp)['content_hash'] == str(i)
+        
+        threads = [Thread(target=work, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        assert len(store) == 200
+        store.close()
+
+
+class TestRecrawlMiddleware:
+    """DrissionPageMiddleware增量重爬测试类"""
+    
+    @pytest.fixture
+    def setup(self, tmp_path):
+        """提供启用增量重爬的中间件、爬虫和模拟会话"""
+        session = MagicMock()
+        session.url = 'https://example.com/page'
+        session.html = '<html><body>v1</body></html>'
+        session.response = SimpleNamespace(status_code=200, content=b'v1', headers={'ETag': '"v1"'})
+        
+        tab = MagicMock()
+        tab.url = 'https://example.com/page'
+        tab.html = '<html><body>rendered</body></html>'
+        
+        browser_manager = MagicMock()
+        browser_manager.get_session.return_value = session
+        browser_manager.get_browser.return_value.latest_tab = tab
+        browser_manager.get_browser.return_value.run_cdp.return_value = {
+            'cookies': [{'name': 'sid', 'value': 'abc', 'domain': 'example.com'}]
+        }
+        
+        middleware = DrissionPageMiddleware()
+        middleware._get_browser_manager = MagicMock(return_value=browser_manager)
+        spider = MagicMock()
+        spider.name = 'recrawl_spider'
+        spider.settings = Settings({'DRISSIONPAGE_RECRAWL_STORE': str(tmp_path / 'recrawl.db')})
+        return middleware, spider, session, tab
+    
+    def test_skip_unchanged(self, setup):
+        """测试首次渲染只保存记录，之后带浏览器Cookie检查，304或文档未变化时跳过渲染"""
+        middleware, spider, session, tab = setup
+        probe = session.session.get
+        probe.return_value = SimpleNamespace(
+            status_code=200, content=b'v1', headers={'ETag': '"v1"'}
+        )
+        # 浏览器模式的检查使用自己的响应对象，不读取共享会话页面上其他请求的响应
+        session.response = SimpleNamespace(status_code=304, content=b'', headers={})
+        
+        # 首次抓取：没有记录，不发送检查请求，直接渲染
+        request = DrissionRequest(url='https://example.com/page')
+        response = middleware.process_request(request, spider)
+        assert isinstance(response, DrissionResponse)
+        assert tab.get.call_count == 1
+        probe.assert_not_called()
+        
+        # 第二次抓取：带浏览器Cookie检查，保存校验信息后渲染
+        middleware.process_request(DrissionRequest(url='https://example.com/page'), spider)
+        assert probe.call_args.kwargs['cookies'] == {'sid': 'abc'}
+        assert probe.call_args.kwargs['headers'] == {}
+        assert tab.get.call_count == 2
+        
+        # 服务器返回304：发送条件请求头，不渲染
+        probe.return_value = SimpleNamespace(status_code=304, content=b'', headers={})
+        with pytest.raises(IgnoreRequest):
+            middleware.process_request(DrissionRequest(url='https://example.com/page'), spider)
+        assert probe.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        
+        # 服务器不支持条件请求，但文档未变化：不渲染
+        probe.return_value = SimpleNamespace(status_code=200, content=b'v1', headers={})
+        with pytest.raises(IgnoreRequest):
+            middleware.process_request(DrissionRequest(url='https://example.com/page'), spider)
+        
+        # 文档变化：重新渲染
+        probe.return_value = SimpleNamespace(status_code=200, content=b'v2', headers={})
+        middleware.process_request(DrissionRequest(url='https://example.com/page'), spider)
+        assert tab.get.call_count == 3
+        
+        # 检查请求失败时照常渲染
+        probe.side_effect = ConnectionError('boom')
+        middleware.process_request(DrissionRequest(url='https://example.com/page'), spider)
+        assert tab.get.call_count == 4
+        session.get.assert_not_called()
+        
+        middleware.spider_closed(spider)
+    
+    def test_session_reuse(self, setup):
+        """测试会话模式直接使用检查时取得的页面"""
+        middleware, spider, session, tab = setup
+        
+        response = middleware.process_request(
+            DrissionRequest(url='https://example.com/page', page_type='session'), spider
+        )
+        
+        # 只发送一次请求
+        assert response.text == '<html><body>v1</body></html>'
+        session.get.assert_called_once()
+        
+        # 首次抓取的响应已保存校验信息，文档未变化时跳过
+        with pytest.raises(IgnoreRequest):
+            middleware.process_request(
+                DrissionRequest(url='https://example.com/page', page_type='session'), spider
+            )
+        assert session.get.call_args.kwargs['headers'] == {'If-None-Match': '"v1"'}
+        assert session.get.call_args.kwargs['retry'] == 0
+        session.session.get.assert_not_called()
+        middleware.spider_closed(spider)
@@ -0,0 +1,68 @@
+"""
+标签页回收测试
+"""
+
+from unittest.mock import MagicMock, call
+
+import pytest
+
+from scrapy_drissionpage.recycle import TabRecycler
+
+
+def fake_tab(tab_id='tab-1', url='https://example.com/a'):
+    """模拟正在监听数据包的标签页"""
+    tab = MagicMock(tab_id=tab_id, url=url)
+    tab.listen.listening = True
+    tab.console.listening = False
+    return tab
+
+
+class TestTabRecycler:
+    """TabRecycler测试类"""
+    
+    def test_reset(self):
+        """测试软重置停止监听、移除注入脚本、导航到空白页并清空历史"""
+        tab = fake_tab()
+        assert TabRecycler().reset(tab)
+        
+        tab.listen.stop.assert_called_once()
+        tab.console.stop.assert_not_called()
+        tab.remove_init_js.assert_called_once_with()
+        tab.get.assert_called_once_with('about:blank')
+        assert tab.run_cdp.call_args_list == [
+            call('Page.resetNavigationHistory'),
+            call('HeapProfiler.collectGarbage'),
+        ]
+    
+    def test_clear_storage(self):
+        """测试清除当前源的存储"""
+        tab = fake_tab()
+        TabRecycler(clear_storage=True, collect_garbage=False).reset(tab)
+        tab.run_cdp.assert_any_call(
+            'Storage.clearDataForOrigin', origin='https://example.com', storageTypes='all'
+        )
+        
+        blank = fake_tab(url='about:blank')
+        TabRecycler(clear_storage=True, collect_garbage=False).reset(blank)
+        blank.run_cdp.assert_called_once_with('Page.resetNavigationHistory')
+    
+    def test_max_uses(self):
+        """测试达到最大使用次数后不再放回池中"""
+        recycler = TabRecycler(max_uses=3)
+        tab = fake_tab()
+        assert recycler.recycle(tab)
+        assert recycler.recycle(tab)
+        assert recycler.uses(tab) == 2
+        assert not recycler.recycle(tab)
+        assert recycler.uses(tab) == 0
+    
+    def test_reset_failure(self):
+        """测试软重置失败时不再放回池中"""
+        tab = fake_tab()
+        tab.get.side_effect = RuntimeError('标签页已断开')
+        assert not TabRecycler(max_uses=0).recycle(tab)
+    
+    def test_invalid_max_uses(self):
+        """测试非法的最大使用次数"""
+        with pytest.raises(ValueError):
+            TabRecycler(max_uses=-1)
@@ -2,14 +2,26 @@
 DrissionRequest和DrissionResponse测试
 """
 
+import json
+
 import pytest
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
+from scrapy import Spider
 
 from scrapy_drissionpage.request import DrissionRequest
 from scrapy_drissionpage.response import DrissionResponse
 from DrissionPage import ChromiumPage, SessionPage
 
 
+class CopySpider(Spider):
+    """回调为爬虫方法的请求复制测试用爬虫"""
+    
+    name = 'copy_spider'
+    
+    def parse_detail(self, response):
+        pass
+
+
 class TestDrissionRequest:
     """DrissionRequest测试类"""
     
@@ -42,6 +54,115 @@ class TestDrissionRequest:
         assert drission_meta['proxy'] == 'http://proxy.example.com:8080'
         assert drission_meta['browser_options']['headless'] is True
         assert drission_meta['session_options']['timeout'] == 30
+    
+    def test_shared_options(self):
+        """测试相同配置的请求共享drission选项，修改时写时复制"""
+        import pickle
+        
+        meta = {'drission': {'headers': {'X-Token': 'abc'}}}
+        first = DrissionRequest(url='https://example.com/1', meta=meta, wait_time=1)
+        second = DrissionRequest(url='https://example.com/2', meta=meta, wait_time=1)
+        
+        # 验证共享同一个字典，且不修改调用方的字典
+        assert first.meta['drission'].shares(second.meta['drission'])
+        assert meta == {'drission': {'headers': {'X-Token': 'abc'}}}
+        assert not hasattr(first, '__dict__')
+        
+        # 验证可以序列化(磁盘队列)并重新共享，且替换请求后保持配置
+        restored = pickle.loads(pickle.dumps(first.meta['drission']))
+        assert restored == first.meta['drission']
+        assert restored.shares(first.meta['drission'])
+        assert first.replace(url='https://example.com/3').meta['drission']['wait_time'] == 1
+        
+        # 验证修改只影响当前请求
+        first.meta['drission']['wait_time'] = 2
+        del first.meta['drission']['headers']
+        assert first.meta['drission'] == {'page_type': 'chromium', 'wait_time': 2}
+        assert second.meta['drission']['wait_time'] == 1
+        assert second.meta['drission']['headers'] == {'X-Token': 'abc'}
+        assert not first.meta['drission'].shares(second.meta['drission'])
+    
+    def test_copy_with_spider_callback(self):
+        """测试回调为爬虫方法的请求可以复制和序列化"""
+        import copy
+        import pickle
+        
+        request = DrissionRequest(
+            url='https://example.com', callback=CopySpider().parse_detail, wait_time=1
+        )
+        for restored in (
+            copy.copy(request), copy.deepcopy(request), pickle.loads(pickle.dumps(request))
+        ):
+            assert type(restored) is DrissionRequest
+            assert restored.callback.__name__ == 'parse_detail'
+            assert restored.meta['drission'] == request.meta['drission']
+    
+    @pytest.mark.parametrize('queue_name', ['PickleFifoDiskQueue', 'MarshalFifoDiskQueue'])
+    def test_disk_queue(self, queue_name, tmp_path):
+        """测试请求写入JOBDIR磁盘队列后完整还原"""
+        from scrapy import squeues, Spider
+        
+        class QueueSpider(Spider):
+            name = 'queue_spider'
+            
+            def parse_detail(self, response):
+                pass
+        
+        spider = QueueSpider()
+        crawler = MagicMock()
+        crawler.spider = spider
+        queue = getattr(squeues, queue_name).from_crawler(crawler, str(tmp_path / 'queue'))
+        
+        request = DrissionRequest(
+            url='https://example.com/api',
+            callback=spider.parse_detail,
+            page_type='session',
+            wait_time=2,
+            actions=[{'method': 'click', 'args': ['#more']}],
+            cb_kwargs={'page': 1}
+        )
+        queue.push(request)
+        restored = queue.pop()
+        queue.close()
+        
+        # 验证类型、回调和drission选项均被还原
+        assert type(restored) is DrissionRequest
+        assert restored.callback == spider.parse_detail
+        assert restored.cb_kwargs == {'page': 1}
+        assert restored.meta['drission'] == request.meta['drission']
+        assert restored.meta['drission'].shares(request.meta['drission'])
+    
+    def test_to_dict(self):
+        """测试to_dict省略默认值，from_dict还原请求"""
+        import pickle
+        
+        request = DrissionRequest(url='https://example.com', page_type='session', priority=5)
+        d = request.to_dict()
+        
+        # 验证精简输出
+        assert set(d) == {'url', 'meta', '_class', 'priority'}
+        assert type(d['meta']['drission']) is dict
+        
+        # 验证还原时保持页面类型
+        restored = DrissionRequest.from_dict(d)
+        assert restored.meta['drission']['page_type'] == 'session'
+        assert restored.priority == 5
+        assert str(pickle.loads(pickle.dumps(request))) == str(request)
+    
+    def test_viewport(self):
+        """测试视口设置转换为CDP参数"""
+        request = DrissionRequest(
+            url='https://example.com',
+            viewport={'width': 390, 'height': 844, 'device_scale_factor': 3, 'mobile': True}
+        )
+        
+        assert request.meta['drission']['viewport'] == {
+            'width': 390, 'height': 844, 'deviceScaleFactor': 3, 'mobile': True
+        }
+        
+        # 非法视口
+        with pytest.raises(ValueError):
+            DrissionRequest(url='https://example.com', viewport=(0, 800))
 
 
 class TestDrissionResponse:
@@ -167,4 +288,287 @@ class TestDrissionResponse:
         # 验证结果
         assert result is True
         mock_chromium_page.ele.assert_called_once_with('input[name="username"]')
-        mock_element.input.assert_called_once_with('testuser') 
\ No newline at end of file
+        mock_element.input.assert_called_once_with('testuser')
+    
+    def test_extract_static(self, request_obj):
+        """测试无页面对象时按规则静态提取"""
+        html = (
+            '<html><body><h1> Quotes <small>top</small></h1>'
+            '<div class="quote"><span class="text">A <b>1</b> </span>'
+            '<a class="tag" href="/t/1">x</a></div>'
+            '<div class="quote"><span class="text">B</span></div>'
+            '</body></html>'
+        )
+        response = DrissionResponse(
+            url='https://example.com',
+            body=html.encode('utf-8'),
+            request=request_obj
+        )
+        
+        result = response.extract({
+            'title': 'h1::text',
+            'heading': 'h1::alltext',
+            'default': 'h1',
+            'missing': 'h2::text',
+            'quotes': {
+                '_items': 'div.quote',
+                'text': 'span.text::text',
+                'full': 'span.text::alltext',
+                'links': ['a.tag::attr(href)'],
+            },
+        })
+        
+        # 验证提取结果
+        assert result == {
+            'title': ' Quotes ',
+            'heading': 'Quotes top',
+            'default': 'Quotes top',
+            'missing': None,
+            'quotes': [
+                {'text': 'A ', 'full': 'A 1', 'links': ['/t/1']},
+                {'text': 'B', 'full': 'B', 'links': []},
+            ],
+        }
+    
+    def test_extract_chromium(self, request_obj, mock_chromium_page):
+        """测试浏览器模式下只执行一次run_js"""
+        from scrapy_drissionpage.utils.extractor import ExtractionSpec, EXTRACT_JS
+        
+        mock_chromium_page.run_js.return_value = '{"title": "Example"}'
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        spec = ExtractionSpec({'title': 'h1::text'})
+        result = response.extract(spec)
+        
+        # 验证结果和调用次数
+        assert result == {'title': 'Example'}
+        mock_chromium_page.run_js.assert_called_once_with(EXTRACT_JS, spec.json)
+    
+    def test_tables_static(self, request_obj):
+        """测试无页面对象时按列提取表格并推断类型"""
+        html = (
+            '<html><body><table id="prices"><caption>Prices</caption>'
+            '<thead><tr><th rowspan="2">Name</th><th colspan="2">Price</th></tr>'
+            '<tr><th>USD</th><th>Change</th></tr></thead>'
+            '<tbody><tr><td>A</td><td>1,200</td><td>0.5</td></tr>'
+            '<tr><td>B</td><td>30</td><td></td></tr>'
+            '<tr><td>C</td><td>7</td><td>-1e-2</td></tr></tbody></table>'
+            '<table><tr><td>x</td><td>y</td></tr></table>'
+            '</body></html>'
+        )
+        response = DrissionResponse(
+            url='https://example.com',
+            body=html.encode('utf-8'),
+            request=request_obj
+        )
+        
+        tables = response.tables()
+        assert len(tables) == 2
+        
+        table = response.extract_table('#prices')
+        assert table.caption == 'Prices'
+        assert table.columns == ['Name', 'Price/USD', 'Price/Change']
+        assert table['Price/USD'] == [1200, 30, 7]
+        assert table['Price/Change'] == [0.5, None, -0.01]
+        assert next(table.rows()) == {'Name': 'A', 'Price/USD': 1200, 'Price/Change': 0.5}
+        
+        # 没有表头的表格使用序号列名
+        assert tables[1].to_dict() == {'column_0': ['x'], 'column_1': ['y']}
+        assert response.extract_table('#missing') is None
+    
+    def test_tables_chromium(self, request_obj, mock_chromium_page):
+        """测试浏览器模式下一次run_js收集表格"""
+        from scrapy_drissionpage.utils.tables import TABLES_JS
+        
+        mock_chromium_page.run_js.return_value = json.dumps([{
+            'caption': None,
+            'rows': [[True, ['Year', 'Sales']], [False, ['2023', ['10', 1, 2]]], [False, ['2024']]],
+        }])
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        table = response.extract_table('table.sales')
+        
+        mock_chromium_page.run_js.assert_called_once_with(TABLES_JS, 'table.sales')
+        assert table.to_dict() == {'Year': [2023, 2024], 'Sales': [10, 10]}
+    
+    def test_aclick(self, request_obj, mock_chromium_page):
+        """测试aclick方法在线程池中执行点击"""
+        import asyncio
+        
+        mock_element = MagicMock()
+        mock_chromium_page.ele.return_value = mock_element
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        # 调用aclick方法
+        result = asyncio.run(response.aclick('button', timeout=1))
+        
+        # 验证结果
+        assert result is True
+        mock_chromium_page.ele.assert_called_once_with('button', timeout=1)
+        mock_element.click.assert_called_once()
+    
+    def test_ascroll(self, request_obj, mock_chromium_page):
+        """测试ascroll方法传递平滑滚动参数"""
+        import asyncio
+        
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        with patch.object(DrissionResponse, 'scroll', return_value=True) as scroll:
+            result = asyncio.run(response.ascroll(direction='up', distance=100, smooth=True))
+        
+        # 验证参数与同步版本一致
+        assert result is True
+        scroll.assert_called_once_with(None, 'up', 100, True)
+    
+    def test_asleep(self, request_obj, mock_chromium_page):
+        """测试asleep方法不调用阻塞等待"""
+        import asyncio
+        
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        # 调用asleep方法
+        result = asyncio.run(response.asleep(0))
+        
+        # 验证返回自身，且未调用阻塞的wait.time
+        assert result is response
+        mock_chromium_page.wait.time.assert_not_called()
+    
+    def test_from_html(self, request_obj):
+        """测试由HTML字符串创建响应时直接复用文本"""
+        html = '<html><head><meta charset="gbk"></head><body><h1>标题</h1></body></html>'
+        response = DrissionResponse.from_html('https://example.com', html, request=request_obj)
+        
+        # 验证文本不经过再次解码，且不受页面声明的编码影响
+        assert response.text is html
+        assert response.body == html.encode('utf-8')
+        assert response.css('h1::text').get() == '标题'
+        assert response.is_spooled is False
+    
+    def test_from_html_spool(self, request_obj, tmp_path):
+        """测试超过阈值的页面写入临时文件"""
+        import gc
+        
+        html = '<html><body>' + '<p>段落</p>' * 1000 + '</body></html>'
+        response = DrissionResponse.from_html(
+            'https://example.com', html, request=request_obj,
+            spool_threshold=100, spool_dir=str(tmp_path)
+        )
+        
+        # 验证响应体保存在临时文件中，访问时才读取
+        assert response.is_spooled is True
+        assert len(list(tmp_path.iterdir())) == 1
+        with response.open_body() as f:
+            assert f.read(12) == b'<html><body>'
+        assert response.text == html
+        assert len(response.css('p')) == 1000
+        
+        # 验证响应回收后删除临时文件
+        del response
+        gc.collect()
+        assert list(tmp_path.iterdir()) == []
+    
+    def test_capture_screenshot(self, request_obj, mock_chromium_page):
+        """测试通过CDP截取整页JPEG截图"""
+        mock_chromium_page.run_cdp.side_effect = lambda method, **params: {
+            'Page.getLayoutMetrics': {'cssContentSize': {'width': 1280, 'height': 5000}},
+            'Page.captureScreenshot': {'data': 'aW1hZ2U='},
+        }[method]
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        shot = response.capture_screenshot(format='jpeg', quality=70, scale=0.5, full_page=True)
+        
+        # 验证截图参数和结果
+        assert shot.data == 'aW1hZ2U='
+        assert shot.format == 'jpeg'
+        mock_chromium_page.run_cdp.assert_called_with(
+            'Page.captureScreenshot',
+            format='jpeg',
+            captureBeyondViewport=True,
+            quality=70,
+            clip={'x': 0, 'y': 0, 'width': 1280, 'height': 5000, 'scale': 0.5}
+        )
+        
+        with pytest.raises(ValueError):
+            response.capture_screenshot(format='gif')
+    
+    def test_scroll(self, request_obj, mock_chromium_page):
+        """测试scroll方法默认关闭平滑滚动"""
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        # 滚动到底部和向右滚动
+        assert response.scroll() is True
+        assert response.scroll(direction='right', distance=500) is True
+        
+        # 验证通过脚本瞬间跳转，不修改标签页的平滑滚动设置
+        from scrapy_drissionpage.harvest import SCROLL_PAGE_JS
+        assert mock_chromium_page.run_js.call_args_list == [
+            ((SCROLL_PAGE_JS, 'down', None, False),),
+            ((SCROLL_PAGE_JS, 'right', 500, False),),
+        ]
+        mock_chromium_page.set.scroll.smooth.assert_not_called()
+    
+    def test_scroll_harvest(self, request_obj, mock_chromium_page):
+        """测试无限滚动采集只返回每次新增的节点"""
+        from scrapy_drissionpage.harvest import INSTALL_JS, DRAIN_JS
+        
+        drains = iter([
+            '["<div class=\\"item\\">1</div>"]', '["<div class=\\"item\\">2</div>"]', '[]', '[]'
+        ])
+        
+        def run_js(script, *args):
+            if script == INSTALL_JS:
+                return True
+            if script == DRAIN_JS:
+                return next(drains)
+            return None
+        
+        mock_chromium_page.run_js.side_effect = run_js
+        response = DrissionResponse(
+            url=mock_chromium_page.url,
+            body=mock_chromium_page.html.encode('utf-8'),
+            request=request_obj,
+            page=mock_chromium_page
+        )
+        
+        # 调用scroll_harvest方法
+        parts = list(response.scroll_harvest('.item', interval=0))
+        
+        # 验证每个部分响应只包含新增节点，连续两次无新内容后停止
+        assert [part.css('.item::text').get() for part in parts] == ['1', '2']
+        assert all(part.flags == ['scroll_harvest'] for part in parts)
+        assert mock_chromium_page.run_js.call_count == 1 + 4 * 2 + 1
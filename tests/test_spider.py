@@ -67,4 +67,17 @@ class TestDrissionSpider:
         spider.closed('finished')
         
         # 验证浏览器管理器已关闭
-        mock_browser_manager.close.assert_called_once() 
\ No newline at end of file
+        mock_browser_manager.close.assert_called_once()
+    
+    def test_update_settings(self, settings):
+        """测试爬虫设置中自动启用中间件，且保留项目配置的其他中间件"""
+        settings.set(
+            'DOWNLOADER_MIDDLEWARES', {'myproject.middlewares.ProxyMiddleware': 600},
+            priority='project'
+        )
+        DrissionSpider.update_settings(settings)
+        middlewares = settings.getdict('DOWNLOADER_MIDDLEWARES')
+        assert middlewares['scrapy_drissionpage.middleware.DrissionPageMiddleware'] == 543
+        assert middlewares['myproject.middlewares.ProxyMiddleware'] == 600
+        spider_middlewares = settings.getdict('SPIDER_MIDDLEWARES')
+        assert spider_middlewares['scrapy_drissionpage.middleware.DrissionSpiderMiddleware'] == 543
@@ -2,11 +2,18 @@
 工具模块测试
 """
 
+import re
+
 import pytest
 from unittest.mock import MagicMock, patch
+from scrapy.selector import Selector
+from parsel.csstranslator import css2xpath
+from lxml.etree import XPath
+from DrissionPage.items import SessionElement
 
 from scrapy_drissionpage.utils.mode_switcher import ModeSwitcher
-from scrapy_drissionpage.utils.selector import EnhancedSelector
+from scrapy_drissionpage.utils.selector import EnhancedSelector, SelectorCache
+from scrapy_drissionpage.utils.api_replay import ApiReplayer
 
 
 class TestModeSwitcher:
@@ -70,23 +77,169 @@ class TestEnhancedSelector:
         mock_page.eles.assert_called_once_with('css:div.test')
         assert result == ['element1', 'element2']
     
-    @patch('scrapy_drissionpage.utils.selector.Selector')
-    def test_css_with_html(self, mock_selector_class):
+    @patch('scrapy_drissionpage.utils.selector.css2xpath', wraps=css2xpath)
+    def test_css_with_html(self, mock_css2xpath):
         """测试使用HTML内容的css方法"""
-        # 创建模拟的Scrapy选择器
-        mock_selector = MagicMock()
-        mock_selector_class.return_value = mock_selector
-        
-        mock_selector_list = MagicMock()
-        mock_selector_list.__iter__.return_value = [MagicMock(), MagicMock()]
-        mock_selector.css.return_value = mock_selector_list
-        
         # 创建选择器
-        selector = EnhancedSelector()
+        selector = EnhancedSelector(cache=SelectorCache())
         
         # 调用css方法
-        result = selector.css('div.test', html='<html><div class="test">Test</div></html>')
+        result = selector.css(
+            'div.test', html='<html><div class="test">A</div><div class="test">B</div></html>'
+        )
         
         # 验证结果
-        mock_selector.css.assert_called_once_with('div.test')
-        assert len(result) == 2 
\ No newline at end of file
+        mock_css2xpath.assert_called_once_with('div.test')
+        assert len(result) == 2
+        assert [element.text for element in result] == ['A', 'B']
+    
+    def test_html_parsed_once(self):
+        """测试同一段HTML执行多个选择器只解析一次"""
+        html = '<html><body><div class="a">A</div><p>1</p><p>2</p></body></html>'
+        selector = EnhancedSelector(cache=SelectorCache())
+        
+        with patch('scrapy_drissionpage.utils.selector.Selector', wraps=Selector) as selector_class:
+            assert selector.css('div.a::text', html=html) == ['A']
+            assert selector.xpath('//p/text()', html=html) == ['1', '2']
+            assert selector.css('p::text', html=''.join(html)) == ['1', '2']
+        
+        selector_class.assert_called_once()
+        assert selector.cache_info()['documents'] == {
+            'hits': 2, 'misses': 1, 'size': 1, 'maxsize': 16
+        }
+    
+    def test_static_elements(self):
+        """测试HTML内容查询返回与页面元素接口一致的SessionElement"""
+        html = (
+            '<html><body><ul id="list">'
+            '<li><a href="/p/1">One</a></li><li><a href="/p/2">Two</a></li>'
+            '</ul></body></html>'
+        )
+        selector = EnhancedSelector(cache=SelectorCache())
+        
+        items = selector.css('#list li', html=html)
+        assert all(isinstance(item, SessionElement) for item in items)
+        assert [item.ele('tag:a').attr('href') for item in items] == ['/p/1', '/p/2']
+        assert items[1].text == 'Two'
+        
+        lists = selector.xpath('//ul', html=html)
+        assert lists[0].attr('id') == 'list'
+        assert [a.text for a in lists[0].eles('css:a')] == ['One', 'Two']
+        
+        # 子元素来自同一次解析结果
+        assert items[0].parent().inner_ele is lists[0].inner_ele
+        assert selector.xpath('//a/@href', html=html) == ['/p/1', '/p/2']
+    
+    def test_xpath_cache(self):
+        """测试XPath只编译一次，结果与parsel一致"""
+        html = '<html><body><p class="x">1</p><p>2</p></body></html>'
+        selector = EnhancedSelector(cache=SelectorCache(max_xpaths=2))
+        parsed = Selector(text=html)
+        
+        with patch('scrapy_drissionpage.utils.selector.XPath', wraps=XPath) as xpath_class:
+            for _ in range(2):
+                assert selector.xpath('//p/text()', html=html) == ['1', '2']
+                assert selector.css('p.x::text', html=html) == parsed.css('p.x::text').getall()
+            assert selector.xpath('count(//p)', html=html) == parsed.xpath('count(//p)').getall()
+            assert selector.xpath('//p[re:test(., "^2$")]/text()', html=html) == ['2']
+        
+        assert xpath_class.call_count == 4
+        assert selector.cache_info()['xpaths'] == {
+            'hits': 2, 'misses': 4, 'size': 2, 'maxsize': 2
+        }
+    
+    def test_regex_cache(self):
+        """测试正则表达式只编译一次"""
+        selector = EnhancedSelector(cache=SelectorCache(max_patterns=1))
+        html = '<a href="/p/1"></a><a href="/p/2"></a>'
+        
+        assert selector.regex(r'/p/(\d+)', html=html) == ['1', '2']
+        assert selector.regex(r'/p/(\d+)', html=html) == ['1', '2']
+        assert selector.regex(r'HREF', html=html, flags=re.I) == ['href', 'href']
+        assert selector.cache_info()['patterns'] == {
+            'hits': 1, 'misses': 2, 'size': 1, 'maxsize': 1
+        }
+    
+    def test_lru_eviction(self):
+        """测试文档缓存按最近使用淘汰"""
+        cache = SelectorCache(max_documents=2)
+        first = cache.document('<p>1</p>')
+        cache.document('<p>2</p>')
+        assert cache.document('<p>1</p>') is first
+        cache.document('<p>3</p>')
+        
+        assert cache.document('<p>1</p>') is first
+        assert '<p>2</p>' not in cache.documents._data
+        assert cache.info()['documents']['misses'] == 3
+
+
+class TestApiReplayer:
+    """ApiReplayer测试类"""
+    
+    @pytest.fixture
+    def packet(self):
+        """创建模拟的数据包"""
+        packet = MagicMock()
+        packet.url = 'https://example.com/api/list?page=1'
+        packet.method = 'POST'
+        packet.request.headers = {
+            ':authority': 'example.com',
+            'Content-Type': 'application/json',
+            'Cookie': 'a=1',
+            'X-Token': 'abc'
+        }
+        packet.request.postData = {'page': 1}
+        return packet
+    
+    def test_to_request(self, packet):
+        """测试将数据包转换为会话模式请求"""
+        browser_manager = MagicMock()
+        browser = browser_manager.get_browser.return_value
+        browser.run_cdp.return_value = {
+            'cookies': [{'name': 'sid', 'value': 'xyz', 'domain': 'example.com'}]
+        }
+        replayer = ApiReplayer(browser_manager)
+        
+        request = replayer.to_request(packet)
+        
+        # 验证请求方法、请求体和cookies，cookies按接口URL读取
+        assert request.method == 'POST'
+        assert request.body == b'{"page":1}'
+        assert request.cookies == {'sid': 'xyz'}
+        browser.run_cdp.assert_called_once_with('Network.getCookies', urls=[packet.url])
+        
+        # 验证为会话模式，且只保留可重放的请求头
+        drission_meta = request.meta['drission']
+        assert drission_meta['page_type'] == 'session'
+        assert drission_meta['headers'] == {'Content-Type': 'application/json', 'X-Token': 'abc'}
+    
+    def test_learn_and_request_for(self, packet):
+        """测试学习接口模板并直接构造请求"""
+        replayer = ApiReplayer()
+        replayer.learn(packet)
+        
+        # 未学习的域名返回None
+        assert replayer.request_for('https://other.com/api/list') is None
+        
+        # 已学习的域名按模板构造请求
+        request = replayer.request_for(
+            'https://example.com/api/list', params={'page': 2}, with_cookies=False
+        )
+        assert request.url == 'https://example.com/api/list?page=2'
+        assert request.method == 'POST'
+        assert request.meta['drission']['headers']['X-Token'] == 'abc'
+    
+    def test_template_defaults(self, packet):
+        """测试模板的路径和查询参数作为默认值"""
+        packet.url = 'https://example.com/api/list?page=1&size=20'
+        template = ApiReplayer().learn(packet)
+        
+        assert template.build_url('https://example.com') == (
+            'https://example.com/api/list?page=1&size=20'
+        )
+        assert template.build_url('https://example.com/api/list?page=3') == (
+            'https://example.com/api/list?page=3&size=20'
+        )
+        assert template.build_url('https://example.com/api/other?q=1') == (
+            'https://example.com/api/other?q=1'
+        )